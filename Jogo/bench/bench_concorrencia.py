@@ -0,0 +1,195 @@
+# bench/bench_concorrencia.py
+# Teste de carga concorrente de uma sala: vários threads leitores (o polling de 1 Hz de
+# cada cliente, aqui bem mais frequente) contra jogadores votando, confirmando e conversando.
+# Compara as leituras pelo instantâneo publicado (sem lock) com o caminho antigo, em que
+# cada leitura montava a resposta a partir do estado vivo segurando o RLock único que chat
+# e votação também usavam. Também confere se algum leitor viu um estado pela metade
+# (opções que não pertencem ao trecho exibido).
+# Os dois modos usam a história compilada (trechos pré-renderizados): a diferença medida é
+# a do lock e da montagem a cada leitura, não a da formatação antiga do texto.
+#
+# uso:
+#   python bench/bench_concorrencia.py --leitores 32 --duracao 3
+#   python bench/bench_concorrencia.py --modo instantaneo --saida conc.json
+
+import sys
+import os
+import argparse
+import json
+import logging
+import threading
+import time
+
+# Adiciona o diretório raiz ao path para garantir que 'model' seja encontrado
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.motor_jogo import MotorJogo
+from model.historia import HistoriaCompilada
+from bench.bench_motor import historia_grande
+
+MODOS = ("lock_unico", "instantaneo")
+JOGADORES = 4
+AMOSTRAS_POR_LEITOR = 20000  #latências guardadas por thread leitor (as primeiras)
+
+
+def criar_motor(historia, modo):
+    if modo == "lock_unico":
+        #modelo antigo: jogo e chat no mesmo RLock, que os leitores também seguram
+        lock = threading.RLock()
+        motor = MotorJogo(None, historia=historia, lock=lock, lock_chat=lock)
+    else:
+        motor = MotorJogo(None, historia=historia)
+    for i in range(JOGADORES):
+        motor.adicionar_jogador(f"j{i}")
+    return motor
+
+
+def ler_estado_vivo(motor):
+    #caminho antigo: trecho, opções, status e chat montados do estado do jogo a cada leitura,
+    #com o lock único seguro do começo ao fim (votos, "Continuar" e chat esperam a leitura)
+    with motor.lock:
+        if motor.trecho_atual is None:
+            trecho, opcoes = "O jogo não foi iniciado.", ()
+        else:
+            trecho = motor.historia.renderizar(motor.trecho_atual, motor.opcoes_empate)
+            opcoes = motor._textos_opcoes(motor.historia[motor.trecho_atual])
+        estado = {
+            "trecho": trecho,
+            "opcoes": opcoes,
+            "jogadores": tuple(nome for nome, info in motor.jogadores_conectados.items() if info["conectado"]),
+        }
+        status = motor._status_votacao()
+        chat = "Chat atual:\n" + "\n".join(f"  {mensagem}" for _, _, _, mensagem in motor.chat.mensagens)
+    return estado, status, chat
+
+
+def ler(motor, modo):
+    if modo == "lock_unico":
+        return ler_estado_vivo(motor)
+    return motor.obter_estado_desde(0), motor.obter_status_votacao(), motor.obter_chat()
+
+
+def consistente(estado) -> bool:
+    #toda opção enviada precisa aparecer no texto do trecho enviado junto
+    return all(f". {texto}\n" in estado["trecho"] for texto in estado["opcoes"])
+
+
+def executar(modo, leitores, duracao, intervalo, taxa_chat, historia):
+    motor = criar_motor(historia, modo)
+    parar = threading.Event()
+    latencias = []
+    contagem = {"leituras": 0, "inconsistentes": 0, "votos": 0, "prontos": 0, "chat": 0}
+    lock_contagem = threading.Lock()
+    trechos = []
+    motor.inscrever(lambda evento, dados: evento == "trecho" and trechos.append(dados["versao"]))
+
+    def leitor():
+        minhas, leituras, inconsistentes = [], 0, 0
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            estado, _, _ = ler(motor, modo)
+            decorrido = time.perf_counter() - inicio
+            if len(minhas) < AMOSTRAS_POR_LEITOR:
+                minhas.append(decorrido)
+            leituras += 1
+            if not consistente(estado):
+                inconsistentes += 1
+            if intervalo:
+                time.sleep(intervalo)
+        with lock_contagem:
+            latencias.extend(minhas)
+            contagem["leituras"] += leituras
+            contagem["inconsistentes"] += inconsistentes
+
+    def jogador(nome):
+        votos = prontos = 0
+        while not parar.is_set():
+            motor.registrar_voto(nome, 1)  #todos na opção 1: sem empate, a rodada sempre fecha
+            votos += 1
+            motor.registrar_pronto(nome)
+            prontos += 1
+        with lock_contagem:
+            contagem["votos"] += votos
+            contagem["prontos"] += prontos
+
+    def conversa():
+        enviadas, intervalo = 0, 1 / taxa_chat if taxa_chat else 0
+        while not parar.is_set():
+            motor.enviar_mensagem_chat("j0", f"mensagem {enviadas}")
+            enviadas += 1
+            if intervalo:
+                time.sleep(intervalo)
+        with lock_contagem:
+            contagem["chat"] += enviadas
+
+    threads = [threading.Thread(target=leitor) for _ in range(leitores)]
+    threads += [threading.Thread(target=jogador, args=(f"j{i}",)) for i in range(JOGADORES)]
+    threads.append(threading.Thread(target=conversa))
+    for thread in threads:
+        thread.start()
+    time.sleep(duracao)
+    parar.set()
+    for thread in threads:
+        thread.join()
+
+    latencias.sort()
+
+    def percentil(p):
+        return latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1e6 if latencias else 0.0
+
+    return {
+        "leituras_por_s": contagem["leituras"] / duracao,
+        "leitura_p50_us": percentil(0.50),
+        "leitura_p99_us": percentil(0.99),
+        "leitura_max_us": latencias[-1] * 1e6 if latencias else 0.0,
+        "votos_por_s": contagem["votos"] / duracao,
+        "trechos_avancados": len(trechos),
+        "chat_por_s": contagem["chat"] / duracao,
+        "inconsistentes": contagem["inconsistentes"],
+    }
+
+
+def imprimir(resultados):
+    colunas = (
+        ("leituras/s", "leituras_por_s", "{:.0f}"),
+        ("p50 µs", "leitura_p50_us", "{:.1f}"),
+        ("p99 µs", "leitura_p99_us", "{:.1f}"),
+        ("máx µs", "leitura_max_us", "{:.0f}"),
+        ("votos/s", "votos_por_s", "{:.0f}"),
+        ("trechos", "trechos_avancados", "{}"),
+        ("chat/s", "chat_por_s", "{:.0f}"),
+        ("inconsist.", "inconsistentes", "{}"),
+    )
+    print(f"{'modo':<14}" + "".join(f"{titulo:>12}" for titulo, _, _ in colunas))
+    for modo, valores in resultados.items():
+        print(f"{modo:<14}" + "".join(f"{formato.format(valores[chave]):>12}" for _, chave, formato in colunas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de concorrência de uma sala do MotorJogo")
+    parser.add_argument("--modo", choices=MODOS + ("ambos",), default="ambos")
+    parser.add_argument("--leitores", type=int, default=32, help="threads lendo o estado")
+    parser.add_argument("--intervalo", type=float, default=0.001, help="pausa entre leituras de cada leitor (0 = sem pausa)")
+    parser.add_argument("--duracao", type=float, default=3.0, help="segundos por modo")
+    parser.add_argument("--taxa-chat", type=float, default=200.0, help="mensagens/s (0 = sem pausa)")
+    parser.add_argument("--trechos", type=int, default=200, help="trechos da história sintética")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  #mede o motor, não o console
+
+    historia = HistoriaCompilada(historia_grande(args.trechos))
+    modos = MODOS if args.modo == "ambos" else (args.modo,)
+    resultados = {
+        modo: executar(modo, args.leitores, args.duracao, args.intervalo, args.taxa_chat, historia)
+        for modo in modos
+    }
+    imprimir(resultados)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arq:
+            json.dump(resultados, arq, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
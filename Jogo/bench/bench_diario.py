@@ -0,0 +1,133 @@
+# bench/bench_diario.py
+# Custo do diário (model/dao/diario.py): quanto cada operação do jogo fica mais lenta com ele
+# ligado, quantos registros cada fsync leva (group commit) e quanto tempo a recuperação leva
+# em função do tamanho do diário, refazendo só o diário ou partindo de um instantâneo.
+#
+# uso:
+#   python bench/bench_diario.py
+#   python bench/bench_diario.py --registros 1000 10000 100000 --saida diario.json
+
+import sys
+import os
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+import time
+
+# Adiciona o diretório raiz ao path para garantir que 'model' seja encontrado
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.salas import GerenciadorSalas
+from model.regras import RegrasSala
+from model.historia import HistoriaCompilada
+from model.dao.diario import Diario
+from bench.bench_motor import historia_grande
+
+HISTORIA = "bench"  #nome da história sintética no cache de histórias do gerenciador
+JOGADORES = 4
+SALAS = 10
+
+
+def gerenciador(historia):
+    salas = GerenciadorSalas(HISTORIA)
+    salas.historias[HISTORIA] = historia  #sem YAML: a mesma história compilada em todas as execuções
+    return salas
+
+
+def jogar(salas, registros):
+    """Joga em SALAS salas até o diário ter `registros` registros: votos, "Continuar" e chat."""
+    regras = RegrasSala(min_jogadores=JOGADORES)
+    motores = []
+    for s in range(SALAS):
+        sala_id = salas.criar_sala(f"sala{s}", regras=regras)
+        motor = salas.obter_sala(sala_id)
+        for j in range(JOGADORES):
+            motor.adicionar_jogador(f"j{j}")
+        if not motor.historia[motor.trecho_atual].opcoes:
+            for j in range(JOGADORES):
+                motor.registrar_pronto(f"j{j}")
+        motores.append(motor)
+
+    rodada = 0
+    inicio = time.perf_counter()
+    operacoes = 0
+    while salas.diario is None or salas.diario.lsn < registros:
+        for motor in motores:
+            for j in range(JOGADORES):
+                motor.registrar_voto(f"j{j}", 1 + (j + rodada) % 3)
+            for j in range(JOGADORES):
+                motor.registrar_pronto(f"j{j}")
+            motor.enviar_mensagem_chat("j0", f"mensagem da rodada {rodada}")
+            operacoes += 2 * JOGADORES + 1
+        rodada += 1
+        if salas.diario is None and operacoes >= registros:
+            break
+    return (time.perf_counter() - inicio) / operacoes
+
+
+def medir(historia, registros, diretorio, instantaneo):
+    shutil.rmtree(diretorio, ignore_errors=True)
+    salas = gerenciador(historia)
+    diario = Diario(diretorio, registros_por_instantaneo=registros * 10)
+    salas.usar_diario(diario)
+    por_operacao = jogar(salas, registros)
+    if instantaneo:
+        salas.gravar_instantaneo()
+    diario.parar()
+    lote = diario.registros_gravados / max(1, diario.fsyncs)
+
+    recuperadas = gerenciador(historia)
+    novo = Diario(diretorio)
+    recuperacao = recuperadas.usar_diario(novo)
+    novo.parar()
+
+    #a sala recuperada tem que estar na mesma rodada da original
+    for sala_id, motor in salas.salas.items():
+        copia = recuperadas.obter_sala(sala_id)
+        assert (copia.trecho_atual, copia.rodada, copia.chat.ultimo_seq) == \
+               (motor.trecho_atual, motor.rodada, motor.chat.ultimo_seq), sala_id
+
+    return {
+        "registros": diario.lsn,
+        "us_por_operacao": por_operacao * 1e6,
+        "registros_por_fsync": lote,
+        "bytes": recuperacao["bytes"],
+        "recuperacao_ms": recuperacao["segundos"] * 1000,
+        "registros_refeitos": recuperacao["registros"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo do diário e tempo de recuperação")
+    parser.add_argument("--registros", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="tamanhos do diário medidos")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  #mede o diário, não o console
+    historia = HistoriaCompilada(historia_grande(200))
+    diretorio = os.path.join(tempfile.gettempdir(), "bench_diario")
+
+    sem_diario = jogar(gerenciador(historia), max(args.registros)) * 1e6
+    print(f"sem diário: {sem_diario:.2f} µs/operação\n")
+    print(f"{'registros':>10}{'origem':>14}{'µs/op':>9}{'reg/fsync':>11}{'KB':>9}{'refeitos':>10}{'recup. ms':>11}")
+
+    resultados = {"sem_diario_us_por_operacao": sem_diario, "com_diario": []}
+    for registros in args.registros:
+        for instantaneo in (False, True):
+            r = medir(historia, registros, diretorio, instantaneo)
+            r["origem"] = "instantaneo" if instantaneo else "diario"
+            resultados["com_diario"].append(r)
+            print(f"{r['registros']:>10}{r['origem']:>14}{r['us_por_operacao']:>9.2f}{r['registros_por_fsync']:>11.0f}"
+                  f"{r['bytes'] / 1024:>9.0f}{r['registros_refeitos']:>10}{r['recuperacao_ms']:>11.1f}")
+    shutil.rmtree(diretorio, ignore_errors=True)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arq:
+            json.dump(resultados, arq, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# bench/bench_motor.py
+# Microbenchmarks dos métodos do MotorJogo chamados a cada requisição, com histórias
+# pequena e grande, chat vazio e cheio e salas de vários tamanhos.
+# Grava os resultados em JSON e, com --comparar, falha (código de saída 1) se algum
+# caso ficar mais lento que a execução de referência além da tolerância.
+#
+# uso:
+#   python bench/bench_motor.py --saida base.json
+#   python bench/bench_motor.py --comparar base.json --tolerancia 0.20
+
+import sys
+import os
+import argparse
+import json
+import logging
+import platform
+import random
+import subprocess
+import time
+
+# Adiciona o diretório raiz ao path para garantir que 'model' seja encontrado
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.motor_jogo import MotorJogo
+from model.historia import HistoriaCompilada
+
+JOGADORES = (4, 100, 1000, 10000)  #tamanhos de sala medidos
+TRECHOS_HISTORIA_GRANDE = 5000
+MENSAGENS_CHAT = 200  #chat cheio (limite padrão de retenção)
+
+
+def historia_grande(trechos=TRECHOS_HISTORIA_GRANDE, semente=1):
+    """História sintética com `trechos` trechos de ~2 KB e três opções cada."""
+    aleatorio = random.Random(semente)
+    ids = [f"trecho_{i}" for i in range(trechos)]
+    paragrafo = "Sob o sol carmesim, a areia queima e o vento canta nas dunas. " * 8
+    return {
+        trecho_id: {
+            "texto": "\n\n".join([paragrafo] * 4),
+            "opcoes": [
+                {"texto": f"Opção {n} de {trecho_id}", "proximo": aleatorio.choice(ids)}
+                for n in range(1, 4)
+            ],
+        }
+        for trecho_id in ids
+    }
+
+
+HISTORIAS = {
+    "pequena": lambda: HistoriaCompilada(MotorJogo.carregar_historia("historia.yaml")),
+    "grande": lambda: HistoriaCompilada(historia_grande()),
+}
+
+
+def preparar_motor(historia, jogadores, mensagens_chat=0):
+    """Sala com o jogo iniciado num trecho com opções."""
+    motor = MotorJogo(None, historia=historia)
+    for i in range(jogadores):
+        motor.jogadores_conectados[f"j{i}"] = {"conectado": True, "conexoes": 1}
+    motor.total_conectados = jogadores
+    motor.vazia_desde = None
+    motor.iniciar_jogo()
+    motor.jogo_iniciado = True
+    if not historia[motor.trecho_atual].opcoes:
+        motor.avancar_historia(historia[motor.trecho_atual].proximo)
+    for i in range(mensagens_chat):
+        motor.enviar_mensagem_chat(f"j{i % jogadores}", f"mensagem número {i}")
+    return motor
+
+
+def casos(historias):
+    """Gera (nome, função medida). Cada função executa a operação uma vez."""
+    for nome_historia, historia in historias.items():
+        motor = preparar_motor(historia, 4)
+        yield f"obter_trecho_atual[{nome_historia}]", motor.obter_trecho_atual
+
+        #alterna entre dois trechos com opções
+        destinos = [t for t in historia if historia[t].opcoes][:2]
+        motor_avanco = preparar_motor(historia, 4)
+
+        def avancar(motor=motor_avanco, destinos=destinos):
+            motor.avancar_historia(destinos[motor.trecho_atual == destinos[0]])
+        yield f"avancar_historia[{nome_historia}]", avancar
+
+    historia = historias["pequena"]
+    for jogadores in JOGADORES:
+        #votos e confirmações de todos menos um jogador: a rodada nunca fecha
+        motor = preparar_motor(historia, jogadores)
+        nomes = [f"j{i}" for i in range(jogadores - 1)]
+        proximo = iter(range(10 ** 12))
+
+        def votar(motor=motor, nomes=nomes, proximo=proximo):
+            i = next(proximo)
+            motor.registrar_voto(nomes[i % len(nomes)], i % 3 + 1)
+        yield f"registrar_voto[{jogadores} jogadores]", votar
+
+        def pronto(motor=motor, nomes=nomes, proximo=proximo):
+            motor.registrar_pronto(nomes[next(proximo) % len(nomes)])
+        yield f"registrar_pronto[{jogadores} jogadores]", pronto
+
+        #todos votaram com um vencedor único
+        motor_resultado = preparar_motor(historia, jogadores)
+        for i in range(jogadores):
+            motor_resultado.votos.registrar(f"j{i}", 1 if i % 3 != 2 else 2)
+        yield f"calcular_resultados[{jogadores} jogadores]", motor_resultado.calcular_resultados
+
+    for mensagens in (0, MENSAGENS_CHAT):
+        motor = preparar_motor(historia, 4, mensagens)
+        yield f"enviar_mensagem_chat[{mensagens} msgs]", lambda motor=motor: motor.enviar_mensagem_chat("j0", "olá")
+
+        motor = preparar_motor(historia, 4, mensagens)
+        yield f"obter_chat[{mensagens} msgs]", motor.obter_chat
+        yield f"obter_chat_desde[{mensagens} msgs]", lambda motor=motor: motor.obter_chat_desde(motor.chat.ultimo_seq - 5)
+
+
+def medir(funcao, tempo_alvo=0.2, repeticoes=5):
+    """ns por chamada: melhor de `repeticoes` lotes de ~tempo_alvo segundos."""
+    #calibra o tamanho do lote
+    lote = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(lote):
+            funcao()
+        decorrido = time.perf_counter() - inicio
+        if decorrido >= tempo_alvo / 10:
+            break
+        lote *= 10
+    lote = max(1, int(lote * (tempo_alvo / 10) / decorrido * 10))
+
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(lote):
+            funcao()
+        melhor = min(melhor, (time.perf_counter() - inicio) / lote)
+    return melhor * 1e9
+
+
+def commit_atual():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(resultados, referencia, tolerancia):
+    """Lista os casos mais lentos que a referência além da tolerância (ex.: 0.2 = 20%)."""
+    regressoes = []
+    for nome, atual in resultados.items():
+        base = referencia.get(nome)
+        if base is None:
+            continue
+        razao = atual["ns_por_op"] / base["ns_por_op"]
+        if razao > 1 + tolerancia:
+            regressoes.append((nome, base["ns_por_op"], atual["ns_por_op"], razao))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks do MotorJogo")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução de referência")
+    parser.add_argument("--tolerancia", type=float, default=0.20, help="piora máxima aceita (0.2 = 20%%)")
+    parser.add_argument("--filtro", default="", help="só roda casos cujo nome contém este texto")
+    parser.add_argument("--tempo", type=float, default=0.2, help="segundos por lote")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  #mede o motor, não o console
+
+    historias = {nome: criar() for nome, criar in HISTORIAS.items()}
+    resultados = {}
+    for nome, funcao in casos(historias):
+        if args.filtro not in nome:
+            continue
+        ns = medir(funcao, args.tempo)
+        resultados[nome] = {"ns_por_op": ns}
+        print(f"{nome:<42}{ns / 1000:>12.2f} µs/op")
+
+    relatorio = {
+        "commit": commit_atual(),
+        "python": platform.python_version(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "resultados": resultados,
+    }
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arq:
+            json.dump(relatorio, arq, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arq:
+            referencia = json.load(arq)["resultados"]
+        regressoes = comparar(resultados, referencia, args.tolerancia)
+        for nome, base, atual, razao in regressoes:
+            print(f"REGRESSÃO {nome}: {base / 1000:.2f} -> {atual / 1000:.2f} µs/op ({razao:.2f}x)")
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# bench/bench_protocolo.py
+# Compara, por RPyC, o protocolo antigo (dict e list que chegam ao cliente como netref, então
+# cada `in`, `[]` e cada item percorrido é outra ida e volta) com o atual, em que toda resposta
+# é um valor simples (tuplas de pares), com e sem o ServicoRemoto do cliente (que guarda os
+# métodos remotos: sem ele cada chamada ainda busca o atributo no servidor antes de chamá-lo).
+# Mede latência por operação do cliente e quantas mensagens o cliente enviou para fazê-la.
+#
+# uso:
+#   python bench/bench_protocolo.py
+#   python bench/bench_protocolo.py --iteracoes 2000 --mensagens-chat 200 --saida protocolo.json
+
+import sys
+import os
+import argparse
+import json
+import logging
+import threading
+import time
+
+# Adiciona o diretório raiz ao path para garantir que 'controller' seja encontrado
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rpyc
+from rpyc.utils.server import ThreadedServer
+
+from controller.servidor_controller import JogoService, salas
+from controller.servico_remoto import ServicoRemoto
+from model.motor_jogo import MotorJogo
+from model.historia import HistoriaCompilada
+from model.regras import RegrasSala
+from bench.bench_motor import historia_grande
+
+MODOS = ("netref", "valor", "valor_cache")
+
+
+class JogoServiceNetref(JogoService):
+    """Respostas como eram antes: containers mutáveis, que o RPyC entrega por referência."""
+
+    def exposed_obter_opcoes(self):
+        return {str(i + 1): texto for i, texto in enumerate(self._motor().obter_opcoes())}
+
+    def exposed_confirmar_continuar(self, nome_jogador):
+        return self._confirmar_continuar(nome_jogador)
+
+    def exposed_obter_chat(self, formatado=True):
+        return list(self._motor().obter_chat(formatado))
+
+
+def preparar_sala(sala_id, mensagens_chat):
+    #um jogador, num trecho com três opções, com o chat já cheio
+    historia = HistoriaCompilada(historia_grande(20))
+    motor = MotorJogo(None, historia=historia, regras=RegrasSala(min_jogadores=1))
+    salas.salas[sala_id] = motor
+    motor.adicionar_jogador("j0")
+    if not historia[motor.trecho_atual].opcoes:
+        motor.avancar_historia(historia[motor.trecho_atual].proximo)
+    for i in range(mensagens_chat):
+        motor.enviar_mensagem_chat("j0", f"mensagem número {i}")
+    return motor
+
+
+def operacoes(servico, modo):
+    """(nome, função) com o padrão de acesso do cliente a cada resposta."""
+    converter = (lambda resposta: resposta) if modo == "netref" else dict
+
+    def opcoes():
+        #como o cliente antigo montava os botões: `in` e `[]` para cada opção
+        opcoes = converter(servico.obter_opcoes())
+        return [opcoes[str(i)] for i in range(1, 4) if str(i) in opcoes]
+
+    def continuar():
+        resposta = converter(servico.confirmar_continuar("j0"))
+        return resposta["acao"], resposta["mensagem"]
+
+    def chat():
+        return [f"{jogador}: {mensagem}" for jogador, mensagem in servico.obter_chat(False)]
+
+    return (("obter_opcoes", opcoes), ("confirmar_continuar", continuar), ("obter_chat(False)", chat))
+
+
+def contar_envios(conn):
+    #conta as mensagens que o cliente envia ao servidor (pedidos e liberação de netrefs)
+    contagem = [0]
+    enviar = conn._send
+
+    def _send(*args):
+        contagem[0] += 1
+        return enviar(*args)
+
+    conn._send = _send
+    return contagem
+
+
+def executar(modo, iteracoes, mensagens_chat):
+    servico_cls = JogoServiceNetref if modo == "netref" else JogoService
+    servidor = ThreadedServer(servico_cls, hostname="localhost", port=0,
+                              protocol_config={"allow_public_attrs": False})
+    threading.Thread(target=servidor.start, daemon=True).start()
+    time.sleep(0.2)
+
+    sala_id = f"bench_{modo}"
+    preparar_sala(sala_id, mensagens_chat)
+
+    conn = rpyc.connect("localhost", servidor.port)
+    servico = ServicoRemoto(conn.root) if modo == "valor_cache" else conn.root
+    servico.entrar_no_jogo("j0", sala_id)
+    envios = contar_envios(conn)
+
+    resultados = {}
+    for nome, funcao in operacoes(servico, modo):
+        funcao()  #aquecimento (e cache de classes de netref do RPyC)
+        latencias = []
+        antes = envios[0]
+        for _ in range(iteracoes):
+            inicio = time.perf_counter()
+            funcao()
+            latencias.append(time.perf_counter() - inicio)
+        latencias.sort()
+        resultados[nome] = {
+            "p50_us": latencias[len(latencias) // 2] * 1e6,
+            "p99_us": latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1e6,
+            "mensagens": (envios[0] - antes) / iteracoes,
+        }
+
+    conn.close()
+    servidor.close()
+    salas.remover_sala(sala_id)
+    return resultados
+
+
+def imprimir(resultados):
+    print(f"{'operação':<22}{'modo':<13}{'p50 µs':>10}{'p99 µs':>10}{'msgs/op':>10}")
+    operacoes_medidas = next(iter(resultados.values()))
+    for operacao in operacoes_medidas:
+        for modo, valores in resultados.items():
+            v = valores[operacao]
+            print(f"{operacao:<22}{modo:<13}{v['p50_us']:>10.1f}{v['p99_us']:>10.1f}{v['mensagens']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Protocolo por netref x por valor (RPyC)")
+    parser.add_argument("--iteracoes", type=int, default=1000, help="chamadas medidas por operação")
+    parser.add_argument("--mensagens-chat", type=int, default=50, help="mensagens no chat da sala")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  #mede o protocolo, não o console
+
+    resultados = {modo: executar(modo, args.iteracoes, args.mensagens_chat) for modo in MODOS}
+    imprimir(resultados)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arq:
+            json.dump(resultados, arq, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# bench/bench_replicacao.py
+# Custo da replicação primário/reserva (controller/replicacao.py) e tempo de assumir:
+#  - por mutação, no motor: µs por operação sem diário, com o diário só em memória (a base da
+#    replicação) e com reservas conectados, mais quanto o reserva leva para alcançar o primário
+#    (aqui os reservas rodam no mesmo processo e disputam o GIL: o custo real é o da RPC);
+#  - por mutação, na RPC: latência de enviar_mensagem num servidor sem reserva e num com
+#    reservas, cada um num processo;
+#  - assumir: o primário morre (kill -9) e mede-se quanto tempo um cliente leva para retomar a
+#    sessão no reserva, conferindo que o chat replicado chegou inteiro.
+#
+# uso:
+#   python bench/bench_replicacao.py
+#   python bench/bench_replicacao.py --reservas 1 2 --espera-assumir 0.2 1.0 --saida replicacao.json
+
+import sys
+import os
+import argparse
+import json
+import logging
+import socket
+import subprocess
+import threading
+import time
+
+# Adiciona o diretório raiz ao path para garantir que 'controller' seja encontrado
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rpyc
+
+from controller.replicacao import Primario, Replica
+from controller.servico_remoto import ServicoRemoto
+from model.historia import HistoriaCompilada
+from model.dao.diario import Diario
+from bench.bench_motor import historia_grande
+from bench.bench_diario import gerenciador, jogar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+# --- no motor (um processo) ---
+def medir_motor(historia, operacoes, reservas):
+    """µs por operação com o diário em memória e `reservas` reservas (threads neste processo)."""
+    salas = gerenciador(historia)
+    diario = Diario()
+    salas.usar_diario(diario)
+    primario = Primario(salas, diario, 0, host="localhost")
+    primario.iniciar()
+
+    replicas = []
+    for _ in range(reservas):
+        replica = Replica(gerenciador(historia), [("localhost", primario.porta)])
+        threading.Thread(target=replica.seguir, daemon=True).start()
+        replicas.append(replica)
+    while len(primario.replicas) < reservas or any(not r.sincronizada for r in replicas):
+        time.sleep(0.01)
+
+    por_operacao = jogar(salas, operacoes)
+    fim = time.perf_counter()
+    while any(r.lsn < diario.lsn for r in replicas):
+        time.sleep(0.001)
+    alcance = time.perf_counter() - fim
+
+    for replica in replicas:
+        for sala_id, motor in salas.salas.items():
+            copia = replica.salas.obter_sala(sala_id)
+            assert (copia.trecho_atual, copia.rodada, copia.chat.ultimo_seq) == \
+                   (motor.trecho_atual, motor.rodada, motor.chat.ultimo_seq), sala_id
+    primario.parar()
+    return {"reservas": reservas, "us_por_operacao": por_operacao * 1e6, "alcance_ms": alcance * 1000}
+
+
+# --- entre processos ---
+class Servidores:
+    """Um primário e `reservas` reservas (cada um com a porta de replicação aberta para os
+    seguintes), cada um em seu processo.
+    """
+
+    def __init__(self, reservas, espera_assumir, modo):
+        self.portas = [porta_livre() for _ in range(reservas + 1)]
+        self.replicacao = [porta_livre() for _ in range(reservas + 1)]
+        self.processos = []
+        fontes = []
+        for porta, replicacao in zip(self.portas, self.replicacao):
+            args = ["--porta", str(porta), "--modo", modo, "--espera-assumir", str(espera_assumir)]
+            if reservas:
+                args += ["--replicacao-porta", str(replicacao)]
+            for fonte in fontes:
+                args += ["--reserva-de", f"localhost:{fonte}"]
+            self.processos.append(subprocess.Popen(
+                [sys.executable, os.path.join("run", "servidor_run.py"), *args], cwd=RAIZ,
+                env=dict(os.environ, PYTHONPATH=RAIZ), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            ))
+            fontes.append(replicacao)
+            if not reservas:
+                break
+
+    def conectar(self, modo, indice=0, prazo=10.0):
+        limite = time.monotonic() + prazo
+        while True:
+            try:
+                if modo == "async":
+                    from controller.protocolo_json import ConexaoJson
+                    conn = ConexaoJson("localhost", self.portas[indice])
+                else:
+                    conn = rpyc.connect("localhost", self.portas[indice])
+                return conn, ServicoRemoto(conn.root)
+            except OSError:
+                if time.monotonic() > limite:
+                    raise
+                time.sleep(0.005)
+
+    def parar(self):
+        for processo in self.processos:
+            processo.kill()
+            processo.wait()
+
+
+def medir_processos(reservas, espera_assumir, modo, chamadas):
+    servidores = Servidores(reservas, espera_assumir, modo)
+    try:
+        conn, servico = servidores.conectar(modo)
+        token = dict(servico.entrar_no_jogo("j0"))["token"]
+        time.sleep(0.5)  #os reservas recebem o estado inicial
+
+        latencias = []
+        for i in range(chamadas):
+            inicio = time.perf_counter()
+            servico.enviar_mensagem("j0", f"mensagem {i}")
+            latencias.append(time.perf_counter() - inicio)
+        resultado = {
+            "reservas": reservas,
+            "p50_us": percentil(latencias, 0.5) * 1e6,
+            "p99_us": percentil(latencias, 0.99) * 1e6,
+        }
+        if not reservas:
+            return resultado
+
+        esperado = len(servico.obter_chat(False))
+        time.sleep(0.05)  #replicação assíncrona: dá tempo de a última mensagem sair
+        queda = time.perf_counter()
+        servidores.processos[0].kill()
+        conn2, servico2 = servidores.conectar(modo, 1)
+        estado = dict(servico2.retomar_sessao(token, "principal", 0, False))
+        resultado["assumir_ms"] = (time.perf_counter() - queda) * 1000
+        resultado["chat_replicado"] = len(estado["chat"]) == esperado
+        return resultado
+    finally:
+        servidores.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo da replicação e tempo de assumir")
+    parser.add_argument("--operacoes", type=int, default=50000, help="operações no motor por medida")
+    parser.add_argument("--chamadas", type=int, default=2000, help="RPCs medidas entre processos")
+    parser.add_argument("--reservas", type=int, nargs="+", default=[1, 2], help="quantidades de reservas medidas")
+    parser.add_argument("--espera-assumir", type=float, nargs="+", default=[0.2, 1.0],
+                        help="valores de --espera-assumir do reserva medidos")
+    parser.add_argument("--modo", choices=("threaded", "async"), default="threaded")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  #mede a replicação, não o console
+    historia = HistoriaCompilada(historia_grande(200))
+    resultados = {"motor": [], "rpc": [], "assumir": []}
+
+    sem_diario = jogar(gerenciador(historia), args.operacoes) * 1e6
+    resultados["motor_sem_diario_us_por_operacao"] = sem_diario
+    print(f"motor sem diário: {sem_diario:.2f} µs/operação")
+    print(f"{'reservas':>10}{'µs/op':>9}{'alcance ms':>12}")
+    for reservas in [0] + args.reservas:
+        r = medir_motor(historia, args.operacoes, reservas)
+        resultados["motor"].append(r)
+        print(f"{reservas:>10}{r['us_por_operacao']:>9.2f}{r['alcance_ms']:>12.1f}")
+
+    print(f"\nenviar_mensagem por RPC ({args.modo}):")
+    print(f"{'reservas':>10}{'p50 µs':>10}{'p99 µs':>10}")
+    for reservas in [0] + args.reservas:
+        r = medir_processos(reservas, max(args.espera_assumir), args.modo, args.chamadas)
+        resultados["rpc"].append(r)
+        print(f"{reservas:>10}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}")
+
+    print("\nassumir (kill -9 no primário até o cliente retomar a sessão no reserva):")
+    print(f"{'espera s':>10}{'assumir ms':>12}{'chat ok':>9}")
+    for espera in args.espera_assumir:
+        r = medir_processos(1, espera, args.modo, 100)
+        r["espera_assumir"] = espera
+        resultados["assumir"].append(r)
+        print(f"{espera:>10.1f}{r['assumir_ms']:>12.0f}{str(r['chat_replicado']):>9}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arq:
+            json.dump(resultados, arq, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
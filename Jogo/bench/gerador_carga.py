@@ -0,0 +1,359 @@
+# bench/gerador_carga.py
+# Gerador de carga sem interface: conecta N jogadores simulados (bots) ao servidor,
+# que entram em salas, acompanham o jogo como o cliente real, votam, clicam em
+# "Continuar" e conversam no chat. No fim mostra latência por RPC (p50/p90/p99),
+# vazão e taxa de erros, e pode falhar (código de saída 1) se passar dos limites.
+#
+# uso (com o servidor rodando com --token-admin, para o gerador criar e remover as salas):
+#   python bench/gerador_carga.py --token-admin segredo --salas 50 --jogadores 4 --duracao 60 --atualizacao push
+#   python bench/gerador_carga.py --modo async --atualizacao delta --saida carga.json --max-p99-ms 50
+
+import sys
+import os
+import argparse
+import json
+import random
+import threading
+import time
+
+# Adiciona o diretório raiz ao path para garantir que 'controller' seja encontrado
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rpyc
+
+from controller.protocolo_json import ConexaoJson
+from controller.servico_remoto import ServicoRemoto
+from controller.cache_trechos import CacheTrechos
+
+INTERVALO_BATIMENTO = 5.0  #segundos entre sinais de vida de cada bot
+
+
+class Estatisticas:
+    """Latências e erros por RPC, somados de todos os bots."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias = {}  #metodo -> lista de segundos
+        self.erros = {}  #metodo -> quantidade
+
+    def registrar(self, metodo, segundos, erro=False):
+        with self.lock:
+            self.latencias.setdefault(metodo, []).append(segundos)
+            if erro:
+                self.erros[metodo] = self.erros.get(metodo, 0) + 1
+
+    @staticmethod
+    def _percentil(ordenadas, p):
+        indice = min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))
+        return ordenadas[indice]
+
+    def resumo(self, duracao):
+        """Resumo por método: chamadas, erros, chamadas/s e percentis em ms."""
+        resumo = {}
+        with self.lock:
+            for metodo, latencias in sorted(self.latencias.items()):
+                ordenadas = sorted(latencias)
+                resumo[metodo] = {
+                    "chamadas": len(ordenadas),
+                    "erros": self.erros.get(metodo, 0),
+                    "por_segundo": len(ordenadas) / duracao,
+                    "p50_ms": self._percentil(ordenadas, 50) * 1000,
+                    "p90_ms": self._percentil(ordenadas, 90) * 1000,
+                    "p99_ms": self._percentil(ordenadas, 99) * 1000,
+                    "max_ms": ordenadas[-1] * 1000,
+                }
+        return resumo
+
+
+def conectar(args):
+    if args.modo == "async":
+        return ConexaoJson(args.host, args.porta)
+    return rpyc.connect(args.host, args.porta)
+
+
+class Bot(threading.Thread):
+    """Jogador simulado. Atualização do estado como o cliente escolhido:
+    poll  -> obter_trecho + obter_chat + obter_opcoes + obter_status_votacao a cada intervalo (cliente antigo)
+    lote  -> as mesmas leituras do poll numa só chamada ler_lote a cada intervalo
+    delta -> obter_estado_desde(versao) a cada intervalo
+    espera -> aguardar_mudanca(versao, intervalo) em seguida (long-poll): responde assim que o estado muda
+    push  -> inscrever(callback) e reagir aos eventos, sem consultas periódicas
+    Com --cache-trechos o texto dos trechos vem do cache do bot: o servidor manda o hash e o
+    texto só é buscado (obter_texto_trecho) na primeira vez que o bot vê o trecho.
+    """
+
+    def __init__(self, nome, sala_id, args, estatisticas, fim):
+        super().__init__(daemon=True)
+        self.nome = nome
+        self.sala_id = sala_id
+        self.args = args
+        self.estatisticas = estatisticas
+        self.fim = fim  #time.monotonic() em que o teste termina
+        self.aleatorio = random.Random(f"{args.semente}-{nome}")
+
+        #estado observado do jogo
+        self.trecho = None
+        self.total_opcoes = 0
+        self.votacao_encerrada = False  #resultado calculado: hora de clicar em "Continuar"
+        self.votacao_reiniciada = False  #empate: votar de novo
+        self.versao = 0
+        self.jogo_iniciado = False
+
+        #ações da rodada atual
+        self.votou = False
+        self.continuou = False
+        self.hora_voto = 0.0
+        self.proximo_chat = 0.0
+        self.proximo_batimento = 0.0  #sinal de vida, como o cliente (o servidor derruba bots calados)
+
+        self.conexao = None
+        self.servidor_bg = None  #atende os callbacks no modo push com RPyC
+        self.trechos = CacheTrechos() if args.cache_trechos else None  #cada bot é um cliente com seu cache
+
+    def chamar(self, metodo, *args, pos=None):
+        #executa uma RPC medindo a latência (pos: acesso ao resultado que também custa ida e volta)
+        inicio = time.perf_counter()
+        try:
+            resultado = getattr(self.servico, metodo)(*args)
+            if pos is not None:
+                resultado = pos(resultado)
+        except Exception:
+            self.estatisticas.registrar(metodo, time.perf_counter() - inicio, erro=True)
+            raise
+        self.estatisticas.registrar(metodo, time.perf_counter() - inicio)
+        return resultado
+
+    # --- observação do estado ---
+    def receber_evento(self, evento, dados):
+        dados = dict(dados)
+        if evento == "jogo_iniciado":
+            self.jogo_iniciado = True
+            self.trecho = None  #força a leitura do trecho inicial
+        elif evento == "trecho":
+            self.trecho = None
+        elif evento == "resultado":
+            if dados["empate"]:
+                self.votacao_reiniciada = True
+            else:
+                self.votacao_encerrada = True
+
+    def observar(self):
+        modo = self.args.atualizacao
+        if modo == "poll":
+            self.jogo_iniciado = self.chamar("obter_jogo_iniciado")
+            if self.trechos is None:
+                trecho = self.chamar("obter_trecho")
+            else:
+                hash_trecho = self.chamar("obter_hash_trecho")
+                trecho = self._texto(hash_trecho) if hash_trecho else self.chamar("obter_trecho")
+            self.chamar("obter_chat")
+            self.total_opcoes = self.chamar("obter_opcoes", pos=len)
+            self._status(self.chamar("obter_status_votacao"), trecho)
+
+        elif modo == "lote":
+            leitura_trecho = "obter_trecho" if self.trechos is None else "obter_hash_trecho"
+            versao, (self.jogo_iniciado, trecho, _, opcoes, status) = self.chamar(
+                "ler_lote", ("obter_jogo_iniciado", leitura_trecho, "obter_chat", "obter_opcoes",
+                             "obter_status_votacao"))
+            if self.trechos is not None and trecho:
+                trecho = self._texto(trecho)
+            self.total_opcoes = len(opcoes)
+            self._status(status, trecho)
+
+        elif modo in ("delta", "espera"):
+            if modo == "delta":
+                estado = self.chamar("obter_estado_desde", self.versao, self.trechos is None,
+                                     pos=lambda e: e and dict(e))
+            else:
+                #o prazo é o próprio intervalo: sem mudança, o bot ainda vota e conversa no tempo dele
+                estado = self.chamar("aguardar_mudanca", self.versao, self.args.intervalo, self.trechos is None,
+                                     pos=lambda e: e and dict(e))
+            if estado:
+                self.versao = estado["versao"]
+                self.jogo_iniciado = estado.get("jogo_iniciado", self.jogo_iniciado)
+                trecho = self.trecho
+                if "opcoes" in estado:
+                    self.total_opcoes = len(estado["opcoes"])
+                    trecho = self._texto_estado(estado)
+                self._status(estado.get("status_votacao", ""), trecho)
+
+        elif self.jogo_iniciado and self.trecho is None:
+            #push: só busca o estado quando um evento avisou que o trecho mudou
+            estado = dict(self.chamar("obter_estado_desde", 0, self.trechos is None))
+            self.versao = estado["versao"]
+            self.total_opcoes = len(estado["opcoes"])
+            self._novo_trecho(self._texto_estado(estado))
+
+    def _texto(self, hash_trecho):
+        return self.trechos.texto(hash_trecho, lambda h: self.chamar("obter_texto_trecho", h))
+
+    def _texto_estado(self, estado):
+        if "trecho" in estado:
+            return estado["trecho"]
+        return self._texto(estado["hash_trecho"])
+
+    def _status(self, status, trecho):
+        if trecho != self.trecho:
+            self._novo_trecho(trecho)
+        if status.startswith(("Todos os jogadores já votaram", "Quórum de votos atingido")):
+            self.votacao_encerrada = True
+        elif status.startswith("Nenhum voto") and self.votou:
+            self.votacao_reiniciada = True  #votos zerados no mesmo trecho: empate
+
+    def _novo_trecho(self, trecho):
+        self.trecho = trecho
+        self.votou = self.continuou = False
+        self.votacao_encerrada = self.votacao_reiniciada = False
+        self.hora_voto = time.monotonic() + self.aleatorio.uniform(0, self.args.atraso_voto)
+
+    # --- ações ---
+    def agir(self):
+        agora = time.monotonic()
+
+        if self.votacao_reiniciada:
+            self.votou = self.votacao_reiniciada = False
+
+        if self.total_opcoes and not self.votou and agora >= self.hora_voto:
+            opcao = self.aleatorio.randint(1, self.total_opcoes)
+            resultado = self.chamar("registrar_voto", self.nome, str(opcao))
+            self.votou = True
+            if "venceu" in resultado:
+                self.votacao_encerrada = True
+
+        if (not self.total_opcoes or self.votacao_encerrada) and not self.continuou:
+            self.chamar("confirmar_continuar", self.nome, pos=lambda r: dict(r)["acao"])
+            self.continuou = True
+
+        if self.args.taxa_chat and agora >= self.proximo_chat:
+            if self.proximo_chat:
+                self.chamar("enviar_mensagem", self.nome, f"mensagem de {self.nome}")
+            self.proximo_chat = agora + self.aleatorio.expovariate(self.args.taxa_chat)
+
+    def run(self):
+        try:
+            self.conexao = conectar(self.args)
+            self.servico = ServicoRemoto(self.conexao.root)
+            if self.args.atualizacao == "push" and self.args.modo == "threaded":
+                self.servidor_bg = rpyc.BgServingThread(self.conexao)
+
+            self.chamar("entrar_no_jogo", self.nome, self.sala_id)
+            if self.args.atualizacao == "push":
+                self.chamar("inscrever", self.receber_evento)
+                self.jogo_iniciado = self.chamar("obter_jogo_iniciado")
+
+            intervalo = {"push": 0.05, "espera": 0.0}.get(self.args.atualizacao, self.args.intervalo)
+            while time.monotonic() < self.fim:
+                self.observar()
+                if self.jogo_iniciado and self.trecho is not None:
+                    self.agir()
+                if time.monotonic() >= self.proximo_batimento:
+                    self.chamar("batimento")
+                    self.proximo_batimento = time.monotonic() + INTERVALO_BATIMENTO
+                time.sleep(intervalo)
+
+        except Exception as e:
+            if time.monotonic() < self.fim:
+                print(f"[{self.nome}] encerrado por erro: {e}")
+        finally:
+            if self.servidor_bg is not None:
+                self.servidor_bg.stop()
+            if self.conexao is not None:
+                self.conexao.close()
+
+
+def executar(args):
+    """Cria as salas, roda os bots pela duração pedida e devolve o resumo."""
+    admin = conectar(args)
+    if not admin.root.autenticar_admin(args.token_admin):
+        admin.close()
+        raise SystemExit("Token de administração recusado: inicie o servidor com o mesmo --token-admin.")
+    salas = [f"carga-{args.semente}-{i}" for i in range(args.salas)]
+    regras = (("min_jogadores", args.jogadores), ("quorum_votacao", args.quorum_votacao))
+    for sala_id in salas:
+        admin.root.criar_sala(sala_id, regras)
+
+    estatisticas = Estatisticas()
+    inicio = time.monotonic()
+    fim = inicio + args.duracao
+    bots = [
+        Bot(f"bot{s}-{j}", sala_id, args, estatisticas, fim)
+        for s, sala_id in enumerate(salas)
+        for j in range(args.jogadores)
+    ]
+    for bot in bots:
+        bot.start()
+    for bot in bots:
+        bot.join(timeout=max(0.0, fim - time.monotonic()) + 5)
+    duracao = time.monotonic() - inicio
+
+    for sala_id in salas:
+        admin.root.remover_sala(sala_id)
+    admin.close()
+
+    resumo = estatisticas.resumo(duracao)
+    chamadas = sum(m["chamadas"] for m in resumo.values())
+    erros = sum(m["erros"] for m in resumo.values())
+    return {
+        "config": vars(args),
+        "duracao_s": duracao,
+        "bots": len(bots),
+        "chamadas": chamadas,
+        "chamadas_por_segundo": chamadas / duracao,
+        "taxa_erros": erros / chamadas if chamadas else 0.0,
+        "metodos": resumo,
+    }
+
+
+def imprimir(relatorio):
+    print(f"\n{relatorio['bots']} bots, {relatorio['duracao_s']:.1f} s, "
+          f"{relatorio['chamadas_por_segundo']:.0f} chamadas/s, erros: {relatorio['taxa_erros']:.2%}\n")
+    print(f"{'método':<24}{'chamadas':>10}{'/s':>9}{'erros':>7}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for metodo, m in relatorio["metodos"].items():
+        print(f"{metodo:<24}{m['chamadas']:>10}{m['por_segundo']:>9.1f}{m['erros']:>7}"
+              f"{m['p50_ms']:>9.2f}{m['p90_ms']:>9.2f}{m['p99_ms']:>9.2f}{m['max_ms']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de carga do servidor do jogo")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--porta", type=int, default=18812)
+    parser.add_argument("--token-admin", default=os.environ.get("JOGO_TOKEN_ADMIN"),
+                        help="senha de administração do servidor (cria e remove as salas da carga)")
+    parser.add_argument("--modo", choices=("threaded", "async"), default="threaded",
+                        help="protocolo do servidor (RPyC ou JSON do servidor asyncio)")
+    parser.add_argument("--atualizacao", choices=("poll", "lote", "delta", "espera", "push"), default="push",
+                        help="como os bots acompanham o jogo")
+    parser.add_argument("--salas", type=int, default=10)
+    parser.add_argument("--jogadores", type=int, default=4, help="jogadores por sala (a sala começa com todos)")
+    parser.add_argument("--quorum-votacao", type=float, default=1.0, help="fração dos votos que encerra a votação")
+    parser.add_argument("--duracao", type=float, default=30.0, help="segundos")
+    parser.add_argument("--intervalo", type=float, default=1.0, help="intervalo de consulta (poll/lote/delta) ou prazo do long-poll (espera)")
+    parser.add_argument("--atraso-voto", type=float, default=2.0, help="atraso máximo antes de votar (s)")
+    parser.add_argument("--taxa-chat", type=float, default=0.1, help="mensagens por segundo por bot")
+    parser.add_argument("--cache-trechos", action="store_true",
+                        help="bots recebem o hash do trecho e só buscam o texto que não têm em cache")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--saida", help="grava o relatório em JSON")
+    parser.add_argument("--max-p99-ms", type=float, help="falha se algum método passar deste p99")
+    parser.add_argument("--max-erros", type=float, default=0.0, help="taxa de erros máxima (0..1)")
+    args = parser.parse_args()
+
+    relatorio = executar(args)
+    imprimir(relatorio)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arq:
+            json.dump(relatorio, arq, indent=2, ensure_ascii=False)
+
+    #portão de regressão
+    falhou = relatorio["taxa_erros"] > args.max_erros
+    if args.max_p99_ms is not None:
+        lentos = [m for m, r in relatorio["metodos"].items() if r["p99_ms"] > args.max_p99_ms]
+        if lentos:
+            print(f"\np99 acima de {args.max_p99_ms} ms: {', '.join(lentos)}")
+            falhou = True
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
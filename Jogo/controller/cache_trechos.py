@@ -0,0 +1,73 @@
+# controller/cache_trechos.py
+# Cache de trechos do cliente, endereçado pelo conteúdo: o servidor manda só o hash do trecho
+# e o texto (que nunca muda) cruza a rede uma vez por cliente, ou uma vez por máquina com o
+# cache em disco, em vez de a cada atualização.
+import os
+
+from model.historia import hash_texto
+
+
+class CacheTrechos:
+    """Textos de trechos por hash, em memória e opcionalmente num diretório em disco
+    (um arquivo por trecho, reaproveitado entre sessões). Um arquivo cujo conteúdo não
+    bate com o hash do nome é ignorado e buscado de novo.
+    """
+
+    def __init__(self, diretorio: str = None):
+        self.textos = {}  #hash -> texto
+        self.diretorio = diretorio
+        self.acertos = 0
+        self.faltas = 0
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, hash_trecho: str) -> str:
+        return os.path.join(self.diretorio, f"{hash_trecho}.txt")
+
+    def _ler_disco(self, hash_trecho: str):
+        if not self.diretorio or not hash_trecho.isalnum():
+            return None
+        try:
+            with open(self._caminho(hash_trecho), encoding="utf-8", newline="") as arq:
+                texto = arq.read()
+        except OSError:
+            return None
+        return texto if hash_texto(texto) == hash_trecho else None
+
+    def _gravar_disco(self, hash_trecho: str, texto: str):
+        if not self.diretorio or not hash_trecho.isalnum():
+            return
+        destino = self._caminho(hash_trecho)
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8", newline="") as arq:
+                arq.write(texto)
+            os.replace(temporario, destino)  #troca atômica: outro cliente nunca lê um trecho pela metade
+        except OSError as e:
+            print(f"[Cliente] Não foi possível gravar o trecho em cache ({destino}): {e}")
+
+    def obter(self, hash_trecho: str):
+        """Texto do trecho, ou None se ele não estiver em cache."""
+        texto = self.textos.get(hash_trecho)
+        if texto is None:
+            texto = self._ler_disco(hash_trecho)
+            if texto is not None:
+                self.textos[hash_trecho] = texto
+        return texto
+
+    def guardar(self, hash_trecho: str, texto: str):
+        self.textos[hash_trecho] = texto
+        self._gravar_disco(hash_trecho, texto)
+
+    def texto(self, hash_trecho: str, buscar):
+        """Texto do trecho pelo cache; numa falta chama buscar(hash_trecho) (uma RPC) e guarda."""
+        texto = self.obter(hash_trecho)
+        if texto is not None:
+            self.acertos += 1
+            return texto
+
+        self.faltas += 1
+        texto = buscar(hash_trecho)
+        if texto is not None:
+            self.guardar(hash_trecho, texto)
+        return texto
@@ -1,20 +1,30 @@
 # controller/controller_cliente.py
 import tkinter as tk
 from tkinter import messagebox
-import threading
-import time
+import queue
 import rpyc
 
+from controller.protocolo_json import ConexaoJson
+from controller.servico_remoto import ServicoRemoto
+from controller.cache_trechos import CacheTrechos
+from controller.trabalhador_rede import TrabalhadorRede
+from model.chat import LIMITE_TAMANHO_MENSAGEM
+
 #importa telas da view
 from view.prejogo.nome_jogador import Toplevel1 as TelaNome
 from view.prejogo.aguardando_jogadores import Toplevel1 as TelaAguardando
 from view.jogo_interface import Jogo as TelaJogo
 
+INTERVALO_BATIMENTO_MS = 5000  #sinal de vida para o servidor (ele derruba quem fica 15 s calado)
+INTERVALO_RECONEXAO_MS = 2000  #espera entre tentativas de reconectar depois de uma queda
+LIMITE_LINHAS_CHAT = 500  #linhas mantidas no widget do chat (as mais antigas saem)
+LIMITE_LINHAS_STATUS = 200  #linhas mantidas na área de status da votação
+
 
 class ClienteApp:
     #controller principal do cliente, gerencia telas e comunicação RPyC
 
-    def __init__(self):
+    def __init__(self, sala_id="principal", modo="threaded", cache_trechos=None, servidores=None):
         #cria a janela raiz do Tkinter e a esconde imediatamente
         self.root = tk.Tk()
         self.root.withdraw()
@@ -22,23 +32,148 @@ class ClienteApp:
         self.conn = None
         self.servico = None
         self.jogador = None
+        self.sala_id = sala_id  #sala do servidor em que o jogador vai entrar
+        self.modo = modo  #"threaded" (RPyC) ou "async" (servidor asyncio, protocolo JSON)
+        self.servidores = servidores or [("localhost", 18812)]  #(host, porta): o primário e seus reservas
+        self.servidor_atual = 0  #índice em self.servidores do último servidor que atendeu
+        self.eventos = queue.Queue()  #eventos enviados pelo servidor, consumidos no thread do Tk
+        self.respostas = queue.Queue()  #resultados das chamadas de rede, consumidos no thread do Tk
+        self.rede = TrabalhadorRede(self.respostas)  #único thread que fala com o servidor depois de conectar
+        self.servidor_bg = None  #thread que atende os callbacks vindos do servidor
+        self.versao = 0  #última versão do estado do jogo recebida do servidor
+        self.regras = {}  #tamanho e quóruns da sala (RegrasSala.como_pares do servidor)
+        self.token = None  #token de retomada recebido ao entrar (volta à sessão se a conexão cair)
+        self.trechos = CacheTrechos(cache_trechos)  #textos dos trechos por hash (diretório opcional em disco)
+
+        #o que está desenhado na tela do jogo: só redesenha o que mudou
+        self.hash_exibido = None  #hash do trecho exibido em STHistoria
+        self.opcoes = None  #textos das opções nos botões (None = botões ainda não configurados)
+
+        #sincronização em andamento no thread de rede (uma por vez, para não aplicar deltas repetidos)
+        self.sincronizando = False
+        self.sincronizar_de_novo = False  #algo mudou enquanto a sincronização estava em andamento
+        self.depois_sincronizar = []  #callbacks executados quando a sincronização terminar
 
         self.conectar_servidor()
         if self.servico:
             self.mostrar_tela_nome()
+            self.processar_eventos()
             self.root.mainloop()
 
 
     #conexao com o servidor
     def conectar_servidor(self):
         try:
-            self.conn = rpyc.connect("localhost", 18812)
-            self.servico = self.conn.root
-            print("[Cliente] Conectado ao servidor RPyC.")
+            self.abrir_conexao()
+            print(f"[Cliente] Conectado ao servidor ({self.modo}).")
         except Exception as e:
             messagebox.showerror("Erro", f"Falha ao conectar no servidor:\n{e}")
             self.root.destroy()
 
+    def abrir_conexao(self):
+        #tenta os servidores a partir do último que atendeu: se o primário caiu, o reserva que
+        #assumiu no lugar dele é o próximo da lista a aceitar conexões
+        erro = None
+        for i in range(len(self.servidores)):
+            indice = (self.servidor_atual + i) % len(self.servidores)
+            try:
+                self.conectar(*self.servidores[indice])
+            except OSError as e:
+                erro = e
+                continue
+            self.servidor_atual = indice
+            return
+        raise erro
+
+    def conectar(self, host, porta):
+        if self.modo == "async":
+            #a própria ConexaoJson tem um thread leitor que entrega os eventos
+            self.conn = ConexaoJson(host, porta)
+            self.servico = ServicoRemoto(self.conn.root)
+        else:
+            self.conn = rpyc.connect(host, porta)
+            self.servico = ServicoRemoto(self.conn.root)  #uma ida e volta por chamada
+            #atende em segundo plano as chamadas de callback feitas pelo servidor
+            self.servidor_bg = rpyc.BgServingThread(self.conn)
+
+    def rpc(self, metodo, *args, ok=None, erro=None):
+        #a chamada sai do thread de rede; ok(resultado) e erro(excecao) rodam depois no thread do Tk
+        def chamar():
+            return getattr(self.servico, metodo)(*args)
+        chamar.__name__ = metodo
+        self.rede.executar(chamar, ok=ok, erro=erro)
+
+    def reconectar(self):
+        #a conexão caiu: abre outra e retoma a sessão pelo token, com o estado perdido numa só resposta
+        self.rede.executar(self.reabrir_sessao, self.token, self.versao, self.hash_exibido,
+                           ok=self.sessao_retomada, erro=self.falha_reconexao)
+
+    def reabrir_sessao(self, token, versao, hash_exibido):
+        #roda no thread de rede: nenhum widget aqui
+        try:
+            if self.servidor_bg is not None:
+                self.servidor_bg.stop()
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+        anterior = self.servidor_atual
+        self.abrir_conexao()
+        if self.servidor_atual != anterior:
+            versao = 0  #outro servidor: a versão vista no anterior não vale aqui, pede o estado completo
+        estado = self.servico.retomar_sessao(token, self.sala_id, versao, False) if token else None
+        if estado is not None:
+            estado = self.completar_trecho(dict(estado), hash_exibido)
+        else:
+            #token desconhecido (ex.: a sala foi recolhida): entra de novo pelo nome
+            resposta = dict(self.servico.entrar_no_jogo(self.jogador, self.sala_id))
+            if not resposta["aceito"]:
+                raise RuntimeError(resposta["mensagem"])  #nova tentativa em falha_reconexao
+            token = resposta["token"]
+        self.servico.inscrever(self.receber_evento)
+        return estado, token
+
+    def sessao_retomada(self, resultado):
+        estado, token = resultado
+        print("[Cliente] Reconectado ao servidor.")
+        if estado is not None:
+            self.aplicar_retomada(estado)
+        else:
+            self.token = token
+            self.versao = 0
+            if getattr(self, "janela_jogo", None) is not None:
+                self.sincronizar_estado()
+        self.root.after(INTERVALO_BATIMENTO_MS, self.enviar_batimento)
+
+    def falha_reconexao(self, e):
+        print(f"[Cliente] Sem conexão com o servidor ({e}); nova tentativa em breve.")
+        self.root.after(INTERVALO_RECONEXAO_MS, self.reconectar)
+
+    def aplicar_retomada(self, estado):
+        if getattr(self, "janela_jogo", None) is None:
+            #ainda na tela de espera: o jogo pode ter começado enquanto a conexão estava caída
+            if estado["jogo_iniciado"]:
+                self.eventos.put(("jogo_iniciado", {}))
+            return
+
+        self.versao = estado["versao"]
+        if "opcoes" in estado:
+            self.mostrar_trecho(estado)
+        #truncado: ficou para trás do limite do chat e recebeu o chat inteiro, que substitui o exibido
+        self.atualizar_chat(estado["chat"], estado["chat_limpo"] or estado["chat_truncado"])
+
+        self.mostrar_status_votacao("🔌 Conexão restabelecida.")
+        if estado["meu_voto"]:
+            self.mostrar_status_votacao(f"Seu voto nesta rodada: opção {estado['meu_voto']}.")
+        self.mostrar_status_votacao(estado["status_votacao"])
+
+        #"Continuar" só para quem ainda não confirmou uma rodada já decidida (ou sem votação)
+        pode_continuar = (estado["continuar"] or not self.opcoes) and not estado["pronto"]
+        self.tela_jogo.btnContinuar.config(state="normal" if pode_continuar else "disabled")
+
 
     #tela de nome do jogador
     def mostrar_tela_nome(self):
@@ -54,11 +189,26 @@ class ClienteApp:
             return
 
         self.jogador = nome
-        resposta = self.servico.entrar_no_jogo(self.jogador)
-        messagebox.showinfo("Conectado", resposta)
+        self.tela_nome.TBtnEntrar.config(state="disabled")  #até o servidor responder
+        self.rpc("entrar_no_jogo", self.jogador, self.sala_id, ok=self.entrou_no_jogo, erro=self.falha_ao_entrar)
+
+    def entrou_no_jogo(self, resposta):
+        resposta = dict(resposta)
+        if not resposta["aceito"]:
+            #sala cheia ou inexistente: continua na tela de nome
+            messagebox.showerror("Erro", resposta["mensagem"])
+            self.tela_nome.TBtnEntrar.config(state="normal")
+            return
+        self.token = resposta["token"]
+        messagebox.showinfo("Conectado", resposta["mensagem"])
+        self.enviar_batimento()
         self.janela_nome.destroy()
         self.mostrar_tela_aguardando()
 
+    def falha_ao_entrar(self, e):
+        messagebox.showerror("Erro", f"Não foi possível entrar no jogo:\n{e}")
+        self.tela_nome.TBtnEntrar.config(state="normal")
+
 
 
     #tela de espera
@@ -69,36 +219,136 @@ class ClienteApp:
 
         self.label_status = tk.Label(
             self.tela_aguardando.Frame1,
-            text="Jogadores conectados: 1/4",
+            text="Jogadores conectados: ...",
             background="#d9d9d9",
             font=("Arial", 10)
         )
         self.label_status.place(relx=0.18, rely=0.7)
 
-        threading.Thread(target=self.loop_aguardando, daemon=True).start()
+        #a partir daqui o servidor avisa as mudanças: nada de consultas periódicas
+        self.rede.executar(self.preparar_espera, ok=self.espera_pronta,
+                           erro=lambda e: print("Erro ao verificar jogadores:", e))
+
+    def preparar_espera(self):
+        #roda no thread de rede: inscrição e estado inicial da sala
+        self.servico.inscrever(self.receber_evento)
+        #quantos jogadores a sala precisa para começar vem das regras da sala;
+        #as três leituras numa só ida e volta, do mesmo instantâneo
+        _, (regras, jogadores, iniciado) = self.servico.ler_lote(
+            ("obter_regras", "obter_jogadores", "obter_jogo_iniciado"))
+        return dict(regras), len(jogadores), iniciado
+
+    def espera_pronta(self, resultado):
+        self.regras, total, iniciado = resultado
+        if getattr(self, "janela_jogo", None) is not None:
+            return
+        self.label_status.config(text=f"Jogadores conectados: {total}/{self.regras['quorum_inicio']}")
 
-    def loop_aguardando(self):
-        #Atualiza a tela de espera até que o jogo comece
-        while True:
-            try:
-                jogadores = self.servico.obter_jogadores()
-                total = len(jogadores)
-                self.label_status.config(text=f"Jogadores conectados: {total}/4")
-
-                #verifica com o servidor se o jogo ja começou (>= 4 jogadores)
-                jogo_iniciado = self.servico.obter_jogo_iniciado()
-                if jogo_iniciado:
-                    print("[Cliente] Jogo iniciado!")
-                    #usa after() para garantir que a GUI feche no thread correto
-                    self.janela_aguardando.after(0, self.janela_aguardando.destroy)
-                    self.root.after(200, self.iniciar_jogo)
+        #o jogo pode ter começado antes da inscrição (este foi o último jogador)
+        if iniciado:
+            self.eventos.put(("jogo_iniciado", {}))
+
+
+    #sinal de vida
+    def enviar_batimento(self):
+        try:
+            if not getattr(self, "root", None) or not self.root.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        self.rpc("batimento", ok=lambda _: self.root.after(INTERVALO_BATIMENTO_MS, self.enviar_batimento),
+                 erro=self.conexao_perdida)
+
+    def conexao_perdida(self, e):
+        print("[Cliente] Conexão perdida:", e)
+        self.reconectar()
+
+
+    #eventos enviados pelo servidor
+    def receber_evento(self, evento, dados):
+        #chamado no thread do rpyc: apenas enfileira, o Tk só é tocado em processar_eventos
+        self.eventos.put((evento, dict(dados)))
+
+    def processar_eventos(self):
+        #consome no thread do Tk os eventos do servidor e as respostas do thread de rede
+        #(filas locais: nenhuma chamada de rede aqui)
+        try:
+            if not getattr(self, "root", None) or not self.root.winfo_exists():
+                return
+        except tk.TclError:
+            return
+
+        for fila, tratar in ((self.respostas, self.tratar_resposta), (self.eventos, self.tratar_evento)):
+            while True:
+                try:
+                    item = fila.get_nowait()
+                except queue.Empty:
                     break
+                try:
+                    tratar(*item)
+                except Exception as e:
+                    #se der erro porque a janela fechou, ignora silenciosamente
+                    if "invalid command name" not in str(e):
+                        print("Erro ao processar eventos:", e)
+
+        self.root.after(50, self.processar_eventos)
+
+    @staticmethod
+    def tratar_resposta(callback, valor):
+        callback(valor)
+
+    def tratar_evento(self, evento, dados):
+        em_jogo = getattr(self, "janela_jogo", None) is not None
+
+        if evento == "sala_removida":
+            #o servidor encerrou a sala: não há mais jogo para acompanhar
+            print(f"[Cliente] Sala '{dados['sala_id']}' removida pelo servidor.")
+            messagebox.showerror("Sala encerrada", "A sala foi removida pelo servidor.")
+            self.root.destroy()
+
+        elif evento == "jogador_entrou" and not em_jogo:
+            self.label_status.config(text=f"Jogadores conectados: {dados['total']}/{dados['necessarios']}")
+
+        elif evento == "jogador_saiu" and not em_jogo:
+            self.label_status.config(text=f"Jogadores conectados: {dados['total']}/{self.regras.get('quorum_inicio', '?')}")
 
-            except Exception as e:
-                print("Erro ao verificar jogadores:", e)
-                break
+        elif evento == "jogo_iniciado" and not em_jogo:
+            print("[Cliente] Jogo iniciado!")
+            self.janela_aguardando.destroy()
+            self.iniciar_jogo()
+
+        elif not em_jogo:
+            return
+
+        elif evento == "chat":
+            if not self.sincronizando and dados.get("versao") == self.versao + 1:
+                #nada mais mudou desde a nossa versão: a mensagem do evento basta, sem RPC
+                self.versao = dados["versao"]
+                self.atualizar_chat((dados["mensagem"],))
+            else:
+                self.sincronizar_estado()
 
-            time.sleep(1)
+        elif evento == "jogador_saiu":
+            self.mostrar_status_votacao(f"⚠️ {dados['jogador']} saiu do jogo ({dados['total']} online).")
+
+        elif evento == "votacao":
+            self.mostrar_status_votacao(f"🗳️ {dados['votos']} de {dados['total']} jogadores já votaram.")
+
+        elif evento == "resultado":
+            self.mostrar_status_votacao(dados["mensagem"])
+            if not dados["empate"]:
+                self.tela_jogo.btnContinuar.config(state="normal")
+
+        elif evento == "trecho":
+            #limpa o status de votação anterior
+            self.tela_jogo.STStatusVotacao.config(state="normal")
+            self.tela_jogo.STStatusVotacao.delete("1.0", tk.END)
+            self.tela_jogo.STStatusVotacao.config(state="disabled")
+
+            self.sincronizar_estado()
+
+            #desativa o botão até a próxima votação
+            self.tela_jogo.btnContinuar.config(state="disabled")
 
 
     #tela do jogo principal
@@ -108,6 +358,8 @@ class ClienteApp:
         self.janela_jogo.protocol('WM_DELETE_WINDOW', self.root.destroy)
         self.tela_jogo = TelaJogo(self.janela_jogo)
         self.janela_jogo.title(f"Jogo - {self.jogador}")
+        self.hash_exibido = None
+        self.opcoes = None
 
         #ativa os boteos da interface
         self.tela_jogo.btnChatEnviarMensagem.config(command=self.enviar_chat)
@@ -116,10 +368,14 @@ class ClienteApp:
         self.tela_jogo.btnVotOpcao3.config(command=lambda: self.votar(3))
         self.tela_jogo.btnContinuar.config(command=self.on_continuar)
 
+        #primeira atualização da interface (estado completo em uma chamada);
+        #as seguintes chegam como eventos do servidor
+        self.sincronizar_estado(depois=self.verificar_introducao)
+
+    def verificar_introducao(self):
         #verifica se o primeiro trecho tem opções disponíveis
         try:
-            opcoes = self.servico.obter_opcoes()
-            if not opcoes:
+            if not self.opcoes:
                 #nenhuma opção: é introdução entao habilita botão Continuar
                 self.tela_jogo.btnContinuar.config(state="normal")
                 self.mostrar_status_votacao("📖 Introdução carregada — clique em 'Continuar' para começar.")
@@ -130,50 +386,104 @@ class ClienteApp:
             print(f"Erro ao verificar opções iniciais: {e}")
             self.tela_jogo.btnContinuar.config(state="disabled")
 
-        #inicializa a primeira atualização da interface
-        self.loop_atualizacao()  #as proximas execucoes serao agendadas por after()
 
 
-    def loop_atualizacao(self):
-        try:
-            #se a janela do jogo foi fechada, para o loop
-            if not getattr(self, "janela_jogo", None) or not self.janela_jogo.winfo_exists():
+    def sincronizar_estado(self, depois=None):
+        #busca em uma única chamada apenas o que mudou desde a última versão recebida
+        if depois is not None:
+            self.depois_sincronizar.append(depois)
+        if self.sincronizando:
+            self.sincronizar_de_novo = True  #a resposta em andamento pode não ter a mudança
+            return
+        self.sincronizando = True
+        self.rede.executar(self.buscar_estado, self.versao, self.hash_exibido,
+                           ok=self.estado_recebido, erro=self.falha_sincronizar)
+
+    def buscar_estado(self, versao, hash_exibido):
+        #roda no thread de rede, junto com a busca do texto do trecho se ele não estiver em cache
+        estado = self.servico.obter_estado_desde(versao, False)
+        if estado is None:
+            return None
+        return self.completar_trecho(dict(estado), hash_exibido)
+
+    def completar_trecho(self, estado, hash_exibido):
+        #roda no thread de rede: o servidor manda só o hash e o texto vem do cache (uma RPC se faltar)
+        hash_trecho = estado.get("hash_trecho")
+        if "trecho" not in estado and hash_trecho is not None and hash_trecho != hash_exibido:
+            estado["trecho"] = self.trechos.texto(hash_trecho, self.servico.obter_texto_trecho)
+        return estado
+
+    def estado_recebido(self, estado):
+        self.sincronizando = False
+        if estado is not None:
+            self.versao = estado["versao"]
+            if "opcoes" in estado:
+                self.mostrar_trecho(estado)
+            if "chat" in estado:
+                self.atualizar_chat(estado["chat"], estado["chat_limpo"] or estado["chat_truncado"])
+
+        if self.sincronizar_de_novo:
+            self.sincronizar_de_novo = False
+            self.sincronizar_estado()
+            return
+        depois, self.depois_sincronizar = self.depois_sincronizar, []
+        for callback in depois:
+            callback()
+
+    def falha_sincronizar(self, e):
+        self.sincronizando = False
+        print("[Cliente] Falha ao sincronizar o estado:", e)
+
+
+    def mostrar_trecho(self, estado):
+        #redesenha o texto só quando o trecho (o hash do texto) muda e os botões só quando as opções mudam
+        hash_trecho = estado.get("hash_trecho")
+        if hash_trecho is None or hash_trecho != self.hash_exibido:
+            if "trecho" not in estado:
+                #o texto foi resolvido no thread de rede contra outro trecho exibido: pede o estado completo
+                self.versao = 0
+                self.sincronizar_estado()
                 return
-
-            #executa as atualizacoes apenas se a root ainda existir
-            if getattr(self, "root", None) and self.root.winfo_exists():
-                self.atualizar_historia()
-                self.atualizar_chat()
-                self.atualizar_opcoes()
-
-                #agenda a proxima execucao apenas se o root ainda existir
-                self.root.after(1000, self.loop_atualizacao)
-
-        except Exception as e:
-            #se der erro porque a janela fechou, ignora silenciosamente
-            if "invalid command name" not in str(e):
-                print("Erro ao atualizar interface:", e)
+            self.atualizar_historia(estado["trecho"])  #completado no thread de rede
+            self.hash_exibido = hash_trecho
+        opcoes = tuple(estado["opcoes"])
+        if opcoes != self.opcoes:
+            self.atualizar_opcoes(opcoes)
 
 
-
-    def atualizar_historia(self):
-        trecho = self.servico.obter_trecho()
+    def atualizar_historia(self, trecho):
         self.tela_jogo.STHistoria.config(state="normal")
         self.tela_jogo.STHistoria.delete("1.0", tk.END)
         self.tela_jogo.STHistoria.insert(tk.END, trecho)
         self.tela_jogo.STHistoria.config(state="disabled")
 
 
-    def atualizar_chat(self):
-        chat = self.servico.obter_chat()
-        self.tela_jogo.STChat.config(state="normal")
-        self.tela_jogo.STChat.delete("1.0", tk.END)
-        self.tela_jogo.STChat.insert(tk.END, chat)
-        self.tela_jogo.STChat.config(state="disabled")
-
-
-    def atualizar_opcoes(self):
-        opcoes = self.servico.obter_opcoes()
+    def atualizar_chat(self, mensagens, limpar=False):
+        #acrescenta apenas as mensagens novas (ou redesenha se o chat foi limpo no servidor)
+        if not mensagens and not limpar:
+            return
+        chat = self.tela_jogo.STChat
+        no_fim = chat.yview()[1] >= 0.999  #quem rolou para ler o histórico não é puxado para o fim
+        chat.config(state="normal")
+        if limpar:
+            chat.delete("1.0", tk.END)
+        if mensagens:
+            chat.insert(tk.END, "".join(f"  {mensagem}\n" for mensagem in mensagens))
+        self.aparar_linhas(chat, LIMITE_LINHAS_CHAT)
+        if no_fim:
+            chat.see(tk.END)
+        chat.config(state="disabled")
+
+    @staticmethod
+    def aparar_linhas(widget, limite):
+        #mantém só as últimas `limite` linhas: o widget não cresce sem fim numa partida longa
+        excesso = int(widget.index("end-1c").split(".")[0]) - 1 - limite  #o texto termina em "\n"
+        if excesso > 0:
+            widget.delete("1.0", f"{excesso + 1}.0")
+
+
+    def atualizar_opcoes(self, opcoes):
+        self.opcoes = opcoes  #textos das opções do trecho atual
         botoes = [
             self.tela_jogo.btnVotOpcao1,
             self.tela_jogo.btnVotOpcao2,
@@ -181,49 +491,34 @@ class ClienteApp:
         ]
 
         for i, botao in enumerate(botoes, start=1):
-            if str(i) in opcoes:
-                botao.config(text=f"{i}: {opcoes[str(i)]}", state="normal")
+            if i <= len(opcoes):
+                botao.config(text=f"{i}: {opcoes[i - 1]}", state="normal")
             else:
                 botao.config(text=f"Opção {i}", state="disabled")
 
     def votar(self, opcao):
-        #envia o voto do jogador e mostra o progresso na área de status
-        try:
-            resultado = self.servico.registrar_voto(self.jogador, str(opcao))
-            self.mostrar_status_votacao(resultado)
-
-            #se o resultado indicar que todos ja votaram, habilita o botao Continuar
-            if (
-                "venceu" in resultado
-                or "Aguardando todos clicarem" in resultado
-                or "Todos os jogadores já votaram" in resultado
-            ):
-                self.tela_jogo.btnContinuar.config(state="normal")
+        #envia o voto do jogador; o progresso aparece na área de status quando o servidor responder
+        self.rpc("registrar_voto", self.jogador, str(opcao), ok=self.voto_registrado,
+                 erro=lambda e: self.mostrar_status_votacao(f"Erro ao votar: {e}"))
 
-        except Exception as e:
-            self.mostrar_status_votacao(f"Erro ao votar: {e}")
+    def voto_registrado(self, resultado):
+        self.mostrar_status_votacao(resultado)
+
+        #se o resultado indicar que todos ja votaram, habilita o botao Continuar
+        if (
+            "venceu" in resultado
+            or "Aguardando todos clicarem" in resultado
+            or "Todos os jogadores já votaram" in resultado
+        ):
+            self.tela_jogo.btnContinuar.config(state="normal")
 
 
     def on_continuar(self):
         #confirma que o jogador está pronto para avançar
-        try:
-            resposta = self.servico.confirmar_continuar(self.jogador)
-            self.mostrar_status_votacao(resposta["mensagem"])
-
-            if resposta["acao"] == "avancar":
-                #limpa o status de votação anterior
-                self.tela_jogo.STStatusVotacao.config(state="normal")
-                self.tela_jogo.STStatusVotacao.delete("1.0", tk.END)
-                self.tela_jogo.STStatusVotacao.config(state="disabled")
-
-                #atualiza o texto da história
-                self.atualizar_historia()
-
-                #desativa o botão até a próxima votação
-                self.tela_jogo.btnContinuar.config(state="disabled")
-
-        except Exception as e:
-            self.mostrar_status_votacao(f"Erro ao continuar: {e}")
+        #o novo trecho chega para todos os jogadores pelo evento "trecho"
+        self.rpc("confirmar_continuar", self.jogador,
+                 ok=lambda resposta: self.mostrar_status_votacao(dict(resposta)["mensagem"]),
+                 erro=lambda e: self.mostrar_status_votacao(f"Erro ao continuar: {e}"))
 
 
 
@@ -231,6 +526,7 @@ class ClienteApp:
         #adiciona mensagens na area de status da votacao
         self.tela_jogo.STStatusVotacao.config(state="normal")
         self.tela_jogo.STStatusVotacao.insert(tk.END, msg + "\n")
+        self.aparar_linhas(self.tela_jogo.STStatusVotacao, LIMITE_LINHAS_STATUS)
         self.tela_jogo.STStatusVotacao.see(tk.END)
         self.tela_jogo.STStatusVotacao.config(state="disabled")
 
@@ -239,9 +535,14 @@ class ClienteApp:
         msg = self.tela_jogo.TEntryChat.get().strip()
         if not msg:
             return
-        try:
-            self.servico.enviar_mensagem(self.jogador, msg)
-            self.tela_jogo.TEntryChat.delete(0, tk.END)
-        except Exception as e:
-            messagebox.showerror("Erro", f"Não foi possível enviar mensagem: {e}")
+        if len(msg) > LIMITE_TAMANHO_MENSAGEM:
+            messagebox.showwarning("Aviso", f"A mensagem passa de {LIMITE_TAMANHO_MENSAGEM} caracteres.")
+            return
+        self.tela_jogo.TEntryChat.delete(0, tk.END)  #a mensagem volta para a caixa se o envio falhar
+        self.rpc("enviar_mensagem", self.jogador, msg, erro=lambda e: self.falha_chat(msg, e))
+
+    def falha_chat(self, msg, e):
+        if not self.tela_jogo.TEntryChat.get():
+            self.tela_jogo.TEntryChat.insert(0, msg)
+        messagebox.showerror("Erro", f"Não foi possível enviar mensagem: {e}")
 
@@ -0,0 +1,132 @@
+# controller/logs.py
+# Logs do servidor fora do caminho das requisições: o thread que atende a RPC só coloca
+# o registro numa fila; um thread de fundo formata e grava (arquivo JSON-lines com rotação
+# por tamanho + console). Mensagens frequentes são limitadas por ponto de chamada.
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+TAMANHO_MAXIMO = 5 * 1024 * 1024  #bytes por arquivo de log antes de rotacionar
+ARQUIVOS_ANTIGOS = 5  #arquivos rotacionados mantidos
+TAMANHO_FILA = 10000  #registros pendentes; além disso descarta em vez de bloquear a RPC
+LIMITE_POR_SEGUNDO = 5  #registros INFO/DEBUG por segundo para cada ponto de chamada
+
+
+class FiltroAmostragem(logging.Filter):
+    """Limita registros INFO/DEBUG a `limite` por segundo para cada ponto de chamada
+    (arquivo + linha), que é o "tipo" da mensagem. Avisos e erros sempre passam.
+    A quantidade suprimida é anexada ao próximo registro aceito do mesmo ponto.
+    """
+
+    def __init__(self, limite: int = LIMITE_POR_SEGUNDO):
+        super().__init__()
+        self.limite = limite
+        self.janelas = {}  #(arquivo, linha) -> [segundo, aceitos, suprimidos]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        chave = (record.pathname, record.lineno)
+        segundo = int(time.monotonic())
+        with self.lock:
+            janela = self.janelas.get(chave)
+            if janela is None or janela[0] != segundo:
+                suprimidos = janela[2] if janela else 0
+                self.janelas[chave] = [segundo, 1, 0]
+                if suprimidos:
+                    record.suprimidas = suprimidos
+                return True
+
+            if janela[1] < self.limite:
+                janela[1] += 1
+                return True
+
+            janela[2] += 1
+            return False
+
+
+class HandlerFila(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloqueia e não formata no thread da requisição."""
+
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def prepare(self, record):
+        #a formatação (args, f-strings lazy) fica para o thread de fundo;
+        #só o traceback precisa ser convertido em texto agora
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class FormatadorJson(logging.Formatter):
+    """Uma linha JSON por registro."""
+
+    def format(self, record):
+        dados = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "nivel": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "suprimidas", 0):
+            dados["suprimidas"] = record.suprimidas
+        if record.exc_text:
+            dados["exc"] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False)
+
+
+class FormatadorConsole(logging.Formatter):
+    def format(self, record):
+        texto = super().format(record)
+        if getattr(record, "suprimidas", 0):
+            texto += f" (+{record.suprimidas} semelhantes suprimidas)"
+        return texto
+
+
+def configurar_logs(pasta: str = "logs", arquivo: str = "log_servidor.jsonl", nivel=logging.INFO,
+                    limite_por_segundo: int = LIMITE_POR_SEGUNDO, console: bool = True):
+    """Instala o pipeline assíncrono no logger raiz e retorna o QueueListener (já iniciado)."""
+    os.makedirs(pasta, exist_ok=True)  # garante que a pasta exista
+
+    handler_arquivo = logging.handlers.RotatingFileHandler(
+        os.path.join(pasta, arquivo), maxBytes=TAMANHO_MAXIMO, backupCount=ARQUIVOS_ANTIGOS, encoding="utf-8"
+    )
+    handler_arquivo.setFormatter(FormatadorJson())
+    handlers = [handler_arquivo]
+
+    if console:
+        handler_console = logging.StreamHandler()
+        handler_console.setFormatter(FormatadorConsole("%(asctime)s [%(levelname)s] %(message)s"))
+        handlers.append(handler_console)
+
+    fila = queue.Queue(TAMANHO_FILA)
+    handler_fila = HandlerFila(fila)
+    handler_fila.addFilter(FiltroAmostragem(limite_por_segundo))
+
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+    for antigo in list(raiz.handlers):
+        raiz.removeHandler(antigo)
+    raiz.addHandler(handler_fila)
+
+    listener = logging.handlers.QueueListener(fila, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  #esvazia a fila ao encerrar o processo
+    return listener
@@ -0,0 +1,233 @@
+# controller/metricas.py
+# Métricas do servidor: contagem de chamadas e erros, histograma de latência e bytes
+# devolvidos por método exposto, e tempo de espera pelos locks das salas.
+# Exportadas no formato texto do Prometheus (RPC de admin, arquivo ou porta HTTP).
+import asyncio
+import bisect
+import functools
+import itertools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+#limites dos baldes dos histogramas de tempo (segundos)
+BALDES_SEGUNDOS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Histograma:
+    """Histograma de baldes fixos (cumulativo só na exportação)."""
+
+    def __init__(self, baldes=BALDES_SEGUNDOS):
+        self.baldes = baldes
+        self.contagens = [0] * (len(baldes) + 1)  #o último é o +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(self.baldes, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def linhas(self, nome, rotulos=""):
+        separador = "," if rotulos else ""
+        acumulado = 0
+        for limite, contagem in zip(self.baldes + ("+Inf",), self.contagens):
+            acumulado += contagem
+            yield f'{nome}_bucket{{{rotulos}{separador}le="{limite}"}} {acumulado}'
+        chaves = f"{{{rotulos}}}" if rotulos else ""
+        yield f"{nome}_sum{chaves} {self.soma}"
+        yield f"{nome}_count{chaves} {self.total}"
+
+
+class EstatisticaMetodo:
+    __slots__ = ("chamadas", "erros", "latencia", "bytes")
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0
+        self.latencia = Histograma()
+        self.bytes = 0  #tamanho aproximado das respostas
+
+
+def tamanho_payload(valor, limite=64) -> int:
+    """Tamanho aproximado (bytes) de uma resposta; percorre no máximo `limite` itens."""
+    if valor is None or isinstance(valor, bool):
+        return 1
+    if isinstance(valor, (int, float)):
+        return 8
+    if isinstance(valor, str):
+        return len(valor)
+    if isinstance(valor, bytes):
+        return len(valor)
+    if isinstance(valor, dict):
+        valor = list(itertools.islice(valor.items(), limite))
+    if isinstance(valor, (tuple, list)):
+        return sum(tamanho_payload(item, limite) for item in itertools.islice(valor, limite))
+    return 0
+
+
+class Metricas:
+    """Coletor único do processo (ver `metricas` abaixo)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metodos = {}  #nome do método exposto -> EstatisticaMetodo
+        self.espera_lock = Histograma()  #espera para entrar nos locks de uma sala
+
+    def registrar(self, metodo, segundos, resultado=None, erro=False):
+        tamanho = 0 if erro else tamanho_payload(resultado)
+        with self.lock:
+            estatistica = self.metodos.get(metodo)
+            if estatistica is None:
+                estatistica = self.metodos[metodo] = EstatisticaMetodo()
+            estatistica.chamadas += 1
+            estatistica.erros += erro
+            estatistica.latencia.observar(segundos)
+            estatistica.bytes += tamanho
+
+    def contar_erro(self, metodo):
+        """Erro que o método tratou e respondeu como mensagem (a chamada já é contada por _medir)."""
+        with self.lock:
+            estatistica = self.metodos.get(metodo)
+            if estatistica is None:
+                estatistica = self.metodos[metodo] = EstatisticaMetodo()
+            estatistica.erros += 1
+
+    def registrar_espera_lock(self, segundos):
+        with self.lock:
+            self.espera_lock.observar(segundos)
+
+    def texto_prometheus(self) -> str:
+        """Todas as métricas no formato texto de exposição do Prometheus."""
+        with self.lock:
+            metodos = sorted(self.metodos.items())
+            linhas = [
+                "# HELP jogo_rpc_chamadas_total Chamadas recebidas por método exposto.",
+                "# TYPE jogo_rpc_chamadas_total counter",
+            ]
+            linhas += [f'jogo_rpc_chamadas_total{{metodo="{m}"}} {e.chamadas}' for m, e in metodos]
+            linhas += [
+                "# HELP jogo_rpc_erros_total Chamadas que terminaram com exceção ou responderam um erro.",
+                "# TYPE jogo_rpc_erros_total counter",
+            ]
+            linhas += [f'jogo_rpc_erros_total{{metodo="{m}"}} {e.erros}' for m, e in metodos]
+            linhas += [
+                "# HELP jogo_rpc_resposta_bytes_total Tamanho aproximado das respostas enviadas.",
+                "# TYPE jogo_rpc_resposta_bytes_total counter",
+            ]
+            linhas += [f'jogo_rpc_resposta_bytes_total{{metodo="{m}"}} {e.bytes}' for m, e in metodos]
+            linhas += [
+                "# HELP jogo_rpc_latencia_segundos Tempo de execução de cada método exposto.",
+                "# TYPE jogo_rpc_latencia_segundos histogram",
+            ]
+            for m, e in metodos:
+                linhas += e.latencia.linhas("jogo_rpc_latencia_segundos", f'metodo="{m}"')
+            linhas += [
+                "# HELP jogo_lock_espera_segundos Espera para obter os locks de uma sala (MotorJogo.lock e lock_chat).",
+                "# TYPE jogo_lock_espera_segundos histogram",
+            ]
+            linhas += self.espera_lock.linhas("jogo_lock_espera_segundos")
+        return "\n".join(linhas) + "\n"
+
+    def gravar_arquivo(self, caminho: str):
+        with open(caminho, "w", encoding="utf-8") as arq:
+            arq.write(self.texto_prometheus())
+
+
+metricas = Metricas()  #coletor usado por todo o servidor
+
+
+def instrumentar(cls):
+    """Decorador de classe: mede todos os métodos `exposed_*` do serviço."""
+    for nome, metodo in list(vars(cls).items()):
+        if not nome.startswith("exposed_") or not callable(metodo):
+            continue
+        setattr(cls, nome, _medir(nome[len("exposed_"):], metodo))
+    return cls
+
+
+def _medir(nome, metodo):
+    @functools.wraps(metodo)
+    def medido(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            resultado = metodo(*args, **kwargs)
+        except Exception:
+            metricas.registrar(nome, time.perf_counter() - inicio, erro=True)
+            raise
+        if asyncio.iscoroutine(resultado):
+            #resposta adiada (servidor asyncio): mede até a corrotina terminar
+            return _medir_corrotina(nome, inicio, resultado)
+        metricas.registrar(nome, time.perf_counter() - inicio, resultado)
+        return resultado
+    return medido
+
+
+async def _medir_corrotina(nome, inicio, corrotina):
+    try:
+        resultado = await corrotina
+    except Exception:
+        metricas.registrar(nome, time.perf_counter() - inicio, erro=True)
+        raise
+    metricas.registrar(nome, time.perf_counter() - inicio, resultado)
+    return resultado
+
+
+class LockMedido:
+    """Envolve o lock de uma sala e registra quanto tempo cada chamada esperou por ele.
+    Sem disputa o custo é só uma tentativa não bloqueante.
+    """
+
+    def __init__(self, lock=None):
+        self.lock = lock if lock is not None else threading.RLock()
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self.lock.acquire(blocking=False):
+            return True
+        if not blocking:
+            return False
+        inicio = time.perf_counter()
+        obtido = self.lock.acquire(timeout=timeout)
+        metricas.registrar_espera_lock(time.perf_counter() - inicio)
+        return obtido
+
+    def release(self):
+        self.lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+def iniciar_exportacao_arquivo(caminho: str, intervalo: float = 15.0):
+    """Regrava `caminho` com as métricas a cada `intervalo` segundos (thread de fundo)."""
+    def exportar():
+        while True:
+            time.sleep(intervalo)
+            metricas.gravar_arquivo(caminho)
+
+    threading.Thread(target=exportar, name="ExportaMetricas", daemon=True).start()
+
+
+class _HandlerMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        corpo = metricas.texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass  #não polui o log do servidor
+
+
+def iniciar_exportacao_http(porta: int, host: str = "0.0.0.0"):
+    """Serve as métricas em http://host:porta/metrics (thread de fundo)."""
+    servidor = ThreadingHTTPServer((host, porta), _HandlerMetricas)
+    threading.Thread(target=servidor.serve_forever, name="HttpMetricas", daemon=True).start()
+    return servidor
@@ -0,0 +1,104 @@
+# controller/protocolo_json.py
+# Protocolo do servidor asyncio: uma mensagem JSON por linha.
+#   pedido:   {"id": 1, "metodo": "registrar_voto", "args": ["ana", 2]}
+#   resposta: {"id": 1, "resultado": ...}  ou  {"id": 1, "erro": "..."}
+#   evento:   {"evento": "chat", "dados": [["jogador", "ana"], ...]}
+import itertools
+import json
+import socket
+import threading
+
+
+class ErroServidor(Exception):
+    """Erro levantado no servidor durante uma chamada."""
+
+
+def codificar(mensagem: dict) -> bytes:
+    return (json.dumps(mensagem, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def decodificar(linha: bytes) -> dict:
+    return json.loads(linha)
+
+
+class _ProxyServico:
+    #permite escrever conexao.root.metodo(*args), como numa conexão RPyC
+    def __init__(self, conexao):
+        self._conexao = conexao
+
+    def __getattr__(self, metodo):
+        return lambda *args: self._conexao.chamar(metodo, *args)
+
+
+class ConexaoJson:
+    """Cliente síncrono do servidor asyncio com a mesma interface usada pelo ClienteApp
+    numa conexão RPyC (`conexao.root.metodo(...)`). Um thread leitor entrega as respostas
+    e repassa os eventos ao callback registrado com `inscrever`.
+    """
+
+    def __init__(self, host: str, porta: int):
+        self.sock = socket.create_connection((host, porta))
+        self.arquivo = self.sock.makefile("rb")
+        self.lock_envio = threading.Lock()
+        self.ids = itertools.count(1)
+        self.pendentes = {}  #id do pedido -> [Event, resposta]
+        self.callback = None  #recebe (evento, dados) enviados pelo servidor
+        self.fechada = False
+        self.root = _ProxyServico(self)
+
+        self.leitor = threading.Thread(target=self._ler, daemon=True)
+        self.leitor.start()
+
+    def chamar(self, metodo: str, *args):
+        if metodo == "inscrever":
+            #o callback fica no cliente; o servidor só precisa saber que deve enviar eventos
+            self.callback, args = args[0], ()
+
+        pedido_id = next(self.ids)
+        pendente = [threading.Event(), None]
+        self.pendentes[pedido_id] = pendente
+        if self.fechada:
+            #o leitor já terminou: ninguém mais responderia a este pedido
+            self.pendentes.pop(pedido_id, None)
+            raise ConnectionError("Conexão com o servidor encerrada.")
+
+        with self.lock_envio:
+            self.sock.sendall(codificar({"id": pedido_id, "metodo": metodo, "args": list(args)}))
+
+        pendente[0].wait()
+        resposta = pendente[1]
+        if resposta is None:
+            raise ConnectionError("Conexão com o servidor encerrada.")
+        if "erro" in resposta:
+            raise ErroServidor(resposta["erro"])
+        return resposta.get("resultado")
+
+    def _ler(self):
+        try:
+            for linha in self.arquivo:
+                mensagem = decodificar(linha)
+                if "evento" in mensagem:
+                    if self.callback:
+                        self.callback(mensagem["evento"], mensagem["dados"])
+                    continue
+
+                pendente = self.pendentes.pop(mensagem.get("id"), None)
+                if pendente:
+                    pendente[1] = mensagem
+                    pendente[0].set()
+        except (OSError, ValueError):
+            pass
+        finally:
+            #libera quem ainda espera resposta
+            self.fechada = True
+            for pendente in list(self.pendentes.values()):
+                pendente[0].set()
+            self.pendentes.clear()
+
+    def close(self):
+        self.fechada = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
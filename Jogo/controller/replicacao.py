@@ -0,0 +1,240 @@
+# controller/replicacao.py
+# Replicação primário/reserva: o primário manda a cada servidor reserva o estado de todas as
+# salas e, em seguida, em ordem, cada registro do diário (as mesmas linhas gravadas em disco).
+# O reserva refaz os registros como numa recuperação e, quando o primário cai, assume: abre a
+# porta dos clientes, que retomam a sessão pelo token (ver ClienteApp.abrir_conexao).
+#
+# A replicação é assíncrona: o primário responde ao cliente sem esperar o reserva, então uma
+# queda perde os registros ainda em trânsito (em localhost, uns poucos milissegundos).
+import concurrent.futures
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+
+log = logging.getLogger("ServidorRPyC")  # usa o mesmo logger do servidor
+
+INTERVALO_BATIMENTO_REPLICA = 0.5  #sem registros por esse tempo, o primário manda uma linha vazia
+LIMITE_SILENCIO_REPLICA = 2.0  #o reserva dá o primário por morto depois desse silêncio
+ESPERA_ASSUMIR = 1.0  #segundos sem primário, por fonte na lista, antes de o reserva assumir
+INTERVALO_TENTATIVA = 0.1  #entre duas tentativas de conectar às fontes
+INTERVALO_ENVIO = 0.002  #segundos mínimos entre dois envios a um reserva: o que chega nesse meio-tempo vai junto
+LIMITE_ATRASO_REPLICA = 200000  #registros na fila de um reserva lento antes de derrubá-lo
+
+
+def ler_endereco(texto: str) -> tuple:
+    """"host:porta" -> (host, porta); sem host, localhost."""
+    host, _, porta = texto.rpartition(":")
+    return host or "localhost", int(porta)
+
+
+class Primario:
+    """Aceita servidores reserva na porta de replicação. Cada reserva tem uma fila e um thread:
+    o diário só enfileira a linha (com o lock da sala, na ordem do lsn) e o thread a envia,
+    juntando num único sendall o que se acumulou em INTERVALO_ENVIO segundos.
+    """
+
+    def __init__(self, salas, diario, porta: int, host: str = "0.0.0.0", agendador=None):
+        self.salas = salas
+        self.diario = diario
+        self.porta = porta
+        self.host = host
+        self.agendador = agendador  #no servidor asyncio, a captura das salas roda no event loop
+        self.replicas = {}  #endereço -> registros enviados
+        self.conexoes = set()  #soquetes dos reservas conectados
+        self.soquete = None
+        self.parado = False
+
+    def iniciar(self):
+        self.soquete = socket.create_server((self.host, self.porta))
+        self.porta = self.soquete.getsockname()[1]
+        threading.Thread(target=self._aceitar, name="Replicacao", daemon=True).start()
+        log.info(f"Replicação: aceitando servidores reserva na porta {self.porta}.")
+
+    def _aceitar(self):
+        while True:
+            try:
+                sock, endereco = self.soquete.accept()
+            except OSError:
+                return  #soquete fechado
+            if self.parado:
+                sock.close()  #aceito enquanto parar() fechava o soquete
+                return
+            threading.Thread(target=self._atender, args=(sock, endereco),
+                             name=f"Replica-{endereco[1]}", daemon=True).start()
+
+    def _no_thread_das_salas(self, funcao):
+        #no modo asyncio as salas não têm lock: só o event loop pode lê-las
+        executar = self.agendador.executar if self.agendador is not None else None
+        if executar is None:
+            return funcao()
+        futuro = concurrent.futures.Future()
+
+        def rodar():
+            try:
+                futuro.set_result(funcao())
+            except Exception as e:
+                futuro.set_exception(e)
+
+        executar(rodar)
+        return futuro.result()
+
+    def _capturar(self, lsn_inscricao: int) -> bytes:
+        estados = self._no_thread_das_salas(lambda: self.salas.exportar_salas(self.diario))
+        lsn = max([lsn_inscricao] + [dados["lsn"] for dados in estados.values()])
+        return json.dumps({"lsn": lsn, "salas": estados}, ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8") + b"\n"
+
+    def _atender(self, sock, endereco):
+        #inscreve antes de capturar: o que acontecer durante a captura fica na fila, e o
+        #reserva pula o que o estado já contém (pelo lsn de cada sala)
+        fila = queue.SimpleQueue()
+        ouvinte = fila.put
+        lsn_inscricao = self.diario.inscrever(ouvinte)
+        self.conexoes.add(sock)
+        enviados = 0
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            inicio = time.perf_counter()
+            estado = self._capturar(lsn_inscricao)
+            sock.sendall(estado)
+            self.replicas[endereco] = 0
+            log.info(f"Servidor reserva {endereco} conectado: estado de {len(self.salas.salas)} sala(s) "
+                     f"({len(estado) / 1024:.0f} KB) enviado em {(time.perf_counter() - inicio) * 1000:.0f} ms.")
+
+            while True:
+                try:
+                    linha = fila.get(timeout=INTERVALO_BATIMENTO_REPLICA)
+                except queue.Empty:
+                    sock.sendall(b"\n")  #sinal de vida
+                    continue
+                time.sleep(INTERVALO_ENVIO)  #junta os registros que chegarem até o envio
+                linhas = [linha]
+                while True:
+                    try:
+                        linhas.append(fila.get_nowait())
+                    except queue.Empty:
+                        break
+                sock.sendall(b"".join(linhas))
+                enviados += len(linhas)
+                self.replicas[endereco] = enviados
+                if fila.qsize() > LIMITE_ATRASO_REPLICA:
+                    log.error(f"Servidor reserva {endereco} atrasado demais ({fila.qsize()} registros); "
+                              f"desconectado (ele recomeça do estado atual).")
+                    return
+        except OSError as e:
+            log.warning(f"Servidor reserva {endereco} desconectado: {e}")
+        finally:
+            self.diario.cancelar_inscricao(ouvinte)
+            self.replicas.pop(endereco, None)
+            self.conexoes.discard(sock)
+            sock.close()
+
+    def parar(self):
+        """Para de aceitar reservas e desconecta os que estão conectados."""
+        self.parado = True
+        if self.soquete is not None:
+            #só fechar não acorda o accept() bloqueado em outro thread (Linux): ele seguiria
+            #aceitando o reserva que reconecta, e o reserva nunca assumiria
+            try:
+                self.soquete.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.soquete.close()
+        for sock in list(self.conexoes):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class Replica:
+    """Servidor reserva: segue o primário e assume quando ele cai.
+
+    `fontes` são as portas de replicação em ordem de prioridade: o primário e, depois dele,
+    os reservas que assumem antes deste. Quando a fonte atual cai, o reserva tenta as fontes
+    de novo (uma delas pode ter assumido) e, se nenhuma responder em ESPERA_ASSUMIR segundos
+    por fonte, assume. Com isso o primeiro reserva da fila assume antes dos outros, que
+    passam a segui-lo.
+    """
+
+    def __init__(self, salas, fontes: list, espera_assumir: float = ESPERA_ASSUMIR):
+        self.salas = salas
+        self.fontes = fontes
+        self.espera_assumir = espera_assumir * len(fontes)
+        self.lsn = 0  #último registro do primário aplicado aqui
+        self.sincronizada = False  #já recebeu o estado das salas de alguma fonte
+        self.registros = 0  #registros aplicados desde o último estado recebido
+        self.queda = None  #instante (time.monotonic) em que a última fonte parou de responder
+
+    def seguir(self):
+        """Segue as fontes até decidir assumir (bloqueia). Antes de receber o estado de
+        alguma fonte, nunca assume: espera pelo primário indefinidamente.
+        """
+        while True:
+            for host, porta in self.fontes:
+                try:
+                    sock = socket.create_connection((host, porta), timeout=LIMITE_SILENCIO_REPLICA)
+                except OSError:
+                    continue
+                self._receber(sock, (host, porta))
+                self.queda = time.monotonic()
+                break  #recomeça pela fonte de maior prioridade
+
+            if self.sincronizada and time.monotonic() - self.queda >= self.espera_assumir:
+                return
+            time.sleep(INTERVALO_TENTATIVA)
+
+    def _receber(self, sock, fonte):
+        sock.settimeout(LIMITE_SILENCIO_REPLICA)
+        arquivo = sock.makefile("rb")
+        try:
+            primeira = arquivo.readline()
+            if not primeira.endswith(b"\n"):
+                return
+            estado = json.loads(primeira)
+            lsn_salas = self.salas.carregar_replica(estado["salas"])
+            self.lsn = estado["lsn"]
+            self.sincronizada = True
+            self.registros = 0
+            log.info(f"Replicando de {fonte[0]}:{fonte[1]}: {len(lsn_salas)} sala(s), lsn {self.lsn}.")
+
+            while True:
+                linha = arquivo.readline()
+                if not linha.endswith(b"\n"):
+                    log.warning(f"Fonte de replicação {fonte[0]}:{fonte[1]} caiu (lsn {self.lsn}).")
+                    return
+                if linha == b"\n":
+                    continue  #sinal de vida
+                registro = json.loads(linha)
+                self.salas.aplicar_replica((registro,), lsn_salas)
+                self.lsn = registro[0]
+                self.registros += 1
+        except TimeoutError:
+            log.warning(f"Fonte de replicação {fonte[0]}:{fonte[1]} em silêncio há "
+                        f"{LIMITE_SILENCIO_REPLICA:.0f}s (lsn {self.lsn}).")
+        except (OSError, ValueError) as e:
+            log.warning(f"Replicação de {fonte[0]}:{fonte[1]} interrompida: {e}")
+        finally:
+            arquivo.close()
+            sock.close()
+
+    def assumir(self, diario) -> dict:
+        """Passa a ser o primário: as salas replicadas começam a registrar em `diario` (que
+        continua a numeração da fonte e perde o que tinha gravado antes). Retorna quantas
+        salas e registros vieram da fonte e quanto tempo passou desde a queda dela.
+        """
+        diario.limpar()
+        diario.lsn = self.lsn
+        self.salas.assumir(diario)
+        assuncao = {
+            "salas": len(self.salas.salas),
+            "registros": self.registros,
+            "lsn": self.lsn,
+            "segundos": time.monotonic() - self.queda,
+        }
+        log.info(f"Assumindo no lugar do primário: {assuncao['salas']} sala(s), lsn {self.lsn}, "
+                 f"{assuncao['segundos'] * 1000:.0f} ms depois da queda.")
+        return assuncao
@@ -0,0 +1,17 @@
+# controller/servico_remoto.py
+# No RPyC, `conn.root.metodo(...)` custa duas idas e voltas (buscar o atributo `metodo` e
+# chamá-lo) e mais uma mensagem para liberar o netref do método. Guardando o método na
+# primeira busca, cada chamada seguinte é exatamente uma ida e volta.
+
+
+class ServicoRemoto:
+    """Fachada do serviço remoto (conn.root) que busca cada método uma única vez."""
+
+    def __init__(self, raiz):
+        self._raiz = raiz
+
+    def __getattr__(self, nome):
+        #só chamado na primeira vez: depois o método já está no __dict__ da instância
+        metodo = getattr(self._raiz, nome)
+        setattr(self, nome, metodo)
+        return metodo
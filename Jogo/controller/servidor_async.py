@@ -0,0 +1,178 @@
+# controller/servidor_async.py
+# Modo asyncio do servidor: todas as conexões e salas atendidas por um único event loop,
+# sem um thread por conexão e sem locks nas salas. Usa o protocolo de controller/protocolo_json.py.
+import asyncio
+import logging
+
+from controller.servidor_controller import JogoService, salas, agendador, LIMITE_ESPERA, _pares
+from controller.protocolo_json import codificar, decodificar
+from controller.metricas import instrumentar
+from model.salas import SemLock
+
+#uvloop é opcional: quando instalado, deixa o event loop mais rápido
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+log = logging.getLogger("ServidorRPyC")
+
+LIMITE_BUFFER_ENVIO = 1024 * 1024  #bytes pendentes para um cliente antes de derrubá-lo
+LIMITE_PEDIDO = 64 * 1024  #bytes de uma linha de pedido (limite do StreamReader)
+BACKLOG = 1024  #conexões aguardando accept()
+
+
+class ConexaoAsync:
+    """Conexão de um cliente no servidor asyncio (faz o papel da conexão do RPyC para o JogoService)."""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.endereco = writer.get_extra_info("peername")
+
+    def __repr__(self):
+        return f"<ConexaoAsync {self.endereco}>"
+
+    def enviar(self, mensagem: dict):
+        if self.writer.is_closing():
+            raise ConnectionError("Conexão encerrada.")
+
+        #cliente que não consome o que recebe não pode fazer a memória do servidor crescer
+        if self.writer.transport.get_write_buffer_size() > LIMITE_BUFFER_ENVIO:
+            log.warning(f"Cliente {self.endereco} não está lendo os eventos; conexão encerrada.")
+            self.writer.transport.abort()
+            raise ConnectionError("Cliente lento demais.")
+
+        self.writer.write(codificar(mensagem))
+
+    def enviar_evento(self, evento, dados):
+        self.enviar({"evento": evento, "dados": dados})
+
+    def close(self):
+        #derruba o cliente; o laço de atender() termina e chama on_disconnect
+        self.writer.transport.abort()
+
+
+@instrumentar  #os exposed_* redefinidos aqui também entram nas métricas
+class JogoServiceAsync(JogoService):
+    """Mesmas operações do JogoService, atendidas pelo event loop."""
+
+    def _preparar_callback(self, callback):
+        #o callback só grava no buffer da conexão: já não bloqueia
+        return callback
+
+    def _derrubar(self):
+        self.conn.close()
+
+    def exposed_aguardar_mudanca(self, versao=0, timeout=LIMITE_ESPERA, com_texto=True):
+        #não pode bloquear o event loop: retorna uma corrotina, que atender() responde à parte
+        return self._aguardar_mudanca(self._motor(), int(versao), min(float(timeout), LIMITE_ESPERA),
+                                      bool(com_texto))
+
+    async def _aguardar_mudanca(self, motor, versao, timeout, com_texto):
+        loop = asyncio.get_running_loop()
+        mudou = loop.create_future()
+
+        def acordar(_versao):
+            #a publicação pode vir do thread do agendador: o futuro só é tocado no event loop
+            loop.call_soon_threadsafe(lambda: mudou.done() or mudou.set_result(True))
+
+        if motor.esperar_mudanca(versao, acordar):
+            try:
+                await asyncio.wait_for(mudou, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                motor.cancelar_espera(acordar)
+        return _pares(self._motor().obter_estado_desde(versao, com_texto))
+
+
+def despachar(servico: JogoServiceAsync, conexao: ConexaoAsync, linha: bytes) -> dict:
+    """Executa um pedido do cliente e monta a resposta."""
+    pedido_id = None
+    try:
+        pedido = decodificar(linha)
+        pedido_id = pedido.get("id")
+        nome = pedido["metodo"]
+        metodo = getattr(servico, f"exposed_{nome}", None)
+        if metodo is None:
+            return {"id": pedido_id, "erro": f"Método desconhecido: {nome}"}
+
+        args = pedido.get("args", [])
+        if nome == "inscrever":
+            args = [conexao.enviar_evento]  #eventos vão direto para o socket deste cliente
+
+        return {"id": pedido_id, "resultado": metodo(*args)}
+
+    except Exception as e:
+        log.error(f"Erro ao atender pedido de {conexao.endereco}: {e}")
+        return {"id": pedido_id, "erro": str(e)}
+
+
+async def responder_depois(conexao: ConexaoAsync, pedido_id, espera):
+    """Responde um pedido cujo resultado é uma corrotina (ex.: aguardar_mudanca)."""
+    try:
+        resposta = {"id": pedido_id, "resultado": await espera}
+    except Exception as e:
+        log.error(f"Erro ao atender pedido de {conexao.endereco}: {e}")
+        resposta = {"id": pedido_id, "erro": str(e)}
+    try:
+        conexao.enviar(resposta)
+    except ConnectionError:
+        pass
+
+
+async def atender(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    conexao = ConexaoAsync(writer)
+    servico = JogoServiceAsync()
+    servico.on_connect(conexao)
+    esperas = set()  #respostas adiadas desta conexão (long-poll)
+
+    try:
+        while True:
+            try:
+                linha = await reader.readline()
+            except ValueError:
+                #linha acima de LIMITE_PEDIDO: o resto dela não dá para separar do pedido seguinte
+                log.warning(f"Pedido de {conexao.endereco} maior que {LIMITE_PEDIDO} bytes; conexão encerrada.")
+                conexao.enviar({"id": None, "erro": f"Pedido maior que {LIMITE_PEDIDO} bytes."})
+                await writer.drain()
+                break
+            if not linha:
+                break
+
+            resposta = despachar(servico, conexao, linha)
+            if asyncio.iscoroutine(resposta.get("resultado")):
+                #responde quando a espera terminar, sem parar de ler os outros pedidos da conexão
+                tarefa = asyncio.ensure_future(responder_depois(conexao, resposta["id"], resposta["resultado"]))
+                esperas.add(tarefa)
+                tarefa.add_done_callback(esperas.discard)
+                continue
+
+            conexao.enviar(resposta)
+            await writer.drain()
+
+    except ConnectionError:
+        pass
+    finally:
+        for tarefa in list(esperas):
+            tarefa.cancel()
+        servico.on_disconnect(conexao)
+        writer.close()
+
+
+async def servir(porta: int, host: str = "0.0.0.0"):
+    #um só thread atende todas as salas: os locks viram no-op
+    salas.usar_fabrica_lock(SemLock)
+    #por isso os prazos também rodam no event loop, nunca no thread do agendador
+    agendador.executar = asyncio.get_running_loop().call_soon_threadsafe
+
+    servidor = await asyncio.start_server(atender, host, porta, backlog=BACKLOG, limit=LIMITE_PEDIDO)
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def iniciar(porta: int = 18812, host: str = "0.0.0.0"):
+    """Inicia o servidor asyncio (bloqueia até ser interrompido)."""
+    if uvloop is not None:
+        uvloop.install()
+    asyncio.run(servir(porta, host))
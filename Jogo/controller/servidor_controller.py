@@ -1,138 +1,494 @@
 # service/servidor_controller.py
+import hmac
 import logging
-import os
+import queue
+import threading
+import time
 import rpyc
-from model.motor_jogo import MotorJogo
+from model.salas import GerenciadorSalas, SALA_PADRAO
+from model.regras import RegrasSala
+from model.agendador import Agendador
+from controller.logs import configurar_logs
+from controller.metricas import metricas, instrumentar, LockMedido
 
 # === Configuração de Logs ===
-os.makedirs("logs", exist_ok=True)  # garante que a pasta exista
+#fila + thread de fundo: a RPC nunca espera pelo disco ou pelo console
+configurar_logs("logs", "log_servidor.jsonl")
 
-log_path = os.path.join("logs", "log_servidor.txt")
+log = logging.getLogger("ServidorRPyC")
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(log_path, encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+#prazos de votação e de "Continuar" de todas as salas: um heap e um thread
+agendador = Agendador()
 
-log = logging.getLogger("ServidorRPyC")
+#registro global de salas: cada sala tem seu próprio motor do jogo
+salas = GerenciadorSalas("historia.yaml", agendador=agendador)
+salas.usar_fabrica_lock(LockMedido)  #mede a espera pelo lock de cada sala
+salas.criar_sala(SALA_PADRAO)
+
+# === Sinal de vida ===
+INTERVALO_BATIMENTO = 5.0  #o cliente chama batimento() nesse intervalo
+LIMITE_SILENCIO = 15.0  #jogador sem nenhuma chamada por mais tempo que isso é desconectado
+OCIOSIDADE_SALA = 600.0  #sala sem ninguém online por mais tempo que isso é removida
+LIMITE_ESPERA = 10.0  #máximo de uma chamada aguardar_mudanca (abaixo de LIMITE_SILENCIO)
+LIMITE_EVENTOS_PENDENTES = 1000  #eventos na fila de um cliente que não lê antes de descartar a inscrição
+
+conexoes = set()  #JogoService de cada conexão aberta
+lock_conexoes = threading.Lock()
+monitor = {"ativo": False}
+admin = {"token": None}  #senha das chamadas de administração (None: desligadas); ver autenticar_admin
+
+
+def _pares_opcoes(opcoes):
+    #pares (número, texto): dict(opcoes) no cliente custa zero idas e voltas
+    return tuple((str(i + 1), texto) for i, texto in enumerate(opcoes))
+
+
+def _pares(estado):
+    return tuple(estado.items()) if estado is not None else None
+
+
+#leituras aceitas por ler_lote: nome -> função(motor, instantaneo, *args), com o mesmo
+#resultado da RPC de mesmo nome, mas lida do instantâneo comum a todo o lote
+LEITURAS_LOTE = {
+    "obter_trecho": lambda motor, inst: inst.texto_trecho,
+    "obter_hash_trecho": lambda motor, inst: inst.hash_trecho,
+    "obter_texto_trecho": lambda motor, inst, hash_trecho: motor.obter_texto_trecho(hash_trecho),
+    "obter_opcoes": lambda motor, inst: _pares_opcoes(inst.opcoes),
+    "obter_status_votacao": lambda motor, inst: inst.status_votacao,
+    "obter_resultado": lambda motor, inst: inst.resultado,
+    "obter_jogadores": lambda motor, inst: inst.jogadores,
+    "obter_jogo_iniciado": lambda motor, inst: inst.jogo_iniciado,
+    "obter_regras": lambda motor, inst: motor.regras.como_pares(),
+    "obter_chat": lambda motor, inst, formatado=True: motor.obter_chat(formatado, inst.chat),
+    "obter_chat_desde": lambda motor, inst, seq=0: _pares(motor.obter_chat_desde(int(seq), inst.chat)),
+    "obter_estado_desde": lambda motor, inst, versao=0, com_texto=True: _pares(
+        motor.obter_estado_desde(int(versao), bool(com_texto), inst)),
+}
+
+
+class EnvioEventos:
+    """Envia os eventos de uma conexão em ordem, num thread só dela. Quem muda a sala (inclusive
+    o thread do agendador, nos prazos) só enfileira: um cliente com o socket travado atrasa
+    apenas os próprios eventos. Com a fila cheia ou depois de uma falha de envio, a chamada
+    levanta exceção e a sala descarta a inscrição (o cliente se ressincroniza pela versão).
+    """
+
+    def __init__(self, enviar):
+        self.enviar = enviar
+        self.fila = queue.SimpleQueue()  #(evento, dados); None encerra o thread
+        self.falhou = False
+        threading.Thread(target=self._rodar, name="Eventos", daemon=True).start()
+
+    def __call__(self, evento, dados):
+        if self.falhou:
+            raise ConnectionError("Falha ao enviar eventos ao cliente.")
+        if self.fila.qsize() >= LIMITE_EVENTOS_PENDENTES:
+            raise ConnectionError("Cliente não está lendo os eventos.")
+        self.fila.put((evento, dados))
 
-#instancia global do motor do jogo
-motor_global = MotorJogo("historia.yaml")
+    def parar(self):
+        self.fila.put(None)
 
+    def _rodar(self):
+        while True:
+            item = self.fila.get()
+            if item is None:
+                return
+            try:
+                self.enviar(*item)
+            except Exception as e:
+                log.debug(f"[EVENTO] Envio ao cliente falhou: {e}")
+                self.falhou = True
+                return
 
+
+def verificar_conexoes():
+    """Derruba jogadores em silêncio (a conexão caiu sem aviso), recolhe as salas paradas e,
+    com o diário ligado, grava um instantâneo quando ele cresceu o bastante.
+    Roda pelo agendador a cada INTERVALO_BATIMENTO segundos.
+    """
+    agora = time.monotonic()
+    with lock_conexoes:
+        silenciosas = [s for s in conexoes if s.presenca and agora - s.ultimo_contato > LIMITE_SILENCIO]
+
+    for servico in silenciosas:
+        log.warning(f"Jogador '{servico.presenca[1]}' sem sinal de vida há "
+                    f"{agora - servico.ultimo_contato:.0f}s; conexão encerrada.")
+        servico._sair_da_sala()  #os quóruns se ajustam já, sem esperar o fechamento da conexão
+        servico._derrubar()
+
+    if salas.recolher_salas_vazias(OCIOSIDADE_SALA):
+        despejar_salas_removidas()
+    if salas.diario is not None and salas.diario.precisa_instantaneo():
+        #mantém curto o diário que uma recuperação teria de refazer
+        if agendador.executar is None:
+            #fora do thread do agendador: copiar as salas não atrasa os prazos de nenhuma delas
+            threading.Thread(target=salas.gravar_instantaneo, name="Instantaneo", daemon=True).start()
+        else:
+            salas.gravar_instantaneo()  #asyncio: as salas só podem ser lidas no event loop
+    agendador.agendar_em(INTERVALO_BATIMENTO, verificar_conexoes)
+
+
+def despejar_salas_removidas():
+    """Desliga as conexões que ainda apontam para uma sala fora do registro (removida ou
+    recolhida): quem assinou os eventos recebe "sala_removida" e perde a inscrição, e a presença
+    deixa de contar sem passar pelo motor, que já não é gravado no diário. Retorna quantas.
+    """
+    def removido(motor):
+        return salas.obter_sala(motor.sala_id) is not motor
+
+    with lock_conexoes:
+        afetadas = [
+            s for s in conexoes
+            if (s.presenca and removido(s.presenca[0])) or (s.inscricao and removido(s.inscricao[0]))
+        ]
+
+    for servico in afetadas:
+        inscricao = servico.inscricao
+        if inscricao and removido(inscricao[0]):
+            try:
+                inscricao[1]("sala_removida", {"sala_id": inscricao[0].sala_id})
+            except Exception as e:
+                log.debug(f"[EVENTO] Aviso de sala removida não enviado: {e}")
+            servico._cancelar_inscricao()
+        presenca = servico.presenca
+        if presenca and removido(presenca[0]):
+            servico.presenca = None
+            log.info(f"Jogador '{presenca[1]}' retirado da sala removida '{presenca[0].sala_id}'.")
+    return len(afetadas)
+
+
+def _iniciar_monitor():
+    with lock_conexoes:
+        if monitor["ativo"]:
+            return
+        monitor["ativo"] = True
+    agendador.agendar_em(INTERVALO_BATIMENTO, verificar_conexoes)
+
+
+@instrumentar  #contagem, erros, latência e tamanho da resposta de cada exposed_*
 class JogoService(rpyc.Service):
     #conexao
     def on_connect(self, conn):
         #chamado quando um cliente se conecta ao servidor
         self.conn = conn  #guarda a conexão
+        self.sala_id = SALA_PADRAO  #sala usada pelas chamadas desta conexão
+        self.inscricao = None  #(motor, callback, envio) se o cliente assinou os eventos da sala
+        self.presenca = None  #(motor, jogador) enquanto esta conexão conta como o jogador online
+        self.admin = False  #autenticada por autenticar_admin
+        self.ultimo_contato = time.monotonic()  #última chamada recebida (sinal de vida)
+        with lock_conexoes:
+            conexoes.add(self)
+        _iniciar_monitor()
         log.info(f"Novo cliente conectado: {conn}")
 
     def on_disconnect(self, conn):
         #chamado quando o cliente se desconecta.
+        with lock_conexoes:
+            conexoes.discard(self)
+        self._cancelar_inscricao()
+        self._sair_da_sala()
         jogador = getattr(conn, "jogador", None)
         if jogador:
             log.info(f"Jogador '{jogador}' se desconectou.")
         else:
             log.info("Cliente desconectado (não identificado).")
 
+    def _sair_da_sala(self):
+        #a conexão deixa de contar como o jogador online (uma única vez)
+        presenca, self.presenca = self.presenca, None
+        if presenca:
+            motor, jogador = presenca
+            motor.desconectar_jogador(jogador)
+
+    def _derrubar(self):
+        #o close do RPyC espera o cliente confirmar (até o timeout): nunca no thread do agendador
+        threading.Thread(target=self.conn.close, name="Derrubar", daemon=True).start()
+
+    def exposed_batimento(self):
+        #sinal de vida do cliente; qualquer outra chamada à sala também conta
+        self.ultimo_contato = time.monotonic()
+        return True
+
+    def _motor(self):
+        #roteia a chamada para o motor da sala desta conexão
+        self.ultimo_contato = time.monotonic()
+        motor = salas.obter_sala(self.sala_id)
+        if motor is None:
+            raise ValueError(f"A sala '{self.sala_id}' não existe.")
+        return motor
+
+    def _exigir_admin(self, operacao):
+        #as chamadas de administração só atendem conexões que passaram por autenticar_admin
+        if not self.admin:
+            log.error(f"Chamada de administração '{operacao}' recusada: conexão não autenticada.")
+        return self.admin
+
+    # --- Salas ---
+    def exposed_criar_sala(self, sala_id=None, regras=None):
+        #regras: pares (campo, valor) de RegrasSala; sem elas a sala usa as regras padrão
+        #(administração: None se a conexão não for admin)
+        if not self._exigir_admin("criar_sala"):
+            return None
+        try:
+            return salas.criar_sala(sala_id, regras=RegrasSala.de_pares(regras) if regras else None)
+        except (ValueError, TypeError) as e:
+            log.error(f"Falha ao criar sala: {e}")
+            return None
+
+    def exposed_remover_sala(self, sala_id):
+        #administração: quem estava na sala é avisado e sai dela (a conexão continua aberta)
+        if not self._exigir_admin("remover_sala"):
+            return None
+        removida = salas.remover_sala(sala_id)
+        if removida:
+            despejar_salas_removidas()
+        return removida
+
+    def exposed_listar_salas(self):
+        return tuple(salas.listar_salas())
+
+    def exposed_obter_regras(self, sala_id=None):
+        #tamanho e quóruns da sala (padrão: a desta conexão), como pares (campo, valor)
+        motor = salas.obter_sala(sala_id) if sala_id else self._motor()
+        return motor.regras.como_pares() if motor is not None else None
+
+    # --- Admin ---
+    def exposed_autenticar_admin(self, token):
+        #libera nesta conexão criar_sala, remover_sala e obter_metricas
+        #(servidor iniciado com --token-admin; sem ele, ninguém é admin)
+        esperado = admin["token"]
+        self.admin = (bool(esperado) and isinstance(token, str)
+                      and hmac.compare_digest(token.encode(), esperado.encode()))
+        if not self.admin:
+            log.error(f"Autenticação de administração recusada: {self.conn}")
+        return self.admin
+
+    def exposed_obter_metricas(self):
+        #métricas do servidor no formato texto do Prometheus (administração)
+        if not self._exigir_admin("obter_metricas"):
+            return None
+        return metricas.texto_prometheus()
+
     # --- Jogadores ---
-    def exposed_entrar_no_jogo(self, jogador):
-        #registra a entrada de um novo jogador
-        conn = self.conn
-        conn.jogador = jogador
-        log.info(f"Jogador '{jogador}' entrou no jogo.")
-        resposta = motor_global.adicionar_jogador(jogador)
+    def exposed_entrar_no_jogo(self, jogador, sala_id=SALA_PADRAO):
+        #registra a entrada de um novo jogador na sala escolhida.
+        #retorna pares (aceito, mensagem, token): o token permite retomar a sessão se a conexão
+        #cair; recusado (sala inexistente ou cheia), aceito é False e o token é None
+        motor = salas.obter_sala(sala_id)
+        if motor is None:
+            return (("aceito", False), ("mensagem", f"A sala '{sala_id}' não existe."), ("token", None))
+
+        aceito, resposta = self._entrar(motor, jogador, sala_id)
+        if not aceito:
+            log.info(f"Jogador '{jogador}' recusado na sala '{sala_id}': {resposta}")
+            return (("aceito", False), ("mensagem", resposta), ("token", None))
+        log.info(f"Jogador '{jogador}' entrou no jogo (sala '{sala_id}').")
+        return (("aceito", True), ("mensagem", resposta), ("token", motor.token_do_jogador(jogador)))
 
-        #se o jogo acabou de começar, verifica se o primeiro trecho não tem opções
-        if isinstance(resposta, dict):
-            return resposta
-        return resposta
+    def exposed_retomar_sessao(self, token, sala_id=SALA_PADRAO, versao=0, com_texto=True):
+        #volta à sala como o dono do token e recebe numa única resposta o que perdeu desde `versao`
+        #(None: token desconhecido ou sala recolhida, então o cliente entra de novo pelo nome)
+        motor = salas.obter_sala(sala_id)
+        jogador = motor.jogador_do_token(token) if motor is not None and token else None
+        if jogador is None:
+            log.info(f"Token de retomada inválido para a sala '{sala_id}'.")
+            return None
 
-        return motor_global.adicionar_jogador(jogador)
+        log.info(f"Jogador '{jogador}' retomou a sessão (sala '{sala_id}', versão {versao}).")
+        self._entrar(motor, jogador, sala_id)
+        return tuple(motor.obter_retomada(jogador, int(versao), bool(com_texto)).items())
+
+    def _entrar(self, motor, jogador, sala_id):
+        #retorna (aceito, mensagem); recusado, a conexão continua na sala e com o nome de antes
+        self.ultimo_contato = time.monotonic()
+        if self.presenca == (motor, jogador):
+            #a mesma conexão entrando de novo (pedido repetido, retomada com a conexão viva):
+            #sair e voltar contaria o jogador offline por um instante e mexeria nos quóruns
+            return True, f"{jogador} já está na sala."
+
+        aceito, resposta = motor.adicionar_jogador(jogador)
+        if not aceito:  #sala cheia não registra o jogador
+            return aceito, resposta
+        #a presença nova conta antes de a anterior (outra sala ou outro nome) deixar de contar
+        anterior, self.presenca = self.presenca, (motor, jogador)
+        self.conn.jogador = jogador
+        self.sala_id = sala_id
+        if anterior:
+            anterior[0].desconectar_jogador(anterior[1])
+        return aceito, resposta
 
     def exposed_obter_jogadores(self):
-        jogadores = list(motor_global.jogadores_conectados.keys())
-        log.info(f"Lista de jogadores conectados: {jogadores}")
+        jogadores = self._motor().instantaneo.jogadores
+        log.info("Lista de jogadores conectados: %s", jogadores)
         return jogadores
 
+    # --- Eventos (push) ---
+    def exposed_inscrever(self, callback):
+        #registra um callback(evento, dados) do cliente para receber os eventos da sala
+        self._cancelar_inscricao()
+        motor = self._motor()
+        callback_async = self._preparar_callback(callback)
+
+        def enviar(evento, dados):
+            #tupla de pares chega ao cliente por valor (um dict viraria netref)
+            callback_async(evento, tuple(dados.items()))
+
+        motor.inscrever(enviar)
+        self.inscricao = (motor, enviar, callback_async)
+        log.info(f"Cliente inscrito nos eventos da sala '{self.sala_id}'.")
+
+    def _preparar_callback(self, callback):
+        #no RPyC o callback é um netref: a chamada assíncrona não espera a resposta do cliente,
+        #mas o envio ainda pode travar num socket cheio, por isso sai pelo thread da conexão
+        return EnvioEventos(rpyc.async_(callback))
+
+    def exposed_cancelar_inscricao(self):
+        self._cancelar_inscricao()
+
+    def _cancelar_inscricao(self):
+        if self.inscricao:
+            motor, enviar, envio = self.inscricao
+            motor.cancelar_inscricao(enviar)
+            if isinstance(envio, EnvioEventos):
+                envio.parar()
+            self.inscricao = None
+
+    # --- Estado incremental ---
+    def exposed_obter_estado_desde(self, versao=0, com_texto=True):
+        #uma única chamada com apenas o que mudou desde a versão do cliente (None = nada mudou);
+        #com_texto=False: o trecho vai só pelo hash, para clientes com cache de trechos
+        estado = self._motor().obter_estado_desde(int(versao), bool(com_texto))
+        if estado is None:
+            return None
+        return tuple(estado.items())  #tupla de pares chega ao cliente por valor
+
+    def exposed_ler_lote(self, consultas):
+        #várias leituras numa única ida e volta, todas do mesmo instantâneo da sala: trecho,
+        #opções e votação nunca vêm de rodadas diferentes. consultas: sequência de
+        #(nome, *args) com nomes de LEITURAS_LOTE; retorna (versao, resultados na mesma ordem)
+        #ou None se alguma consulta for inválida
+        motor = self._motor()
+        instantaneo = motor.instantaneo
+        try:
+            resultados = []
+            for consulta in consultas:
+                nome, *args = (consulta,) if isinstance(consulta, str) else consulta
+                leitura = LEITURAS_LOTE.get(nome)
+                if leitura is None:
+                    raise ValueError(f"leitura desconhecida: {nome}")
+                resultados.append(leitura(motor, instantaneo, *args))
+        except (ValueError, TypeError) as e:
+            log.error(f"Lote de leituras inválido: {e}")
+            return None
+        return instantaneo.versao, tuple(resultados)
+
+    def exposed_aguardar_mudanca(self, versao=0, timeout=LIMITE_ESPERA, com_texto=True):
+        #long-poll: espera o estado da sala passar de `versao` (ou o timeout, limitado a
+        #LIMITE_ESPERA) e retorna o mesmo que obter_estado_desde (None = nada mudou no prazo).
+        #Alternativa ao push para clientes sem callbacks. No RPyC a conexão fica ocupada
+        #durante a espera: quem também faz outras chamadas usa uma conexão só para esta
+        versao = int(versao)
+        self._motor().aguardar_mudanca(versao, min(float(timeout), LIMITE_ESPERA))
+        return _pares(self._motor().obter_estado_desde(versao, bool(com_texto)))
+
     #história
     def exposed_obter_trecho(self):
-        trecho = motor_global.obter_trecho_atual()
+        trecho = self._motor().obter_trecho_atual()
         log.info("Trecho atual solicitado pelo cliente.")
         return trecho
 
+    def exposed_obter_hash_trecho(self):
+        #hash do trecho atual: o cliente com cache só chama obter_texto_trecho se não o conhece
+        return self._motor().instantaneo.hash_trecho
+
+    def exposed_obter_texto_trecho(self, hash_trecho):
+        #texto de um trecho da história da sala pelo hash (None se não existir)
+        return self._motor().obter_texto_trecho(hash_trecho)
+
     def exposed_obter_opcoes(self):
-        trecho = motor_global.obter_trecho_atual(formatado=False)
-        if isinstance(trecho, dict):
-            opcoes = trecho.get("opcoes", [])
-            log.info(f"Opções enviadas: {[o['texto'] for o in opcoes]}")
-            return {str(i + 1): o["texto"] for i, o in enumerate(opcoes)}
+        #pares (número, texto): dict(opcoes) no cliente custa zero idas e voltas
+        opcoes = self._motor().obter_opcoes()
+        if opcoes:
+            log.info("Opções enviadas: %s", len(opcoes))
+            return _pares_opcoes(opcoes)
         log.info("Nenhuma opção disponível para este trecho.")
-        return {}
+        return ()
 
     #votacao
     def exposed_registrar_voto(self, jogador, opcao):
+        #sala inexistente ou opção que não é número voltam como mensagem (e contam como erro
+        #nas métricas); qualquer outra falha sobe como exceção
         try:
-            log.info(f"Jogador '{jogador}' votou na opção {opcao}.")
-            resultado = motor_global.registrar_voto(jogador, int(opcao))
-            log.info(f"Resultado parcial da votação: {motor_global.votos}")
+            log.info("Jogador '%s' votou na opção %s.", jogador, opcao)
+            motor = self._motor()
+            resultado = motor.registrar_voto(jogador, int(opcao))
             return resultado
-        except Exception as e:
+        except (ValueError, TypeError) as e:
             log.error(f"Falha ao registrar voto de {jogador}: {e}")
+            metricas.contar_erro("registrar_voto")
             return f"Erro ao registrar voto: {e}"
 
     def exposed_confirmar_continuar(self, nome_jogador):
-        #recebe o clique de 'Continuar' do cliente e coordena o avanço do jogo
+        #recebe o clique de 'Continuar' do cliente e coordena o avanço do jogo.
+        #retorna pares (campo, valor), como obter_estado_desde
+        return tuple(self._confirmar_continuar(nome_jogador).items())
+
+    def _confirmar_continuar(self, nome_jogador):
         try:
-            log.info(f"🕹️ Jogador '{nome_jogador}' clicou em 'Continuar'.")
-            resposta = motor_global.registrar_pronto(nome_jogador)
+            log.info("🕹️ Jogador '%s' clicou em 'Continuar'.", nome_jogador)
+            motor = self._motor()
+            resposta = motor.registrar_pronto(nome_jogador)
 
             if resposta["avancar"]:
                 log.info(f"Todos confirmaram — avançando trecho. ({nome_jogador} foi o último a confirmar)")
-                trecho_atual = motor_global.obter_trecho_atual()
-                log.debug(f"➡️ Trecho atual após avanço: {trecho_atual}")
+                trecho_atual = motor.obter_trecho_atual()
+                log.debug("➡️ Trecho atual após avanço: %s", motor.instantaneo.trecho_atual)
                 return {
                     "acao": "avancar",
                     "mensagem": resposta["mensagem"],
                     "trecho": trecho_atual
                 }
             else:
-                log.debug(
-                    f"⏳ Jogador '{nome_jogador}' confirmou. "
-                    f"Aguardando outros — mensagem: {resposta['mensagem']}"
-                )
+                log.debug("⏳ Jogador '%s' confirmou. Aguardando outros — mensagem: %s",
+                          nome_jogador, resposta["mensagem"])
                 return {
                     "acao": "aguardando",
                     "mensagem": resposta["mensagem"]
                 }
 
-        except Exception as e:
+        except ValueError as e:
+            #sala inexistente; qualquer outra falha sobe como exceção
             log.error(f"Erro ao confirmar 'Continuar' para jogador '{nome_jogador}': {e}")
+            metricas.contar_erro("confirmar_continuar")
             return {"acao": "erro", "mensagem": f"Erro ao continuar: {e}"}
 
     def exposed_obter_status_votacao(self):
         #permite que os clientes consultem o status da votação
-        status = motor_global.obter_status_votacao()
-        log.info(f"Status da votação solicitado: {status}")
+        status = self._motor().obter_status_votacao()
+        log.info("Status da votação solicitado: %s", status)
         return status
 
 
 
     # --- Chat ---
     def exposed_enviar_mensagem(self, jogador, mensagem):
-        log.info(f"Mensagem de '{jogador}': {mensagem}")
-        return motor_global.enviar_mensagem_chat(jogador, mensagem)
+        log.info("Mensagem de '%s': %s", jogador, mensagem)
+        return self._motor().enviar_mensagem_chat(jogador, mensagem)
 
-    def exposed_obter_chat(self):
+    def exposed_obter_chat(self, formatado=True):
+        #texto pronto para exibir, ou tupla de (jogador, mensagem) com formatado=False
         log.info("Chat solicitado por cliente.")
-        return motor_global.obter_chat()
+        return self._motor().obter_chat(formatado)
+
+    def exposed_obter_chat_desde(self, seq=0):
+        #apenas as mensagens novas depois do cursor do cliente, como pares (mensagens, truncado):
+        #mensagens em tuplas (seq, jogador, mensagem); truncado=True, o cursor ficou para trás
+        #das mensagens guardadas e elas vêm todas, para substituir o chat do cliente
+        return _pares(self._motor().obter_chat_desde(int(seq)))
 
     # status do jogo
     def exposed_obter_jogo_iniciado(self):
-        status = motor_global.jogo_iniciado
-        log.info(f"Estado do jogo solicitado: {'Iniciado' if status else 'Aguardando jogadores'}.")
+        status = self._motor().instantaneo.jogo_iniciado
+        log.info("Estado do jogo solicitado: %s.", "Iniciado" if status else "Aguardando jogadores")
         return status
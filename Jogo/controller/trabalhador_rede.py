@@ -0,0 +1,44 @@
+# controller/trabalhador_rede.py
+# Thread de rede do cliente: todas as chamadas ao servidor saem dele, nunca do thread do Tk.
+# O resultado volta por uma fila que o Tk consome (ClienteApp.processar_eventos), então a
+# interface continua respondendo mesmo com o servidor lento, e nenhum widget é tocado fora
+# do thread do Tk.
+import queue
+import threading
+
+
+class TrabalhadorRede:
+    """Executa as chamadas de rede em ordem, num único thread (a ordem dos pedidos é a ordem
+    em que chegam ao servidor). Cada resultado é entregue em `respostas` como
+    (callback, valor): ok(resultado) em caso de sucesso, erro(excecao) em caso de falha.
+    """
+
+    def __init__(self, respostas: queue.Queue):
+        self.pedidos = queue.Queue()  #(funcao, args, ok, erro); None encerra o thread
+        self.respostas = respostas  #consumida no thread do Tk
+        self.thread = threading.Thread(target=self._rodar, name="Rede", daemon=True)
+        self.thread.start()
+
+    def executar(self, funcao, *args, ok=None, erro=None):
+        """Agenda funcao(*args) no thread de rede; não bloqueia quem chama."""
+        self.pedidos.put((funcao, args, ok, erro))
+
+    def parar(self):
+        self.pedidos.put(None)
+
+    def _rodar(self):
+        while True:
+            pedido = self.pedidos.get()
+            if pedido is None:
+                return
+            funcao, args, ok, erro = pedido
+            try:
+                resultado = funcao(*args)
+            except Exception as e:
+                if erro is not None:
+                    self.respostas.put((erro, e))
+                else:
+                    print(f"[Cliente] Falha em {getattr(funcao, '__name__', funcao)}: {e}")
+                continue
+            if ok is not None:
+                self.respostas.put((ok, resultado))
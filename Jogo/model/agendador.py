@@ -0,0 +1,60 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+log = logging.getLogger("ServidorRPyC")  # usa o mesmo logger do servidor
+
+
+class Agendador:
+    """Prazos de todas as salas num único heap, atendidos por um único thread.
+
+    Agendar custa O(log n) e um prazo esperando não custa nada além da entrada no heap,
+    então milhares de salas com prazo não criam milhares de timers. Não há cancelamento:
+    quem agenda confere, quando chamado, se o prazo ainda vale (ver MotorJogo.verificar_prazo).
+    """
+
+    def __init__(self, executar=None):
+        self.fila = []  #heap de (quando, seq, funcao); quando em time.monotonic()
+        self.seq = itertools.count()  #desempate estável entre prazos no mesmo instante
+        self.condicao = threading.Condition()
+        self.executar = executar  #executar(funcao); None = chama no thread do agendador
+        self.thread = None  #criado no primeiro agendamento
+        self.executados = 0
+
+    def __len__(self):
+        return len(self.fila)
+
+    def agendar(self, quando: float, funcao):
+        """Chama funcao() a partir do instante `quando` (relógio time.monotonic)."""
+        with self.condicao:
+            seq = next(self.seq)
+            heapq.heappush(self.fila, (quando, seq, funcao))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._rodar, name="Agendador", daemon=True)
+                self.thread.start()
+            elif self.fila[0][1] == seq:
+                self.condicao.notify()  #o novo prazo é o mais próximo: acorda o thread antes
+
+    def agendar_em(self, segundos: float, funcao):
+        self.agendar(time.monotonic() + segundos, funcao)
+
+    def _rodar(self):
+        while True:
+            with self.condicao:
+                while True:
+                    espera = self.fila[0][0] - time.monotonic() if self.fila else None
+                    if espera is not None and espera <= 0:
+                        break
+                    self.condicao.wait(espera)
+                _, _, funcao = heapq.heappop(self.fila)
+
+            try:
+                if self.executar is None:
+                    funcao()
+                else:
+                    self.executar(funcao)  #ex.: loop.call_soon_threadsafe no servidor asyncio
+                self.executados += 1
+            except Exception:
+                log.exception("Erro ao executar um prazo agendado.")
@@ -0,0 +1,72 @@
+from collections import deque
+
+LIMITE_CHAT_PADRAO = 200  #quantidade de mensagens mantidas por sala
+LIMITE_TAMANHO_MENSAGEM = 1000  #caracteres por mensagem (o pedido cabe folgado numa linha do protocolo)
+
+
+class HistoricoChat:
+    """Chat limitado (buffer circular): guarda só as últimas `limite` mensagens,
+    cada uma com um número de sequência crescente que serve de cursor para os clientes.
+
+    Só quem escreve mexe no deque (com o lock do chat da sala); a cada mudança uma cópia
+    imutável é publicada em `instantaneo`, que os leitores percorrem sem lock.
+    """
+
+    def __init__(self, limite: int = LIMITE_CHAT_PADRAO):
+        self.mensagens = deque(maxlen=limite)  #(seq, versao, jogador, mensagem)
+        self.ultimo_seq = 0  #nunca volta para trás, nem quando o chat é limpo
+        self.versao_descartada = 0  #versão da última mensagem que saiu pelo limite (não pela limpeza)
+        self.instantaneo = ()  #tupla com o conteúdo atual de `mensagens`
+
+    def __len__(self):
+        return len(self.instantaneo)
+
+    def __iter__(self):
+        #percorre (jogador, mensagem), como a antiga lista do chat
+        for _, _, jogador, mensagem in self.instantaneo:
+            yield jogador, mensagem
+
+    def adicionar(self, jogador: str, mensagem: str, versao: int = 0) -> int:
+        """Registra uma mensagem e retorna seu número de sequência."""
+        self.ultimo_seq += 1
+        if len(self.mensagens) == self.mensagens.maxlen:
+            self.versao_descartada = self.mensagens[0][1]  #a mais antiga sai para dar lugar
+        self.mensagens.append((self.ultimo_seq, versao, jogador, mensagem))
+        self.instantaneo = tuple(self.mensagens)
+        return self.ultimo_seq
+
+    def limpar(self):
+        self.mensagens.clear()
+        self.instantaneo = ()
+
+    @staticmethod
+    def _novas(entradas: tuple, posicao: int, cursor: int) -> list:
+        #percorre do fim para o começo: custo proporcional às mensagens novas, não ao histórico
+        novas = []
+        for entrada in reversed(entradas):
+            if entrada[posicao] <= cursor:
+                break
+            novas.append(entrada)
+        novas.reverse()
+        return novas
+
+    def desde(self, seq: int, entradas: tuple = None) -> list:
+        """Mensagens com número de sequência maior que `seq`, como (seq, jogador, mensagem)."""
+        if entradas is None:
+            entradas = self.instantaneo
+        return [(s, jogador, mensagem) for s, _, jogador, mensagem in self._novas(entradas, 0, seq)]
+
+    def truncado(self, seq: int, entradas: tuple = None) -> bool:
+        """Se mensagens posteriores a `seq` já saíram do chat (pelo limite ou por uma limpeza):
+        nesse caso `desde(seq)` traz só as que restaram e o cliente deve trocar o chat inteiro.
+        """
+        if entradas is None:
+            entradas = self.instantaneo
+        primeiro = entradas[0][0] if entradas else self.ultimo_seq + 1
+        return seq + 1 < primeiro
+
+    def desde_versao(self, versao: int, entradas: tuple = None) -> list:
+        """Mensagens registradas depois da versão `versao` do estado da sala."""
+        if entradas is None:
+            entradas = self.instantaneo
+        return [(s, jogador, mensagem) for s, _, jogador, mensagem in self._novas(entradas, 1, versao)]
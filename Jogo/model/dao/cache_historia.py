@@ -0,0 +1,110 @@
+import hashlib
+import logging
+import marshal
+import os
+
+import yaml
+
+log = logging.getLogger("ServidorRPyC")  # usa o mesmo logger do servidor
+
+#loader em C (libyaml) quando disponível; o loader puro em Python é bem mais lento
+try:
+    from yaml import CSafeLoader as LoaderYaml
+except ImportError:
+    from yaml import SafeLoader as LoaderYaml
+
+FORMATO_CACHE = 1  #incrementar se o conteúdo gravado no cache mudar
+EXTENSAO_CACHE = ".cache"
+
+
+def caminho_cache(caminho_yaml: str) -> str:
+    """O cache fica ao lado do YAML: historia.yaml -> historia.yaml.cache"""
+    return caminho_yaml + EXTENSAO_CACHE
+
+
+def _hash(conteudo: bytes) -> str:
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def ler_yaml(caminho_yaml: str) -> dict:
+    """Interpreta o YAML (com o loader em C, se existir), sem usar o cache."""
+    with open(caminho_yaml, "rb") as arq_historia:
+        return yaml.load(arq_historia, Loader=LoaderYaml)
+
+
+def _ler_conteudo(caminho_yaml: str) -> tuple:
+    #(estado, conteúdo) do YAML numa única leitura: dados, hash e tamanho do cache saem todos
+    #do mesmo buffer. O estado é tirado antes de ler: se o arquivo mudar no meio, o mtime
+    #gravado fica velho e a próxima carga confere pelo hash
+    with open(caminho_yaml, "rb") as arq_historia:
+        estado_yaml = os.fstat(arq_historia.fileno())
+        return estado_yaml, arq_historia.read()
+
+
+def _ler_cache(caminho_yaml: str, estado_yaml: os.stat_result):
+    #retorna os dados do cache, ou None se ele não existir, for de outro formato ou estiver velho
+    try:
+        with open(caminho_cache(caminho_yaml), "rb") as arq_cache:
+            formato, mtime_ns, tamanho, hash_yaml, dados = marshal.load(arq_cache)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if formato != FORMATO_CACHE:
+        return None
+
+    #caso comum: mesmo mtime e tamanho, sem ler o YAML
+    if mtime_ns == estado_yaml.st_mtime_ns and tamanho == estado_yaml.st_size:
+        return dados
+
+    #mtime mudou (checkout, cópia...): só o hash do conteúdo decide
+    estado_yaml, conteudo = _ler_conteudo(caminho_yaml)
+    if _hash(conteudo) == hash_yaml:
+        _gravar_cache(caminho_yaml, dados, estado_yaml, conteudo)  #atualiza o mtime para a próxima carga
+        return dados
+
+    return None
+
+
+def _gravar_cache(caminho_yaml: str, dados: dict, estado_yaml: os.stat_result, conteudo: bytes):
+    #`dados` interpretados de `conteudo`, lido junto com `estado_yaml` (ver _ler_conteudo)
+    hash_yaml = _hash(conteudo)
+    destino = caminho_cache(caminho_yaml)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    try:
+        with open(temporario, "wb") as arq_cache:
+            marshal.dump(
+                (FORMATO_CACHE, estado_yaml.st_mtime_ns, len(conteudo), hash_yaml, dados),
+                arq_cache
+            )
+        os.replace(temporario, destino)  #troca atômica: leitores nunca veem um cache pela metade
+    except (OSError, ValueError) as e:
+        #sem permissão de escrita (ou dados não serializáveis): segue sem cache
+        log.warning(f"Não foi possível gravar o cache da história em {destino}: {e}")
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def carregar(caminho_yaml: str) -> dict:
+    """Carrega a história pelo cache binário se ele estiver válido; senão interpreta o YAML
+    e regrava o cache para as próximas cargas.
+    """
+    dados = _ler_cache(caminho_yaml, os.stat(caminho_yaml))
+    if dados is not None:
+        log.debug(f"História carregada do cache: {caminho_cache(caminho_yaml)}")
+        return dados
+
+    estado_yaml, conteudo = _ler_conteudo(caminho_yaml)
+    dados = yaml.load(conteudo, Loader=LoaderYaml)
+    if isinstance(dados, dict):
+        _gravar_cache(caminho_yaml, dados, estado_yaml, conteudo)
+    return dados
+
+
+def compilar(caminho_yaml: str) -> dict:
+    """Interpreta o YAML e grava o cache incondicionalmente (usado no deploy)."""
+    estado_yaml, conteudo = _ler_conteudo(caminho_yaml)
+    dados = yaml.load(conteudo, Loader=LoaderYaml)
+    if not isinstance(dados, dict):
+        raise ValueError("O arquivo YAML deve conter um dicionário como estrutura principal.")
+    _gravar_cache(caminho_yaml, dados, estado_yaml, conteudo)
+    return dados
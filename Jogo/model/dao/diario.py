@@ -0,0 +1,275 @@
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger("ServidorRPyC")  # usa o mesmo logger do servidor
+
+FORMATO_ESTADO = 1  #incrementar se o conteúdo gravado no instantâneo mudar
+INTERVALO_FSYNC = 0.01  #segundos mínimos entre dois fsync: o que chega nesse meio-tempo vai junto
+REGISTROS_POR_INSTANTANEO = 50000  #registros no diário que pedem um novo instantâneo
+ARQUIVO_ESTADO = "estado.json"
+PREFIXO_SEGMENTO = "diario-"
+EXTENSAO_SEGMENTO = ".jsonl"
+
+
+def _fsync_diretorio(diretorio: str):
+    #o nome de um arquivo novo (ou trocado com os.replace) só é durável com o fsync do diretório
+    try:
+        fd = os.open(diretorio, os.O_RDONLY)
+    except OSError:
+        return  #Windows não abre diretórios
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Diario:
+    """Diário das mudanças das salas, só de acréscimo, com instantâneos periódicos.
+
+    Cada registro é uma linha JSON [lsn, sala_id, operacao, *args], com lsn (número de
+    sequência) crescente. `registrar` não espera o disco: um thread grava o que acumulou e faz
+    um único fsync para todo o lote (group commit), no máximo a cada INTERVALO_FSYNC segundos.
+    Uma queda perde no máximo esse intervalo.
+
+    O diário é dividido em segmentos (diario-<lsn inicial>.jsonl). Um instantâneo começa um
+    segmento novo; depois que o estado de todas as salas está gravado em estado.json, os
+    segmentos anteriores são apagados. Na recuperação, estado.json e os segmentos restantes
+    (só os registros posteriores ao lsn de cada sala no instantâneo) refazem as salas.
+
+    Cada linha também vai, na ordem do lsn, para os ouvintes inscritos (a replicação para
+    servidores reserva). Sem diretório, nada é gravado: o diário só numera e entrega as linhas.
+    """
+
+    def __init__(self, diretorio: str = None, intervalo_fsync: float = INTERVALO_FSYNC,
+                 registros_por_instantaneo: int = REGISTROS_POR_INSTANTANEO):
+        self.diretorio = diretorio
+        self.intervalo_fsync = intervalo_fsync
+        self.registros_por_instantaneo = registros_por_instantaneo
+        self.lsn = 0  #último número de sequência atribuído
+        self.desde_instantaneo = 0  #registros desde o último instantâneo
+        self.pendentes = []  #linhas (bytes) e marcadores ainda não gravados pelo thread
+        self.condicao = threading.Condition()  #protege lsn e pendentes; acorda o thread
+        self.arquivo = None  #segmento atual (aberto pelo thread de gravação)
+        self.thread = None
+        self.parando = False
+        self.fsyncs = 0  #quantos fsync do diário já foram feitos (registros/fsync = tamanho do lote)
+        self.registros_gravados = 0
+        self.ouvintes = []  #ouvinte(linha) para cada registro, chamado com self.condicao
+        if diretorio is not None:
+            os.makedirs(diretorio, exist_ok=True)
+
+    # --- caminhos ---
+    def _caminho_estado(self) -> str:
+        return os.path.join(self.diretorio, ARQUIVO_ESTADO)
+
+    def _caminho_segmento(self, lsn_inicial: int) -> str:
+        return os.path.join(self.diretorio, f"{PREFIXO_SEGMENTO}{lsn_inicial:012d}{EXTENSAO_SEGMENTO}")
+
+    def segmentos(self) -> list:
+        """(lsn inicial, caminho) de cada segmento no diretório, em ordem."""
+        segmentos = []
+        if self.diretorio is None:
+            return segmentos
+        for nome in os.listdir(self.diretorio):
+            if nome.startswith(PREFIXO_SEGMENTO) and nome.endswith(EXTENSAO_SEGMENTO):
+                try:
+                    lsn_inicial = int(nome[len(PREFIXO_SEGMENTO):-len(EXTENSAO_SEGMENTO)])
+                except ValueError:
+                    continue
+                segmentos.append((lsn_inicial, os.path.join(self.diretorio, nome)))
+        segmentos.sort()
+        return segmentos
+
+    # --- leitura (recuperação) ---
+    def ler_estado(self):
+        """Conteúdo do último instantâneo gravado, ou None se não houver um válido."""
+        if self.diretorio is None:
+            return None
+        try:
+            with open(self._caminho_estado(), "rb") as arq:
+                estado = json.load(arq)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.error(f"Instantâneo do diário ilegível ({e}); recuperando só pelos segmentos.")
+            return None
+        if estado.get("formato") != FORMATO_ESTADO:
+            log.error("Instantâneo do diário em outro formato; recuperando só pelos segmentos.")
+            return None
+        self.lsn = max(self.lsn, estado["lsn_inicio"] - 1)
+        return estado
+
+    def ler_registros(self):
+        """Percorre os registros de todos os segmentos, em ordem. Uma linha incompleta no fim de
+        um segmento (queda no meio da gravação) é descartada e o arquivo é truncado nela.
+        """
+        for _, caminho in self.segmentos():
+            with open(caminho, "rb+") as arq:
+                valido = 0  #bytes até o fim do último registro íntegro
+                for linha in arq:
+                    if not linha.endswith(b"\n"):
+                        break
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        break
+                    valido += len(linha)
+                    self.lsn = max(self.lsn, registro[0])
+                    yield registro
+                else:
+                    continue
+                log.warning(f"Registro incompleto no fim de {caminho}: descartado.")
+                arq.truncate(valido)
+
+    def tamanho(self) -> int:
+        """Bytes do instantâneo mais os dos segmentos (o que a recuperação precisa ler)."""
+        if self.diretorio is None:
+            return 0
+        caminhos = [caminho for _, caminho in self.segmentos()] + [self._caminho_estado()]
+        return sum(os.path.getsize(c) for c in caminhos if os.path.exists(c))
+
+    def limpar(self):
+        """Apaga o instantâneo e os segmentos: as salas vêm de outro lugar (um servidor reserva que
+        assume no lugar do primário) e um diário antigo neste diretório não vale mais.
+        """
+        for _, caminho in self.segmentos():
+            os.remove(caminho)
+        if self.diretorio is not None and os.path.exists(self._caminho_estado()):
+            os.remove(self._caminho_estado())
+
+    # --- gravação ---
+    def abrir(self):
+        """Começa a gravar num segmento novo, depois do último lsn lido. Chamar depois da recuperação."""
+        with self.condicao:
+            if self.diretorio is None:
+                return
+            self.pendentes.append(("segmento", self.lsn + 1))
+            self.thread = threading.Thread(target=self._rodar, name="Diario", daemon=True)
+            self.thread.start()
+
+    def registrar(self, sala_id: str, operacao: str, args=()) -> int:
+        """Acrescenta uma operação ao diário (sem esperar o disco) e retorna seu lsn.
+        Quem chama segura o lock da sala: a ordem no diário é a ordem em que as operações rodaram.
+        """
+        #o JSON é montado fora do lock; dentro dele só entra o lsn, no começo da linha
+        corpo = json.dumps([sala_id, operacao, *args], ensure_ascii=False, separators=(",", ":"))
+        with self.condicao:
+            self.lsn += 1
+            linha = f"[{self.lsn},{corpo[1:]}\n".encode("utf-8")
+            for ouvinte in self.ouvintes:
+                ouvinte(linha)
+            if self.diretorio is None:
+                return self.lsn
+            self.pendentes.append(linha)
+            self.desde_instantaneo += 1
+            if len(self.pendentes) == 1:
+                self.condicao.notify()
+            return self.lsn
+
+    def inscrever(self, ouvinte):
+        """Passa a entregar a ouvinte(linha) cada registro seguinte, e retorna o último lsn já
+        atribuído (os registros até ele não serão entregues). O ouvinte roda com o lock do
+        diário: deve só enfileirar a linha.
+        """
+        with self.condicao:
+            self.ouvintes.append(ouvinte)
+            return self.lsn
+
+    def cancelar_inscricao(self, ouvinte):
+        with self.condicao:
+            if ouvinte in self.ouvintes:
+                self.ouvintes.remove(ouvinte)
+
+    def precisa_instantaneo(self) -> bool:
+        return self.diretorio is not None and self.desde_instantaneo >= self.registros_por_instantaneo
+
+    def iniciar_instantaneo(self) -> int:
+        """Abre um segmento novo e retorna seu lsn inicial. Em seguida capture o estado das salas
+        (cada uma com o lsn do diário no momento da captura) e chame concluir_instantaneo.
+        """
+        with self.condicao:
+            lsn_inicio = self.lsn + 1
+            self.pendentes.append(("segmento", lsn_inicio))
+            self.desde_instantaneo = 0
+            self.condicao.notify()
+            return lsn_inicio
+
+    def concluir_instantaneo(self, lsn_inicio: int, salas: dict):
+        """Grava o estado das salas (no thread do diário) e apaga os segmentos que ele substitui."""
+        with self.condicao:
+            self.pendentes.append(("estado", lsn_inicio, salas))
+            self.condicao.notify()
+
+    def parar(self):
+        """Grava o que falta e encerra o thread (fim do servidor)."""
+        with self.condicao:
+            self.parando = True
+            self.condicao.notify()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _rodar(self):
+        while True:
+            with self.condicao:
+                while not self.pendentes and not self.parando:
+                    self.condicao.wait()
+                pendentes, self.pendentes = self.pendentes, []
+                parando = self.parando
+
+            linhas = []
+            for item in pendentes:
+                if isinstance(item, bytes):
+                    linhas.append(item)
+                    continue
+                self._gravar(linhas)
+                linhas = []
+                if item[0] == "segmento":
+                    self._trocar_segmento(item[1])
+                else:
+                    self._gravar_estado(item[1], item[2])
+            self._gravar(linhas)
+
+            if parando:
+                if self.arquivo is not None:
+                    self.arquivo.close()
+                return
+            time.sleep(self.intervalo_fsync)  #junta os registros que chegarem até o próximo fsync
+
+    def _gravar(self, linhas):
+        if not linhas:
+            return
+        self.arquivo.write(b"".join(linhas))
+        self.arquivo.flush()
+        os.fsync(self.arquivo.fileno())
+        self.fsyncs += 1
+        self.registros_gravados += len(linhas)
+
+    def _trocar_segmento(self, lsn_inicial: int):
+        if self.arquivo is not None:
+            self.arquivo.close()  #já sincronizado por _gravar
+        self.arquivo = open(self._caminho_segmento(lsn_inicial), "ab")
+        _fsync_diretorio(self.diretorio)
+
+    def _gravar_estado(self, lsn_inicio: int, salas: dict):
+        destino = self._caminho_estado()
+        temporario = f"{destino}.tmp"
+        inicio = time.perf_counter()
+        with open(temporario, "w", encoding="utf-8") as arq:
+            json.dump({"formato": FORMATO_ESTADO, "lsn_inicio": lsn_inicio, "salas": salas},
+                      arq, ensure_ascii=False, separators=(",", ":"))
+            arq.flush()
+            os.fsync(arq.fileno())
+        os.replace(temporario, destino)  #troca atômica: uma queda deixa o instantâneo antigo ou o novo
+        _fsync_diretorio(self.diretorio)
+
+        #os segmentos anteriores ao instantâneo já estão refletidos nele
+        for lsn_inicial, caminho in self.segmentos():
+            if lsn_inicial < lsn_inicio:
+                os.remove(caminho)
+        log.info(f"Instantâneo do diário gravado: {len(salas)} sala(s), lsn {lsn_inicio} "
+                 f"({(time.perf_counter() - inicio) * 1000:.1f} ms).")
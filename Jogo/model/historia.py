@@ -0,0 +1,131 @@
+import hashlib
+import logging
+from collections.abc import Mapping
+from types import MappingProxyType
+
+log = logging.getLogger("ServidorRPyC")  # usa o mesmo logger do servidor
+
+
+def hash_texto(texto: str) -> str:
+    """Identificador estável do conteúdo de um texto: mesmo texto, mesmo hash, em qualquer
+    servidor e em qualquer execução (o cliente guarda os trechos em cache por ele).
+    """
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:32]
+
+
+class TrechoCompilado:
+    """Trecho da história pronto para ser servido: texto já normalizado e renderizado,
+    opções e destinos (`proximo`) já resolvidos. Imutável depois de criado.
+    """
+
+    __slots__ = ("id", "texto", "opcoes", "textos_opcoes", "proximos", "proximo", "renderizado", "hash")
+
+    def __init__(self, trecho_id: str, dados: dict):
+        opcoes = dados.get("opcoes") or []
+
+        set_ = object.__setattr__
+        set_(self, "id", trecho_id)
+        set_(self, "texto", self._normalizar_texto(dados.get("texto", "")))
+        set_(self, "opcoes", tuple(  #opções no formato do YAML ({"texto", "proximo"}), somente leitura
+            MappingProxyType({"texto": o["texto"], "proximo": o.get("proximo")}) for o in opcoes
+        ))
+        set_(self, "textos_opcoes", tuple(o["texto"] for o in opcoes))  #texto de cada opção (1..N)
+        set_(self, "proximos", tuple(o.get("proximo") for o in opcoes))  #destino de cada opção (1..N)
+        set_(self, "proximo", dados.get("proximo"))  #destino direto de trechos sem opções
+        set_(self, "renderizado", self.renderizar())  #texto completo sem empate, pronto para envio
+        set_(self, "hash", hash_texto(self.renderizado))  #identifica o texto renderizado no cache do cliente
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("TrechoCompilado é imutável.")
+
+    @staticmethod
+    def _normalizar_texto(texto_bruto) -> str:
+        if isinstance(texto_bruto, str):
+            # Garante que \n do YAML sejam mantidos e remove espaços extras
+            return texto_bruto.strip()
+        if isinstance(texto_bruto, list):
+            # Caso o texto venha em lista de parágrafos (formato alternativo)
+            return "\n\n".join(p.strip() for p in texto_bruto if p.strip())
+        return ""
+
+    def renderizar(self, opcoes_empate: tuple = ()) -> str:
+        """Monta o texto exibido aos jogadores (só com as opções empatadas, se houver empate)."""
+        if opcoes_empate:
+            opcoes_exibir = [self.textos_opcoes[indice - 1] for indice in opcoes_empate]
+        else:
+            opcoes_exibir = self.textos_opcoes
+
+        partes = [f"\nTrecho atual: {self.id}\n\n", self.texto, "\n"]
+
+        # Caso não existam opções, considera fim da história
+        if not opcoes_exibir:
+            partes.append("\nFim da história\n")
+            return "".join(partes)
+
+        if opcoes_empate:
+            partes.append("\nEmpate detectado! Vote novamente entre as opções abaixo:\n")
+        else:
+            partes.append("\nOpções disponíveis:\n")
+
+        # Lista as opções numeradas
+        partes.extend(f"  {i}. {texto}\n" for i, texto in enumerate(opcoes_exibir, start=1))
+        return "".join(partes)
+
+
+class HistoriaCompilada(Mapping):
+    """Grafo imutável da história (trecho_id -> TrechoCompilado), montado uma vez no carregamento
+    e compartilhado por todas as salas. Os textos renderizados ficam em cache por (trecho, empate)
+    e podem ser buscados pelo hash do conteúdo.
+    """
+
+    def __init__(self, dados: dict):
+        self.trechos = MappingProxyType(
+            {trecho_id: TrechoCompilado(trecho_id, trecho) for trecho_id, trecho in (dados or {}).items()}
+        )
+        self.inicio = next(iter(self.trechos), None)  #primeiro trecho da história
+        self.renderizados = {}  #cache (trecho_id, opcoes_empate) -> texto
+        self.hashes = {}  #cache (trecho_id, opcoes_empate) -> hash do texto
+        self.por_hash = {trecho.hash: trecho.renderizado for trecho in self.trechos.values()}  #hash -> texto
+        self._validar_destinos()
+
+    def _validar_destinos(self):
+        #resolve os destinos uma vez, avisando sobre referências quebradas no YAML
+        for trecho in self.trechos.values():
+            for destino in trecho.proximos + (trecho.proximo,):
+                if destino is not None and destino not in self.trechos:
+                    log.warning(f"Trecho '{trecho.id}' aponta para um trecho inexistente: '{destino}'.")
+
+    def __getitem__(self, trecho_id):
+        return self.trechos[trecho_id]
+
+    def __iter__(self):
+        return iter(self.trechos)
+
+    def __len__(self):
+        return len(self.trechos)
+
+    def renderizar(self, trecho_id: str, opcoes_empate: tuple = ()) -> str:
+        """Texto pronto do trecho: uma consulta ao dicionário na maioria das chamadas."""
+        if not opcoes_empate:
+            return self.trechos[trecho_id].renderizado
+
+        chave = (trecho_id, tuple(opcoes_empate))
+        texto = self.renderizados.get(chave)
+        if texto is None:
+            texto = self.trechos[trecho_id].renderizar(chave[1])
+            hash_ = hash_texto(texto)
+            self.por_hash[hash_] = texto
+            self.hashes[chave] = hash_
+            self.renderizados[chave] = texto  #por último: quem acha o texto também acha o hash
+        return texto
+
+    def identificar(self, trecho_id: str, opcoes_empate: tuple = ()) -> str:
+        """Hash do texto que renderizar(trecho_id, opcoes_empate) retorna."""
+        if not opcoes_empate:
+            return self.trechos[trecho_id].hash
+        self.renderizar(trecho_id, opcoes_empate)
+        return self.hashes[(trecho_id, tuple(opcoes_empate))]
+
+    def texto_por_hash(self, hash_: str):
+        """Texto renderizado com esse hash, ou None se nenhum trecho desta história o gerou."""
+        return self.por_hash.get(hash_)
@@ -2,7 +2,15 @@ import yaml
 import os
 import threading
 import logging
-from collections import Counter
+import secrets
+import time
+from typing import NamedTuple
+
+from model.chat import HistoricoChat, LIMITE_CHAT_PADRAO, LIMITE_TAMANHO_MENSAGEM
+from model.votacao import ApuracaoVotos
+from model.regras import RegrasSala
+from model.historia import HistoriaCompilada
+from model.dao import cache_historia
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 log = logging.getLogger("ServidorRPyC")  # usa o mesmo logger do servidor
@@ -12,162 +20,520 @@ log = logging.getLogger("ServidorRPyC")  # usa o mesmo logger do servidor
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+#partes do estado alteradas por cada evento (usadas no envio incremental do estado)
+PARTES_POR_EVENTO = {
+    "jogador_entrou": ("jogadores", "votacao"),
+    "jogador_saiu": ("jogadores", "votacao"),
+    "jogo_iniciado": ("jogadores", "trecho", "votacao"),
+    "votacao": ("votacao",),
+    "resultado": ("votacao",),
+    "pronto": ("votacao",),
+    "trecho": ("trecho", "votacao"),
+    "chat": ("chat",),
+}
+PARTES = ("jogadores", "trecho", "votacao", "chat")
+
+#depois de uma recuperação, quem estava online conta nos quóruns por esse tempo sem retomar a
+#sessão (como o LIMITE_SILENCIO do servidor): quem voltar primeiro não decide a rodada sozinho
+ESPERA_RETOMADA = 15.0
+
+#cada recuperação começa uma época nova da versão: (época << BITS_EPOCA) + mudanças. Pula acima
+#de qualquer versão que um cliente tenha visto, mesmo que o fim do diário não tenha chegado ao
+#disco (fsync em grupo) ou que o reserva que assumiu estivesse atrasado
+BITS_EPOCA = 32
+
+#operações gravadas no diário (model/dao/diario.py) e refeitas, com os mesmos argumentos, na recuperação
+OPERACOES_DIARIO = frozenset((
+    "adicionar_jogador", "desconectar_jogador", "iniciar_jogo", "registrar_voto", "encerrar_votacao",
+    "forcar_avanco", "calcular_resultados", "avancar_historia", "registrar_pronto", "enviar_mensagem_chat",
+    "limpar_chat", "expirar_restaurados",
+))
+
+
+class Instantaneo(NamedTuple):
+    """Estado da sala visto pelos leitores. Um novo é publicado (troca atômica do atributo)
+    ao fim de cada mudança; como é imutável, as leituras não precisam de lock.
+    """
+    versao: int  #versão do estado, incrementada a cada publicação
+    versoes: dict  #parte -> versão da última mudança (nunca alterado depois de publicado)
+    jogadores: tuple
+    jogo_iniciado: bool
+    trecho_atual: str
+    texto_trecho: str  #texto formatado do trecho (com as opções, ou só as empatadas)
+    hash_trecho: str  #hash do conteúdo de texto_trecho (None antes do jogo começar)
+    opcoes: tuple  #textos das opções votáveis agora
+    status_votacao: str
+    resultado: str
+    chat: tuple  #entradas do HistoricoChat (seq, versao, jogador, mensagem)
+    versao_chat_limpo: int  #versão em que o chat foi limpo pela última vez
+    versao_chat_descartada: int  #versão da última mensagem que saiu do chat pelo limite
+
+
+INDICE_CAMPO = {campo: indice for indice, campo in enumerate(Instantaneo._fields)}
+
+
+class _SecaoEscrita:
+    """`with motor.escrita:` segura o lock do estado do jogo. Ao sair da seção mais externa
+    publica o novo instantâneo e, já fora do lock, entrega os eventos acumulados.
+    """
+
+    __slots__ = ("motor", "profundidade")
+
+    def __init__(self, motor):
+        self.motor = motor
+        self.profundidade = 0  #seções aninhadas (ex.: registrar_pronto -> avancar_historia)
+
+    def __enter__(self):
+        self.motor.lock.acquire()
+        self.profundidade += 1
+        return self
+
+    def __exit__(self, *exc):
+        motor = self.motor
+        self.profundidade -= 1
+        if self.profundidade:
+            motor.lock.release()
+            return False
+
+        try:
+            eventos = motor._publicar_jogo()
+        finally:
+            motor.lock.release()
+        motor._entregar(eventos)
+        return False
+
+
 class MotorJogo:
 
-    def __init__(self, arquivo_historia: str): #construtor da classe
-        self.historia = self.carregar_historia(arquivo_historia) #armazena o arquivo yaml da historia
+    def __init__(self, arquivo_historia: str, historia=None,
+                 limite_chat: int = LIMITE_CHAT_PADRAO, lock=None, lock_chat=None,
+                 regras: RegrasSala = None): #construtor da classe
+        #armazena a historia compilada (ou reaproveita uma já compilada, compartilhada entre salas)
+        if historia is None:
+            historia = self.carregar_historia(arquivo_historia)
+        if not isinstance(historia, HistoriaCompilada):
+            historia = HistoriaCompilada(historia)
+        self.historia = historia
+        self.arquivo_historia = arquivo_historia  #gravado no instantâneo do diário para recriar a sala
+        self.regras = regras if regras is not None else RegrasSala()  #tamanho da sala e quóruns
         self.trecho_atual = None #armazena o trecho atual da historia
-        self.votos = {} #dicionario para armazenar os votos dos jogadores
-        self.chat = [] #lista para armazenar as mensagens do chat
-        self.jogadores_conectados = {}  #dicionario para armazenar os jogadores únicos
+        self.opcoes_empate = ()  #índices das opções empatadas (vazio fora de empate)
+        self.votos = ApuracaoVotos()  #votos da rodada, com a contagem por opção sempre em dia
+        self.rodada = 0  #incrementada a cada votação nova (votos zerados); valida votos suspensos
+        self.chat = HistoricoChat(limite_chat) #últimas mensagens do chat (buffer circular)
+        self.jogadores_conectados = {}  #nome -> {"conectado", "conexoes", "token"}; offline continuam com a vaga
+        self.tokens = {}  #token de retomada -> nome do jogador
+        self.total_conectados = 0  #jogadores online: base dos quóruns (sem percorrer o dicionário)
+        self.vazia_desde = time.monotonic()  #sem ninguém online desde então (None = há jogadores)
         self.jogo_iniciado = False #flag para verificar se o jogo foi iniciado
         self.jogadores_prontos = set()  #quem clicou em "Continuar"
         self.proximo_trecho_pendente = None  #trecho aguardando todos confirmarem
-        self.lock = threading.RLock()
+        self.lock = lock if lock is not None else threading.RLock()  #estado do jogo (votos, prontos, trecho)
+        self.lock_chat = lock_chat if lock_chat is not None else threading.RLock()  #só o chat
+        self.escrita = _SecaoEscrita(self)  #mudanças no estado do jogo: `with self.escrita:`
         self.avancando = False  #flag para impedir confirmações simultâneas
         self.resultado_calculado = False  #evita calcular mais de uma vez por rodada
         self.ultimo_resultado = None  #salva o texto do último resultado da votação
+        self.fim_prazo_votacao = None  #time.monotonic() em que a votação fecha sozinha (regras.prazo_votacao)
+        self.fim_prazo_continuar = None  #time.monotonic() em que a história avança sozinha (regras.prazo_continuar)
+        self.agendador = None  #Agendador compartilhado pelas salas; sem ele os prazos só valem a cada voto
+        self.diario = None  #Diario onde cada mudança é registrada (None = sala só em memória)
+        self.sala_id = None  #id da sala nos registros do diário
+        self.restaurando = False  #refazendo o diário: os prazos só fecham rodadas pelos registros
+        self.inscritos = ()  #callbacks que recebem os eventos da sala (trocada inteira a cada mudança)
+        self.eventos_pendentes = []  #eventos da seção de escrita atual, entregues ao sair dela
+        self.partes_alteradas = set()  #partes do estado mudadas na seção de escrita atual
+        self.lock_publicacao = threading.Lock()  #só a troca do instantâneo (e da lista de inscritos)
+        self.mudanca = threading.Condition(self.lock_publicacao)  #acorda quem espera uma versão nova
+        self.aguardando = 0  #threads dormindo em self.mudanca (sem ninguém, a publicação nem a toca)
+        self.esperas = []  #callbacks chamados uma vez na próxima publicação (espera sem thread, no asyncio)
+        self.instantaneo = Instantaneo(
+            versao=0, versoes=dict.fromkeys(PARTES, 0), jogadores=(), jogo_iniciado=False,
+            trecho_atual=None, texto_trecho="O jogo não foi iniciado.", hash_trecho=None, opcoes=(),
+            status_votacao=self._status_votacao(), resultado=None, chat=(), versao_chat_limpo=0,
+            versao_chat_descartada=0,
+        )
+
+    def inscrever(self, callback):
+        """Registra um callback(evento, dados) que recebe todos os eventos da sala."""
+        with self.lock_publicacao:
+            self.inscritos = self.inscritos + (callback,)
+
+    def cancelar_inscricao(self, callback):
+        with self.lock_publicacao:
+            if callback in self.inscritos:
+                self.inscritos = tuple(c for c in self.inscritos if c is not callback)
+
+    def _registrar(self, operacao: str, *args):
+        #grava a operação no diário; chamar com o lock da parte alterada, para que a ordem
+        #no diário seja a ordem em que as operações rodaram
+        if self.diario is not None:
+            self.diario.registrar(self.sala_id, operacao, args)
+
+    def _registrar_escrita(self, operacao: str, *args):
+        #só a operação mais externa da seção de escrita: as aninhadas são refeitas por ela
+        if self.escrita.profundidade == 1:
+            self._registrar(operacao, *args)
+
+    def _notificar(self, evento: str, **dados):
+        """Guarda o evento da seção de escrita atual. A versão é atribuída na publicação
+        e o envio aos inscritos acontece depois que o lock é liberado.
+        """
+        self.partes_alteradas.update(PARTES_POR_EVENTO[evento])
+        self.eventos_pendentes.append((evento, dados))
+
+    def _entregar(self, eventos):
+        """Envia os eventos para todos os inscritos. Callbacks com falha são descartados."""
+        for evento, dados in eventos:
+            for callback in self.inscritos:
+                try:
+                    callback(evento, dados)
+                except Exception as e:
+                    log.debug(f"[EVENTO] Callback removido após falha em '{evento}': {e}")
+                    self.cancelar_inscricao(callback)
+
+    def aguardar_mudanca(self, versao: int, timeout: float) -> bool:
+        """Bloqueia até o estado passar da versão `versao` ou até `timeout` segundos.
+        Retorna True se mudou. O thread dorme na condição: não custa nada enquanto espera.
+        """
+        with self.mudanca:
+            self.aguardando += 1
+            try:
+                return self.mudanca.wait_for(lambda: self.instantaneo.versao > versao, timeout)
+            finally:
+                self.aguardando -= 1
 
-    def carregar_historia(self, arquivo: str) -> dict:
-        """Carrega o arquivo YAML de história a partir de model/dao/."""
+    def esperar_mudanca(self, versao: int, callback) -> bool:
+        """Versão sem bloqueio de aguardar_mudanca: agenda callback(versao_nova) para a próxima
+        publicação. Retorna False (sem agendar) se o estado já passou de `versao`.
+        """
+        with self.lock_publicacao:
+            if self.instantaneo.versao > versao:
+                return False
+            self.esperas.append(callback)
+            return True
+
+    def cancelar_espera(self, callback):
+        with self.lock_publicacao:
+            if callback in self.esperas:
+                self.esperas.remove(callback)
+
+    def _sinalizar_mudanca(self):
+        #chamar com lock_publicacao, logo depois de trocar o instantâneo
+        if self.aguardando:
+            self.mudanca.notify_all()
+        if self.esperas:
+            esperas, self.esperas = self.esperas, []
+            for callback in esperas:
+                callback(self.instantaneo.versao)
+
+    def _trocar_instantaneo(self, versao: int, partes, **campos):
+        #chamar com lock_publicacao: os leitores veem o instantâneo antigo ou o novo, nunca um meio-termo
+        atual = self.instantaneo
+        versoes = atual.versoes.copy()
+        for parte in partes:
+            versoes[parte] = versao
+        valores = list(atual)  #mais barato que _replace, que passa por um dict de argumentos
+        valores[0], valores[1] = versao, versoes
+        for campo, valor in campos.items():
+            valores[INDICE_CAMPO[campo]] = valor
+        self.instantaneo = Instantaneo._make(valores)
+        self._sinalizar_mudanca()
+
+    def _publicar_jogo(self):
+        """Fim da seção de escrita mais externa (com o lock do jogo): publica o estado
+        do jogo e retorna os eventos acumulados, já com a versão publicada.
+        """
+        eventos, self.eventos_pendentes = self.eventos_pendentes, []
+        partes, self.partes_alteradas = self.partes_alteradas, set()
+        if not partes:
+            return eventos
+
+        atual = self.instantaneo
+        if "jogadores" in partes:
+            jogadores = tuple(nome for nome, info in self.jogadores_conectados.items() if info["conectado"])
+        else:
+            jogadores = atual.jogadores
+        texto_trecho, hash_trecho, opcoes = atual.texto_trecho, atual.hash_trecho, atual.opcoes
+        if "trecho" in partes:
+            if self.trecho_atual is None:
+                texto_trecho, hash_trecho, opcoes = "O jogo não foi iniciado.", None, ()
+            else:
+                texto_trecho = self.historia.renderizar(self.trecho_atual, self.opcoes_empate)
+                hash_trecho = self.historia.identificar(self.trecho_atual, self.opcoes_empate)
+                opcoes = self._textos_opcoes(self.historia[self.trecho_atual])
+        status = self._status_votacao()
+
+        with self.lock_publicacao:
+            atual = self.instantaneo  #o chat pode ter publicado nesse meio-tempo
+            versao = atual.versao + 1
+            versoes = atual.versoes.copy()
+            for parte in partes:
+                versoes[parte] = versao
+            self.instantaneo = Instantaneo(
+                versao, versoes, jogadores, self.jogo_iniciado, self.trecho_atual, texto_trecho, hash_trecho, opcoes,
+                status, self.ultimo_resultado, atual.chat, atual.versao_chat_limpo, atual.versao_chat_descartada,
+            )
+            self._sinalizar_mudanca()
+        for _, dados in eventos:
+            dados["versao"] = versao
+        return eventos
+
+    def _textos_opcoes(self, trecho) -> tuple:
+        if self.opcoes_empate:
+            return tuple(trecho.textos_opcoes[indice - 1] for indice in self.opcoes_empate)
+        return trecho.textos_opcoes
+
+    @staticmethod
+    def carregar_historia(arquivo: str) -> dict:
+        """Carrega o arquivo YAML de história a partir de model/dao/ (pelo cache binário, se válido)."""
         try:
             caminho_absoluto = os.path.join(BASE_DIR, "dao", arquivo)
-            print(f"[DEBUG] Tentando carregar história de: {caminho_absoluto}")
+            log.debug(f"Tentando carregar história de: {caminho_absoluto}")
 
             if not os.path.exists(caminho_absoluto):
                 raise FileNotFoundError(f"Arquivo não encontrado: {caminho_absoluto}")
 
-            with open(caminho_absoluto, "r", encoding="utf-8") as arq_historia:
-                dados = yaml.safe_load(arq_historia)
+            inicio = time.perf_counter()
+            dados = cache_historia.carregar(caminho_absoluto)
 
             if not isinstance(dados, dict):
                 raise ValueError("O arquivo YAML deve conter um dicionário como estrutura principal.")
 
-            print("[DEBUG] História carregada com sucesso.")
+            log.info(f"História '{arquivo}' carregada em {(time.perf_counter() - inicio) * 1000:.1f} ms.")
             return dados
 
         except FileNotFoundError as e:
-            print(f"Erro: {e}")
+            log.error(f"Erro: {e}")
             return {}
         except yaml.YAMLError as e:
-            print(f"Erro ao carregar o arquivo YAML: {e}")
+            log.error(f"Erro ao carregar o arquivo YAML: {e}")
             return {}
         
-    def adicionar_jogador(self, nome: str):        
-        # Se o jogador ainda não existe, cria seu registro
-        if nome not in self.jogadores_conectados:
-            self.jogadores_conectados[nome] = {"conectado": True, "votou": False}
-        else:
-            # Se ele já existia, apenas marca como reconectado
-            self.jogadores_conectados[nome]["conectado"] = True
+    def adicionar_jogador(self, nome: str, token: str = None) -> tuple:
+        """Registra o jogador (ou mais uma conexão dele). Retorna (aceito, mensagem): aceito é
+        False quando a sala está cheia e o jogador não foi registrado.
+        token: só na recuperação do diário, para o jogador manter o token que já recebeu.
+        """
+        with self.escrita:
+            # Se o jogador ainda não existe, cria seu registro (se houver vaga)
+            info = self.jogadores_conectados.get(nome)
+            if info is None and token is None:
+                token = secrets.token_urlsafe(16)  #devolvido ao cliente para retomar a sessão se cair
+            self._registrar_escrita("adicionar_jogador", nome, token)
+            if info is None:
+                if not self.regras.aceita_jogador(len(self.jogadores_conectados)):
+                    return False, f"A sala está cheia ({self.regras.max_jogadores} jogadores)."
+                info = self.jogadores_conectados[nome] = {"conectado": False, "conexoes": 0, "token": token}
+                self.tokens[token] = nome
+
+            # Se ele já existia, apenas marca como reconectado (volta a contar nos quóruns)
+            info["conexoes"] += 1
+            info.pop("restaurado", None)  #retomou a sessão depois de uma recuperação
+            if not info["conectado"]:
+                info["conectado"] = True
+                self.total_conectados += 1
+                self.vazia_desde = None
+                #voltou na mesma votação em que caiu: o voto suspenso volta a contar
+                suspenso = info.pop("voto_suspenso", None)
+                if suspenso and suspenso[0] == self.rodada and not self.resultado_calculado:
+                    self.votos.registrar(nome, suspenso[1])
+
+            total = self.total_conectados
+            necessarios = self.regras.quorum_inicio
+            self._notificar("jogador_entrou", jogador=nome, total=total, necessarios=necessarios)
+
+            # Caso já esteja iniciado, apenas informa entrada
+            if self.jogo_iniciado:
+                self._verificar_quoruns()  #um voto suspenso que voltou pode fechar a votação
+                return True, f"{nome} entrou no jogo. O jogo já está em andamento!"
+
+            # Se ainda não atingiu o quórum de início
+            if total < necessarios:
+                faltam = necessarios - total
+                return True, f"👋 {nome} entrou no jogo. Aguardando mais {faltam} jogador(es)..."
+
+            # Atingiu o quórum e o jogo ainda não começou
+            self.iniciar_jogo()
+            self._notificar("jogo_iniciado", trecho=self.trecho_atual)
+            return True, f"🎮 {total} jogadores conectados! O jogo começou!"
 
-        total = len(self.jogadores_conectados)
+    def jogador_do_token(self, token: str):
+        """Nome do jogador dono do token de retomada, ou None se o token não é desta sala."""
+        return self.tokens.get(token)
 
-        # Se ainda não atingiu 4 jogadores
-        if total < 4:
-            faltam = 4 - total
-            return f"👋 {nome} entrou no jogo. Aguardando mais {faltam} jogador(es)..."
-        
-        # Se atingiu 4 jogadores e o jogo ainda não começou
-        elif total == 4 and not self.jogo_iniciado:
-            self.iniciar_jogo()
-            self.jogo_iniciado = True
-            return "🎮 Quatro jogadores conectados! O jogo começou!"
-        
-        # Caso já esteja iniciado, apenas informa entrada
-        else:
-            return f"{nome} entrou no jogo. O jogo já está em andamento!"
+    def token_do_jogador(self, nome: str):
+        info = self.jogadores_conectados.get(nome)
+        return info["token"] if info is not None else None
+
+    def desconectar_jogador(self, nome: str):
+        """Uma conexão do jogador caiu (ou parou de dar sinal de vida). Sem nenhuma conexão ele
+        fica offline: sai dos quóruns, perde o voto e a confirmação da rodada e mantém a vaga.
+        """
+        with self.escrita:
+            self._registrar_escrita("desconectar_jogador", nome)
+            info = self.jogadores_conectados.get(nome)
+            if info is None or not info["conectado"]:
+                return
+            info.pop("restaurado", None)  #recuperado sem conexão: sai como numa queda
+            info["conexoes"] = max(info["conexoes"] - 1, 0)
+            if info["conexoes"] > 0:
+                return  #ainda há outra conexão do mesmo jogador
+
+            info["conectado"] = False
+            self.total_conectados -= 1
+            if not self.total_conectados:
+                self.vazia_desde = time.monotonic()
+            if not self.resultado_calculado:
+                #fora da apuração enquanto estiver offline; volta se ele retornar na mesma votação
+                opcao = self.votos.remover(nome)
+                if opcao is not None:
+                    info["voto_suspenso"] = (self.rodada, opcao)
+            self.jogadores_prontos.discard(nome)
+            log.info("Jogador '%s' ficou offline (%d online).", nome, self.total_conectados)
+            self._notificar("jogador_saiu", jogador=nome, total=self.total_conectados)
+
+            if self.jogo_iniciado:
+                self._verificar_quoruns()
+
+    def _verificar_quoruns(self):
+        #com menos jogadores online, quem já votou/confirmou pode bastar para fechar a rodada
+        if not self.total_conectados or self.avancando:
+            return
+        if not self.resultado_calculado and len(self.votos) and len(self.votos) >= self._votos_necessarios():
+            self.resultado_calculado = True
+            self.calcular_resultados(forcar=True)
+        elif self.proximo_trecho_pendente and len(self.jogadores_prontos) >= self.total_conectados:
+            self._avancar_rodada()
 
     def iniciar_jogo(self):
         if not self.historia: #verifica se a historia foi carregada corretamente
             raise RuntimeError("História não carregada corretamente.")
         
-        try:
-            self.trecho_atual = next(iter(self.historia)) #pega o primeiro trecho da historia
-        except StopIteration:
-            raise RuntimeError("A história está vazia.")
-        
-        self.votos.clear() #limpa os votos
-        self.chat.clear() #limpa o chat
+        with self.escrita:
+            self._registrar_escrita("iniciar_jogo")
+            if self.total_conectados < self.regras.min_jogadores:
+                raise RuntimeError(f"O jogo precisa de pelo menos {self.regras.min_jogadores} jogador(es).")
+
+            try:
+                self.trecho_atual = next(iter(self.historia)) #pega o primeiro trecho da historia
+            except StopIteration:
+                raise RuntimeError("A história está vazia.")
 
-        for nome in self.jogadores_conectados:
-            self.jogadores_conectados[nome]["votou"] = False #marca todos os jogadores como não votaram ainda
+            self.votos.limpar() #limpa os votos (quem votou sai da própria apuração)
+            self.rodada += 1
+            self.limpar_chat()
 
             self.jogo_iniciado = True #marca o jogo como iniciado
+            self.partes_alteradas.update(("jogadores", "trecho", "votacao"))
+            self._iniciar_prazo()
+
+            #detecta se o trecho inicial não tem opções
+            trecho = self.historia[self.trecho_atual]
+            if not trecho.opcoes:
+                self.proximo_trecho_pendente = trecho.proximo  # se houver “proximo” direto
+                self._iniciar_prazo_continuar()
+                return {
+                    "mensagem": f"O jogo começou! Trecho inicial: {self.trecho_atual}",
+                    "sem_opcoes": True
+                }
 
-        #detecta se o trecho inicial não tem opções
-        trecho = self.historia[self.trecho_atual]
-        if not trecho.get("opcoes"):
-            self.proximo_trecho_pendente = trecho.get("proximo")  # se houver “proximo” direto
             return {
                 "mensagem": f"O jogo começou! Trecho inicial: {self.trecho_atual}",
-                "sem_opcoes": True
+                "sem_opcoes": False
             }
 
-        return {
-            "mensagem": f"O jogo começou! Trecho inicial: {self.trecho_atual}",
-            "sem_opcoes": False
-        }
+    def _iniciar_prazo(self):
+        #prazo da votação do trecho atual (só trechos com opções, e só se a sala tiver prazo)
+        prazo = self.regras.prazo_votacao
+        if prazo and self.historia[self.trecho_atual].opcoes:
+            self.fim_prazo_votacao = time.monotonic() + prazo
+            self._agendar(self.fim_prazo_votacao)
+        else:
+            self.fim_prazo_votacao = None
+
+    def _iniciar_prazo_continuar(self):
+        #prazo para todos clicarem em "Continuar" (só quando há um trecho para onde avançar)
+        prazo = self.regras.prazo_continuar
+        if prazo and self.proximo_trecho_pendente:
+            self.fim_prazo_continuar = time.monotonic() + prazo
+            self._agendar(self.fim_prazo_continuar)
+        else:
+            self.fim_prazo_continuar = None
+
+    def _agendar(self, quando: float):
+        #prazos antigos não são cancelados: verificar_prazo ignora os que já não valem
+        if self.agendador is not None:
+            self.agendador.agendar(quando, self.verificar_prazo)
+
+    def _prazo_esgotado(self) -> bool:
+        return (self.fim_prazo_votacao is not None and time.monotonic() >= self.fim_prazo_votacao
+                and not self.restaurando)
+
+    def _prazo_continuar_esgotado(self) -> bool:
+        return (self.fim_prazo_continuar is not None and time.monotonic() >= self.fim_prazo_continuar
+                and not self.restaurando)
+
+    def _votos_necessarios(self) -> int:
+        #quórum de encerramento da votação sobre os jogadores da rodada
+        return self.regras.votos_necessarios(self.total_conectados)
+
+    def limpar_chat(self):
+        #o chat tem lock próprio e é publicado na hora, sem esperar o fim da seção do jogo.
+        #Vai para o diário como registro próprio, na ordem do lock do chat: uma mensagem que
+        #chegue entre a operação que limpa (já registrada) e a limpeza some também na recuperação.
+        #Por isso, refazendo o diário, só o registro próprio limpa: a chamada de dentro da
+        #operação refeita limparia de novo e a versão da sala sairia diferente da original
+        if self.restaurando and self.escrita.profundidade:
+            return
+        with self.lock_chat, self.lock_publicacao:
+            self._registrar("limpar_chat")
+            self.chat.limpar()
+            versao = self.instantaneo.versao + 1
+            self._trocar_instantaneo(versao, ("chat",), chat=(), versao_chat_limpo=versao)
 
 
     def obter_trecho_atual(self, formatado=True):
-        """Retorna o texto formatado do trecho atual da história."""
+        """Retorna o texto formatado do trecho atual da história (do instantâneo, sem lock).
+        O formato puro lê o estado vivo e é usado pelos métodos que já estão com o lock do jogo.
+        """
+        if formatado:
+            return self.instantaneo.texto_trecho
+
         if self.trecho_atual is None:  # verifica se o jogo foi iniciado
             return "O jogo não foi iniciado."
         
-        trecho = self.historia[self.trecho_atual]  # pega o trecho atual da história
-
-        # Define quais opções mostrar (todas ou só as empatadas)
-        if hasattr(self, "opcoes_empate") and self.opcoes_empate:  # verifica se tem empate
-            opcoes_exibir = []
-            for indice in self.opcoes_empate:  # reinicia a votação mostrando apenas as opções empatadas
-                opcoes_exibir.append(trecho["opcoes"][indice - 1])
-            modo_empate = True
-        else:
-            opcoes_exibir = trecho.get("opcoes", [])  # mostra todas as opções normais sem empate
-            modo_empate = False
+        trecho = self.historia[self.trecho_atual]  # pega o trecho compilado da história
 
-            # Se o chamador pediu formato puro (para envio via rede, por exemplo)
-            if not formatado:
-                return {
-                    "texto": trecho["texto"],
-                    "opcoes": opcoes_exibir
-                }
-
-        # Cabeçalho do trecho
-        texto = f"\nTrecho atual: {self.trecho_atual}\n\n"
-
-        # 📖 Formata o texto principal mantendo quebras de linha
-        texto_bruto = trecho.get("texto", "")
-        if isinstance(texto_bruto, str):
-            # Garante que \n do YAML sejam mantidos e remove espaços extras
-            texto += texto_bruto.strip() + "\n"
-        elif isinstance(texto_bruto, list):
-            # Caso o texto venha em lista de parágrafos (formato alternativo)
-            texto += "\n\n".join(p.strip() for p in texto_bruto if p.strip()) + "\n"
-
-        # Caso não existam opções, considera fim da história
-        if not opcoes_exibir:
-            texto += "\nFim da história\n"
-            return texto
-
-        # Caso de empate
-        if modo_empate:
-            texto += "\nEmpate detectado! Vote novamente entre as opções abaixo:\n"
+        if self.opcoes_empate:  # reinicia a votação mostrando apenas as opções empatadas
+            opcoes_exibir = [trecho.opcoes[indice - 1] for indice in self.opcoes_empate]
         else:
-            texto += "\nOpções disponíveis:\n"
+            opcoes_exibir = trecho.opcoes
+        return {
+            "texto": trecho.texto,
+            "opcoes": opcoes_exibir
+        }
 
-        # Lista as opções numeradas
-        for i, opcao in enumerate(opcoes_exibir, start=1):
-            texto += f"  {i}. {opcao['texto']}\n"
+    def obter_texto_trecho(self, hash_trecho: str):
+        """Texto renderizado de um trecho desta história pelo hash (None se não existir).
+        Usado pelo cliente que guarda os trechos em cache e só busca o texto quando não o tem.
+        """
+        return self.historia.texto_por_hash(hash_trecho)
 
-        return texto
+    def obter_opcoes(self) -> tuple:
+        """Textos das opções votáveis agora (do instantâneo, sem lock)."""
+        return self.instantaneo.opcoes
 
     def registrar_voto(self, jogador, opcao: int):
-        with self.lock:
+        with self.escrita:
+            self._registrar_escrita("registrar_voto", jogador, opcao)
             if not self.jogo_iniciado:
                 return "O jogo ainda não começou!"
 
+            info = self.jogadores_conectados.get(jogador)
+            if info is None or not info["conectado"]:
+                return f"{jogador} não está conectado nesta sala."
+
             trecho = self.obter_trecho_atual(formatado=False)
             opcoes = trecho.get("opcoes", []) if isinstance(trecho, dict) else []
             total_opcoes = len(opcoes)
@@ -178,45 +544,92 @@ class MotorJogo:
             if not (1 <= opcao <= total_opcoes):
                 return f"Opção inválida. Escolha entre 1 e {total_opcoes}."
 
-            # registra voto
-            self.votos[jogador] = opcao
-            if jogador in self.jogadores_conectados:
-                self.jogadores_conectados[jogador]["votou"] = True
+            # votação já encerrada (quórum ou prazo): o voto não muda mais o resultado
+            if self.resultado_calculado:
+                return self.ultimo_resultado or "Resultado já calculado. Aguarde todos clicarem em 'Continuar'."
 
-            total_jogadores = len(self.jogadores_conectados)
-            total_votos = len(self.votos)
+            # registra voto (ou troca o anterior), atualizando a contagem em O(1)
+            self.votos.registrar(jogador, opcao)
 
-            log.debug(f"[VOTO] '{jogador}' -> opção {opcao} | "
-                      f"{total_votos}/{total_jogadores} votos: {dict(self.votos)}")
+            total_jogadores = self.total_conectados
+            total_votos = len(self.votos)
 
-            # todos votaram?
-            if total_votos == total_jogadores:
-                if not self.resultado_calculado:
-                    self.resultado_calculado = True
-                    resultado = self.calcular_resultados()
-                    if not resultado:
-                        resultado = "⚠️ Erro interno ao calcular resultado."
-                    return resultado
-                else:
-                    # se já calculado, devolve o último resultado
-                    return self.ultimo_resultado or "Resultado já calculado. Aguarde todos clicarem em 'Continuar'."
+            if log.isEnabledFor(logging.DEBUG):  #só a contagem por opção: não cresce com a sala
+                log.debug("[VOTO] '%s' -> opção %s | %d/%d votos: %s",
+                          jogador, opcao, total_votos, total_jogadores, self.votos.resumo())
+            self._notificar("votacao", votos=total_votos, total=total_jogadores)
+
+            # quórum atingido (ou prazo esgotado)?
+            necessarios = self._votos_necessarios()
+            if total_votos >= necessarios or self._prazo_esgotado():
+                if total_votos < necessarios:
+                    self._registrar_escrita("encerrar_votacao")  #fechada pelo prazo, que a recuperação não vê
+                self.resultado_calculado = True
+                resultado = self.calcular_resultados(forcar=True)
+                if not resultado:
+                    resultado = "⚠️ Erro interno ao calcular resultado."
+                return resultado
             else:
-                faltam = total_jogadores - total_votos
+                faltam = necessarios - total_votos
                 return f"{jogador} registrou seu voto. Aguardando {faltam} voto(s)..."
 
-
-    def calcular_resultados(self):
+    def encerrar_votacao(self):
+        """Fecha a votação com os votos já recebidos (prazo esgotado).
+        Sem nenhum voto não há o que decidir: o prazo recomeça.
+        """
+        with self.escrita:
+            self._registrar_escrita("encerrar_votacao")
+            if not self.jogo_iniciado or self.resultado_calculado:
+                return None
+            if not len(self.votos):
+                self._iniciar_prazo()
+                return "Nenhum voto recebido no prazo. O prazo foi renovado."
+            self.resultado_calculado = True
+            return self.calcular_resultados(forcar=True)
+
+    def verificar_prazo(self):
+        """Aplica os prazos da rodada que já passaram: encerra a votação ou avança a história.
+        Chamado pelo Agendador; retorna a mensagem do que foi feito, ou None.
+        """
+        #leitura sem lock: prazos já substituídos (caso comum) não disputam o lock do jogo
+        if not (self._prazo_esgotado() or self._prazo_continuar_esgotado()):
+            return None
+        with self.escrita:
+            #no diário vai a ação tomada: a recuperação não sabe quando o prazo acabou
+            if self._prazo_esgotado():
+                self._registrar_escrita("encerrar_votacao")
+                return self.encerrar_votacao()
+            if self._prazo_continuar_esgotado():
+                self._registrar_escrita("forcar_avanco")
+                return self.forcar_avanco()
+            return None
+
+    def forcar_avanco(self):
+        """Avança para o trecho pendente sem esperar quem não clicou em "Continuar"."""
+        with self.escrita:
+            self._registrar_escrita("forcar_avanco")
+            self.fim_prazo_continuar = None
+            if self.avancando or not self.proximo_trecho_pendente:
+                return None
+            faltam = self.total_conectados - len(self.jogadores_prontos)
+            log.info("Prazo para continuar esgotado: avançando sem %d jogador(es).", faltam)
+            return self._avancar_rodada()["mensagem"]
+
+
+    def calcular_resultados(self, forcar=False):
         """Conta os votos, resolve empate e prepara próximo trecho sem limpar estado prematuramente.
         Armazena o último resultado para garantir que todos os clientes recebam a mesma mensagem.
+        Com `forcar` (prazo esgotado) apura mesmo sem o quórum de votos.
         """
-        with self.lock:
+        with self.escrita:
+            self._registrar_escrita("calcular_resultados", forcar)
             if not self.jogo_iniciado:
                 return "O jogo ainda não começou!"
 
-            total_jogadores = len(self.jogadores_conectados)
             total_votos = len(self.votos)
-            if total_votos < total_jogadores:
-                faltam = total_jogadores - total_votos
+            necessarios = self._votos_necessarios()
+            if total_votos < necessarios and not (forcar and total_votos):
+                faltam = necessarios - total_votos
                 return f"Aguardando {faltam} voto(s) restante(s) antes de calcular o resultado."
 
             # descobre quantas opções existem neste trecho
@@ -226,21 +639,19 @@ class MotorJogo:
             if total_opcoes == 0:
                 return "Erro: trecho atual não possui opções para votação."
 
-            # contagem dinâmica (1..N)
-            contagem = Counter(self.votos.values())
-
-            # maior número de votos
-            maior = max(contagem.values())
-            vencedoras = [idx for idx, c in contagem.items() if c == maior]
+            # apuração mantida a cada voto: maior contagem e opções com essa contagem
+            maior = self.votos.maior
+            vencedoras = self.votos.vencedoras()
 
             # empate (duas ou mais opções com a mesma contagem)
             if len(vencedoras) != 1:
-                log.debug(f"Empate detectado: {dict(contagem)} — reiniciando votação.")
-                self.votos.clear()
-                for nome in self.jogadores_conectados:
-                    self.jogadores_conectados[nome]["votou"] = False
+                log.debug("Empate detectado: %s — reiniciando votação.", self.votos.resumo())
+                self.votos.limpar()
+                self.rodada += 1
                 self.resultado_calculado = False  # libera novo cálculo
+                self._iniciar_prazo()
                 self.ultimo_resultado = "Empate! Votem novamente nas mesmas opções."
+                self._notificar("resultado", mensagem=self.ultimo_resultado, empate=True)
                 return self.ultimo_resultado
 
             # opção vencedora
@@ -253,27 +664,32 @@ class MotorJogo:
 
             # define o próximo trecho e armazena o resultado
             self.proximo_trecho_pendente = proximo_trecho
+            self.fim_prazo_votacao = None
+            self._iniciar_prazo_continuar()
             self.ultimo_resultado = (
                 f"Opção {vencedor} venceu com {maior} voto(s)!\n"
                 "Aguardando todos clicarem em 'Continuar' para avançar..."
             )
 
-            log.debug(
-                f"[RESULTADO] {self.ultimo_resultado} | pendente: {self.proximo_trecho_pendente}"
-            )
+            log.debug("[RESULTADO] %s | pendente: %s", self.ultimo_resultado, self.proximo_trecho_pendente)
+            self._notificar("resultado", mensagem=self.ultimo_resultado, empate=False)
 
             return self.ultimo_resultado
 
     def obter_status_votacao(self):
-        """Retorna o status atual da votação (quantos já votaram)."""
-        
-        total_jogadores = len(self.jogadores_conectados)
+        """Retorna o status atual da votação (quantos já votaram), sem lock."""
+        return self.instantaneo.status_votacao
+
+    def _status_votacao(self):
+        #monta o status a partir do estado vivo (na publicação, com o lock do jogo)
+        total_jogadores = self.total_conectados
         total_votos = len(self.votos)
 
         # Caso o jogo ainda não tenha iniciado
         if not self.jogo_iniciado:
-            if total_jogadores < 4:
-                faltam = 4 - total_jogadores
+            necessarios = self.regras.quorum_inicio
+            if total_jogadores < necessarios:
+                faltam = necessarios - total_jogadores
                 return f"Aguardando {faltam} jogador(es) para iniciar o jogo..."
             else:
                 return "O jogo ainda não começou oficialmente."
@@ -283,31 +699,39 @@ class MotorJogo:
             return "Nenhum voto registrado ainda."
 
         # Enquanto ainda há votos faltando
-        if total_votos < total_jogadores:
+        necessarios = self._votos_necessarios()
+        if total_votos < necessarios:
+            if necessarios < total_jogadores:
+                return f"🗳️ {total_votos} de {total_jogadores} jogadores já votaram (a votação fecha com {necessarios})."
             return f"🗳️ {total_votos} de {total_jogadores} jogadores já votaram."
 
-        # Todos já votaram
-        if total_votos == total_jogadores:
+        # Todos já votaram (ou o quórum foi atingido)
+        if total_votos >= total_jogadores:
             return "Todos os jogadores já votaram! Calculando resultado..."
+        return "Quórum de votos atingido! Calculando resultado..."
 
     def avancar_historia(self, proximo_trecho: str):
-        """Thread-safe: avança a história para o próximo trecho e reinicia o ciclo de votação."""
-        with self.lock:
+        """Thread-safe: avança a história para o próximo trecho e reinicia o ciclo de votação.
+        Os leitores só veem o novo trecho quando a seção de escrita mais externa termina.
+        """
+        with self.escrita:
+            self._registrar_escrita("avancar_historia", proximo_trecho)
             # 1) valida o trecho
             if proximo_trecho not in self.historia:
                 return "Trecho inválido."
 
             # 2) atualiza estado do jogo
             self.trecho_atual = proximo_trecho
-            self.votos.clear()
+            self.votos.limpar()
+            self.rodada += 1
             self.jogadores_prontos.clear()
-
-            for nome in self.jogadores_conectados:
-                self.jogadores_conectados[nome]["votou"] = False
+            self.fim_prazo_continuar = None
+            self._iniciar_prazo()
 
             # 3) verifica se o novo trecho tem opções
             trecho = self.historia[self.trecho_atual]
-            opcoes = trecho.get("opcoes", [])
+            opcoes = trecho.opcoes
+            self._notificar("trecho", trecho=self.trecho_atual, fim=not opcoes)
 
             if not opcoes:
                 # fim da história
@@ -318,80 +742,278 @@ class MotorJogo:
 
     def registrar_pronto(self, jogador):
         """Thread-safe e à prova de duplicação de avanço."""
-        with self.lock:
+        with self.escrita:
+            self._registrar_escrita("registrar_pronto", jogador)
             # Se o jogo estiver em transição, ignora novos cliques
             if self.avancando:
-                log.debug(f"[IGNORADO] '{jogador}' tentou confirmar enquanto o jogo avançava.")
+                log.debug("[IGNORADO] '%s' tentou confirmar enquanto o jogo avançava.", jogador)
                 return {"avancar": False, "mensagem": "⏳ O jogo está avançando, aguarde..."}
 
-            # Marca o jogador como pronto
-            self.jogadores_prontos.add(jogador)
+            # Marca o jogador como pronto (só jogadores online da sala contam para o quórum)
+            info = self.jogadores_conectados.get(jogador)
+            if info is not None and info["conectado"]:
+                self.jogadores_prontos.add(jogador)
 
-            total_jogadores = len(self.jogadores_conectados)
+            total_jogadores = self.total_conectados
             prontos = len(self.jogadores_prontos)
+            faltam = total_jogadores - prontos  #contagens, sem percorrer a lista de jogadores
 
-            log.debug(
-                f"[CONTINUAR] Jogador '{jogador}' confirmou. "
-                f"({prontos}/{total_jogadores}) prontos atualmente: {list(self.jogadores_prontos)}"
-            )
-
-            # Revalidação: quem ainda não confirmou
-            faltantes = [
-                nome for nome in self.jogadores_conectados
-                if nome not in self.jogadores_prontos
-            ]
+            log.debug("[CONTINUAR] Jogador '%s' confirmou. (%d/%d) prontos.", jogador, prontos, total_jogadores)
+            self._notificar("pronto", jogador=jogador, prontos=prontos, total=total_jogadores)
 
             # --- todos confirmaram ---
-            if not faltantes and not self.avancando:
-                self.avancando = True  #bloqueia novas confirmações
+            if not faltam and not self.avancando:
                 log.debug("✅ Todos confirmaram. Avançando trecho...")
+                return self._avancar_rodada()
 
-                self.jogadores_prontos.clear()
+            # --- ainda faltam jogadores ---
+            log.debug("⏳ Aguardando %d jogador(es) restante(s).", faltam)
+            return {
+                "avancar": False,
+                "mensagem": f"✅ {jogador} está pronto. Aguardando {faltam} jogador(es)..."
+            }
 
-                if self.proximo_trecho_pendente:
-                    proximo = self.proximo_trecho_pendente
-                    self.proximo_trecho_pendente = None
+    def _avancar_rodada(self):
+        #fecha a rodada de "Continuar" (todos confirmaram ou o prazo acabou); chamar com self.escrita
+        self.avancando = True  #bloqueia novas confirmações
+        self.jogadores_prontos.clear()
 
-                    # Avança a história (já limpa votos e jogadores_prontos)
-                    resultado = self.avancar_historia(proximo)
+        if self.proximo_trecho_pendente:
+            proximo = self.proximo_trecho_pendente
+            self.proximo_trecho_pendente = None
 
-                    #Reseta as flags da rodada de votação
-                    self.resultado_calculado = False
-                    self.ultimo_resultado = None
+            # Avança a história (já limpa votos e jogadores_prontos)
+            resultado = self.avancar_historia(proximo)
 
-                    self.avancando = False  #libera novas confirmações
-                    log.debug(f"🧭 História avançada para: {self.trecho_atual}")
-                    return {"avancar": True, "mensagem": resultado}
+            #Reseta as flags da rodada de votação
+            self.resultado_calculado = False
+            self.ultimo_resultado = None
 
-                self.avancando = False
-                log.debug("🔚 Nenhum trecho pendente — rodada encerrada.")
-                return {"avancar": True, "mensagem": "Avançando para o próximo trecho..."}
+            self.avancando = False  #libera novas confirmações
+            log.debug("🧭 História avançada para: %s", self.trecho_atual)
+            return {"avancar": True, "mensagem": resultado}
 
-            # --- ainda faltam jogadores ---
-            log.debug(f"⏳ Aguardando jogadores restantes: {faltantes}")
-            faltam = len(faltantes)
-            return {
-                "avancar": False,
-                "mensagem": f"✅ {jogador} está pronto. Aguardando {faltam} jogador(es)..."
-            }
+        self.avancando = False
+        log.debug("🔚 Nenhum trecho pendente — rodada encerrada.")
+        return {"avancar": True, "mensagem": "Avançando para o próximo trecho..."}
 
     def enviar_mensagem_chat(self, jogador: str, mensagem: str):
         if not mensagem.strip():
             return "Mensagem vazia não pode ser enviada."
-
-        mensagem = f"{jogador}: {mensagem.strip()}"
-        self.chat.append((jogador, mensagem))
+        if len(mensagem) > LIMITE_TAMANHO_MENSAGEM:
+            return f"Mensagem longa demais (máximo de {LIMITE_TAMANHO_MENSAGEM} caracteres)."
+
+        original, mensagem = mensagem, f"{jogador}: {mensagem.strip()}"
+        #só o lock do chat: mensagens não esperam votos nem avanços de trecho
+        with self.lock_chat:
+            self._registrar("enviar_mensagem_chat", jogador, original)
+            with self.lock_publicacao:
+                versao = self.instantaneo.versao + 1
+                seq = self.chat.adicionar(jogador, mensagem, versao)
+                self._trocar_instantaneo(versao, ("chat",), chat=self.chat.instantaneo,
+                                         versao_chat_descartada=self.chat.versao_descartada)
+        self._entregar((("chat", {"jogador": jogador, "mensagem": mensagem, "seq": seq, "versao": versao}),))
         return f"{jogador} disse: {mensagem}"
     
-    def obter_chat(self, formatado=True):
-        """Retorna o chat formatado para exibição."""
-        if not self.chat:
-            return "Nenhuma mensagem no chat."
-
+    def obter_chat(self, formatado=True, entradas: tuple = None):
+        """Retorna o chat formatado para exibição, ou tupla de (jogador, mensagem) com formatado=False.
+        `entradas` lê o chat de um instantâneo já obtido (padrão: o chat atual).
+        """
+        if entradas is None:
+            entradas = self.chat.instantaneo
         if formatado:
-            texto = "\nChat atual:\n"
-            for jogador, mensagem in self.chat:
-                texto += f"  {mensagem}\n"
-            return texto.strip()
+            if not entradas:
+                return "Nenhuma mensagem no chat."
+            return "Chat atual:\n" + "\n".join(f"  {entrada[3]}" for entrada in entradas)
+
+        return tuple((jogador, mensagem) for _, _, jogador, mensagem in entradas)
+
+    def obter_chat_desde(self, seq: int = 0, entradas: tuple = None) -> dict:
+        """Retorna apenas as mensagens posteriores ao cursor `seq`, como (seq, jogador, mensagem).
+        "truncado" é True quando parte delas já saiu do chat (cursor mais antigo que as mensagens
+        guardadas): as mensagens vindas são o chat inteiro e substituem o que o cliente tem.
+        """
+        if entradas is None:
+            entradas = self.chat.instantaneo
+        return {
+            "mensagens": tuple(self.chat.desde(seq, entradas)),
+            "truncado": self.chat.truncado(seq, entradas),
+        }
+
+    def obter_retomada(self, nome: str, versao: int, com_texto: bool = True) -> dict:
+        """Tudo que o jogador precisa para voltar à rodada depois de uma queda, em uma resposta:
+        trecho atual (o texto só se mudou depois de `versao`), seu voto, se já clicou em
+        "Continuar" e o chat desde `versao`. Com com_texto=False vai só o hash do trecho.
+        """
+        with self.lock:
+            #dentro do lock o instantâneo é exatamente o estado dos votos e dos prontos
+            instantaneo = self.instantaneo
+            meu_voto = self.votos.get(nome)
+            pronto = nome in self.jogadores_prontos
+            continuar = self.proximo_trecho_pendente is not None  #rodada decidida, esperando "Continuar"
+
+        retomada = {
+            "versao": instantaneo.versao,
+            "jogador": nome,
+            "jogo_iniciado": instantaneo.jogo_iniciado,
+            "trecho_id": instantaneo.trecho_atual,
+            "meu_voto": meu_voto,
+            "pronto": pronto,
+            "continuar": continuar,
+            "status_votacao": instantaneo.status_votacao,
+            "resultado": instantaneo.resultado,
+        }
+        versoes = instantaneo.versoes
+        if versoes["trecho"] > versao:
+            self._incluir_trecho(retomada, instantaneo, com_texto)
+
+        self._incluir_chat(retomada, instantaneo, versao)
+        return retomada
+
+    @staticmethod
+    def _incluir_trecho(estado: dict, instantaneo: Instantaneo, com_texto: bool):
+        #o texto de um trecho nunca muda: quem guarda os trechos em cache pede só o hash
+        estado["hash_trecho"] = instantaneo.hash_trecho
+        if com_texto or instantaneo.hash_trecho is None:
+            estado["trecho"] = instantaneo.texto_trecho
+        estado["opcoes"] = instantaneo.opcoes
+
+    def _incluir_chat(self, estado: dict, instantaneo: Instantaneo, versao: int):
+        #chat limpo depois da versão do cliente: reenvia tudo. Truncado: mensagens posteriores a
+        #ela já saíram pelo limite do chat, então também vai o chat inteiro, que substitui o do cliente
+        limpo = instantaneo.versao_chat_limpo > versao
+        truncado = not limpo and instantaneo.versao_chat_descartada > versao
+        novas = self.chat.desde_versao(0 if limpo or truncado else versao, instantaneo.chat)
+        estado["chat_limpo"] = limpo
+        estado["chat_truncado"] = truncado
+        estado["chat"] = tuple(mensagem for _, _, mensagem in novas)
+
+    def obter_estado_desde(self, versao: int, com_texto: bool = True, instantaneo: Instantaneo = None):
+        """Retorna apenas as partes do estado que mudaram depois de `versao`,
+        ou None se nada mudou. Com versao=0 retorna o estado completo.
+        Tudo sai de um único instantâneo (o atual, ou o passado em `instantaneo`):
+        nunca mistura dois momentos da sala.
+        Com com_texto=False o trecho vai só pelo hash (ver obter_texto_trecho).
+        """
+        if instantaneo is None:
+            instantaneo = self.instantaneo
+        if versao >= instantaneo.versao:
+            return None
+
+        estado = {"versao": instantaneo.versao}
+        versoes = instantaneo.versoes
+        if not versao:
+            estado["regras"] = self.regras.como_pares()  #fixas por sala: só no estado completo
 
-        return self.chat
+        if versoes["jogadores"] > versao:
+            estado["jogadores"] = instantaneo.jogadores
+            estado["jogo_iniciado"] = instantaneo.jogo_iniciado
+
+        if versoes["trecho"] > versao:
+            self._incluir_trecho(estado, instantaneo, com_texto)
+
+        if versoes["votacao"] > versao:
+            estado["status_votacao"] = instantaneo.status_votacao
+            estado["resultado"] = instantaneo.resultado
+
+        if versoes["chat"] > versao:
+            self._incluir_chat(estado, instantaneo, versao)
+
+        return estado
+
+    # --- diário (recuperação depois de reiniciar o servidor) ---
+    def exportar_estado(self) -> dict:
+        """Estado da sala para o instantâneo do diário, só com tipos do JSON.
+        Chamar com self.lock e self.lock_chat, para capturar um único momento da sala.
+        """
+        return {
+            "arquivo": self.arquivo_historia,
+            "regras": self.regras.como_pares(),
+            "versao": self.instantaneo.versao,
+            "jogadores": [
+                [nome, info["token"], info["conexoes"], info.get("voto_suspenso"), info.get("restaurado", False)]
+                for nome, info in self.jogadores_conectados.items()
+            ],
+            "jogo_iniciado": self.jogo_iniciado,
+            "trecho_atual": self.trecho_atual,
+            "opcoes_empate": list(self.opcoes_empate),
+            "rodada": self.rodada,
+            "votos": list(self.votos.votos.items()),
+            "prontos": list(self.jogadores_prontos),
+            "proximo_trecho_pendente": self.proximo_trecho_pendente,
+            "resultado_calculado": self.resultado_calculado,
+            "ultimo_resultado": self.ultimo_resultado,
+            "chat": [list(entrada) for entrada in self.chat.instantaneo],
+            "ultimo_seq": self.chat.ultimo_seq,
+        }
+
+    def restaurar_estado(self, estado: dict):
+        """Carrega um estado de exportar_estado numa sala nova (antes de o servidor atender)."""
+        self.jogadores_conectados = {}
+        self.tokens = {}
+        for nome, token, conexoes, suspenso, *restaurado in estado["jogadores"]:
+            restaurado = bool(restaurado and restaurado[0])  #instantâneos antigos não têm o campo
+            info = {"conectado": conexoes > 0 or restaurado, "conexoes": conexoes, "token": token}
+            if suspenso:
+                info["voto_suspenso"] = tuple(suspenso)
+            if restaurado:
+                info["restaurado"] = True
+            self.jogadores_conectados[nome] = info
+            self.tokens[token] = nome
+        self.total_conectados = sum(1 for info in self.jogadores_conectados.values() if info["conectado"])
+
+        self.jogo_iniciado = estado["jogo_iniciado"]
+        self.trecho_atual = estado["trecho_atual"]
+        self.opcoes_empate = tuple(estado["opcoes_empate"])
+        self.rodada = estado["rodada"]
+        self.votos.limpar()
+        for nome, opcao in estado["votos"]:
+            self.votos.registrar(nome, opcao)
+        self.jogadores_prontos = set(estado["prontos"])
+        self.proximo_trecho_pendente = estado["proximo_trecho_pendente"]
+        self.resultado_calculado = estado["resultado_calculado"]
+        self.ultimo_resultado = estado["ultimo_resultado"]
+
+        self.chat.mensagens.extend(tuple(entrada) for entrada in estado["chat"])
+        self.chat.ultimo_seq = estado["ultimo_seq"]
+        self.chat.instantaneo = tuple(self.chat.mensagens)
+        with self.lock_publicacao:
+            self._trocar_instantaneo(estado["versao"], (), chat=self.chat.instantaneo)
+
+    def concluir_restauracao(self):
+        """Fim da recuperação: ninguém está conectado a um servidor que acabou de subir, mas quem
+        estava online continua contando nos quóruns, com voto e "Continuar", por ESPERA_RETOMADA
+        segundos (ver expirar_restaurados): a rodada não fecha com o voto de quem retomar a
+        sessão primeiro. Os prazos da rodada recomeçam e um instantâneo novo, com todas as
+        partes, é publicado.
+        """
+        self.restaurando = False
+        with self.escrita:
+            for info in self.jogadores_conectados.values():
+                if info["conectado"]:
+                    info["conexoes"] = 0
+                    info["restaurado"] = True
+            self.vazia_desde = None if self.total_conectados else time.monotonic()
+            if self.total_conectados and self.agendador is not None:
+                self.agendador.agendar_em(ESPERA_RETOMADA, self.expirar_restaurados)
+
+            if self.jogo_iniciado:
+                if not self.resultado_calculado:
+                    self._iniciar_prazo()
+                self._iniciar_prazo_continuar()
+
+            #versão acima de qualquer uma que um cliente tenha visto: quem retomar recebe tudo
+            with self.lock_publicacao:
+                versao = ((self.instantaneo.versao >> BITS_EPOCA) + 1) << BITS_EPOCA
+                self._trocar_instantaneo(versao, ("chat",), versao_chat_limpo=versao)
+            self.partes_alteradas.update(PARTES)
+
+    def expirar_restaurados(self):
+        """Fim da espera pela retomada: quem foi recuperado online e não voltou fica offline,
+        como numa queda (sai dos quóruns com o voto suspenso). Chamado pelo Agendador.
+        """
+        with self.escrita:
+            self._registrar_escrita("expirar_restaurados")
+            for nome, info in list(self.jogadores_conectados.items()):
+                if info.get("restaurado"):
+                    self.desconectar_jogador(nome)
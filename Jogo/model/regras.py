@@ -0,0 +1,68 @@
+import math
+
+MIN_JOGADORES_PADRAO = 4  #a mesa original: o jogo começa com quatro jogadores
+
+
+class RegrasSala:
+    """Tamanho da sala e quóruns, definidos na criação da sala:
+
+    - min_jogadores: o jogo não começa com menos jogadores que isso;
+    - max_jogadores: novos jogadores são recusados com a sala cheia (None = sem limite);
+    - quorum_inicio: jogadores conectados para o jogo começar sozinho (padrão: min_jogadores);
+    - quorum_votacao: fração dos votantes que encerra a votação (1.0 = todos);
+    - prazo_votacao: segundos até a votação fechar com os votos recebidos (None = sem prazo);
+    - prazo_continuar: segundos até a história avançar sem esperar quem não clicou em
+      "Continuar" (None = espera todos).
+    """
+
+    CAMPOS = ("min_jogadores", "max_jogadores", "quorum_inicio", "quorum_votacao", "prazo_votacao",
+              "prazo_continuar")
+
+    def __init__(self, min_jogadores: int = MIN_JOGADORES_PADRAO, max_jogadores: int = None,
+                 quorum_inicio: int = None, quorum_votacao: float = 1.0, prazo_votacao: float = None,
+                 prazo_continuar: float = None):
+        if quorum_inicio is None:
+            quorum_inicio = min_jogadores
+
+        if min_jogadores < 1:
+            raise ValueError("A sala precisa de pelo menos 1 jogador.")
+        if max_jogadores is not None and max_jogadores < min_jogadores:
+            raise ValueError("max_jogadores não pode ser menor que min_jogadores.")
+        if quorum_inicio < min_jogadores or (max_jogadores is not None and quorum_inicio > max_jogadores):
+            raise ValueError("quorum_inicio deve ficar entre min_jogadores e max_jogadores.")
+        if not 0 < quorum_votacao <= 1:
+            raise ValueError("quorum_votacao deve ser uma fração em (0, 1].")
+        if prazo_votacao is not None and prazo_votacao <= 0:
+            raise ValueError("prazo_votacao deve ser positivo (ou None, sem prazo).")
+        if prazo_continuar is not None and prazo_continuar <= 0:
+            raise ValueError("prazo_continuar deve ser positivo (ou None, sem prazo).")
+
+        self.min_jogadores = int(min_jogadores)
+        self.max_jogadores = None if max_jogadores is None else int(max_jogadores)
+        self.quorum_inicio = int(quorum_inicio)
+        self.quorum_votacao = float(quorum_votacao)
+        self.prazo_votacao = None if prazo_votacao is None else float(prazo_votacao)
+        self.prazo_continuar = None if prazo_continuar is None else float(prazo_continuar)
+
+    @classmethod
+    def de_pares(cls, pares):
+        """Cria as regras a partir de pares (campo, valor), como chegam pela rede."""
+        dados = dict(pares)
+        desconhecidos = set(dados) - set(cls.CAMPOS)
+        if desconhecidos:
+            raise ValueError(f"Regras desconhecidas: {', '.join(sorted(desconhecidos))}.")
+        return cls(**dados)
+
+    def como_pares(self) -> tuple:
+        """Pares (campo, valor): uma tupla chega ao cliente por valor."""
+        return tuple((campo, getattr(self, campo)) for campo in self.CAMPOS)
+
+    def aceita_jogador(self, total: int) -> bool:
+        return self.max_jogadores is None or total < self.max_jogadores
+
+    def votos_necessarios(self, votantes: int) -> int:
+        """Votos que encerram a votação com `votantes` jogadores na rodada."""
+        return max(1, math.ceil(self.quorum_votacao * votantes - 1e-9))
+
+    def __repr__(self):
+        return "RegrasSala(" + ", ".join(f"{campo}={valor!r}" for campo, valor in self.como_pares()) + ")"
@@ -0,0 +1,286 @@
+import threading
+import logging
+import time
+import uuid
+
+from model.motor_jogo import MotorJogo, OPERACOES_DIARIO
+from model.chat import LIMITE_CHAT_PADRAO
+from model.historia import HistoriaCompilada
+from model.regras import RegrasSala
+
+log = logging.getLogger("ServidorRPyC")  # usa o mesmo logger do servidor
+
+SALA_PADRAO = "principal"  #sala usada por clientes que não informam uma sala
+
+
+class SemLock:
+    """Lock nulo: para salas atendidas por um único thread (servidor asyncio),
+    onde nenhuma chamada concorre com outra e um lock de verdade só custaria tempo.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def acquire(self, blocking=True, timeout=-1):
+        return True
+
+    def release(self):
+        pass
+
+
+class GerenciadorSalas:
+    """Registro de salas do servidor: cada sala possui seu próprio MotorJogo (e seu próprio lock),
+    então uma votação lenta em uma mesa nunca bloqueia as outras.
+    """
+
+    def __init__(self, arquivo_historia: str, limite_chat: int = LIMITE_CHAT_PADRAO, regras: RegrasSala = None,
+                 agendador=None):
+        self.arquivo_historia = arquivo_historia  #história padrão das novas salas
+        self.limite_chat = limite_chat  #mensagens de chat mantidas por sala
+        self.regras_padrao = regras if regras is not None else RegrasSala()  #regras de salas criadas sem regras
+        self.agendador = agendador  #um único Agendador aplica os prazos de todas as salas
+        self.salas = {}  #dicionario sala_id -> MotorJogo
+        self.historias = {}  #cache arquivo -> história compilada (compartilhada entre salas)
+        self.lock = threading.Lock()  #protege apenas o registro, nunca o estado de uma sala
+        self.fabrica_lock = threading.RLock  #cria os locks (jogo e chat) de cada nova sala
+        self.diario = None  #Diario que registra as salas criadas e removidas (e cada mudança nelas)
+
+    def usar_fabrica_lock(self, fabrica):
+        """Troca o tipo de lock das salas (ex.: SemLock no servidor asyncio).
+        Deve ser chamado antes de o servidor começar a atender conexões.
+        """
+        self.fabrica_lock = fabrica
+        for motor in self.salas.values():
+            motor.lock = fabrica()
+            motor.lock_chat = fabrica()
+
+    def usar_regras_padrao(self, regras: RegrasSala):
+        """Troca as regras padrão (ex.: vindas da linha de comando do servidor), inclusive das
+        salas que já existem. Deve ser chamado antes de o servidor começar a atender conexões.
+        """
+        self.regras_padrao = regras
+        for motor in self.salas.values():
+            motor.regras = regras
+
+    def _historia(self, arquivo: str) -> dict:
+        #carrega e compila cada arquivo de história uma única vez, mesmo com milhares de salas
+        if arquivo not in self.historias:
+            self.historias[arquivo] = HistoriaCompilada(MotorJogo.carregar_historia(arquivo))
+        return self.historias[arquivo]
+
+    def criar_sala(self, sala_id: str = None, arquivo_historia: str = None, regras: RegrasSala = None) -> str:
+        """Cria uma nova sala e retorna seu id. Gera um id aleatório se nenhum for informado."""
+        arquivo = arquivo_historia or self.arquivo_historia
+        with self.lock:
+            if sala_id is None:
+                sala_id = uuid.uuid4().hex[:8]
+            if sala_id in self.salas:
+                raise ValueError(f"A sala '{sala_id}' já existe.")
+
+            regras = regras if regras is not None else self.regras_padrao
+            self.salas[sala_id] = self._novo_motor(arquivo, regras, sala_id)
+            self._registrar(sala_id, "criar_sala", arquivo, regras.como_pares())
+
+        log.info(f"Sala '{sala_id}' criada ({arquivo}).")
+        return sala_id
+
+    def _novo_motor(self, arquivo: str, regras: RegrasSala, sala_id: str) -> MotorJogo:
+        #chamado com self.lock
+        motor = MotorJogo(
+            arquivo, historia=self._historia(arquivo), limite_chat=self.limite_chat,
+            lock=self.fabrica_lock(), lock_chat=self.fabrica_lock(), regras=regras
+        )
+        motor.agendador = self.agendador
+        motor.diario = self.diario
+        motor.sala_id = sala_id
+        return motor
+
+    def _registrar(self, sala_id: str, operacao: str, *args):
+        #chamado com self.lock: criação e remoção entram no diário na ordem em que aconteceram
+        if self.diario is not None:
+            self.diario.registrar(sala_id, operacao, args)
+
+    def obter_sala(self, sala_id: str):
+        """Retorna o MotorJogo da sala, ou None se ela não existir."""
+        return self.salas.get(sala_id)
+
+    def remover_sala(self, sala_id: str) -> bool:
+        """Remove a sala do registro. Retorna False se ela não existia."""
+        with self.lock:
+            motor = self.salas.pop(sala_id, None)
+            if motor is not None:
+                self._registrar(sala_id, "remover_sala")
+
+        if motor is None:
+            return False
+
+        log.info(f"Sala '{sala_id}' removida.")
+        return True
+
+    def recolher_salas_vazias(self, ociosidade: float) -> list:
+        """Remove as salas sem nenhum jogador online há mais de `ociosidade` segundos.
+        A sala padrão nunca some: se alguém jogou nela, é recriada limpa. Retorna os ids removidos.
+        """
+        limite = time.monotonic() - ociosidade
+        with self.lock:
+            vazias = [
+                sala_id for sala_id, motor in self.salas.items()
+                if motor.vazia_desde is not None and motor.vazia_desde < limite
+                and (sala_id != SALA_PADRAO or motor.jogadores_conectados)
+            ]
+            for sala_id in vazias:
+                motor = self.salas.pop(sala_id)
+                self._registrar(sala_id, "remover_sala")
+                if sala_id == SALA_PADRAO:
+                    self.salas[sala_id] = self._novo_motor(self.arquivo_historia, motor.regras, sala_id)
+                    self._registrar(sala_id, "criar_sala", self.arquivo_historia, motor.regras.como_pares())
+
+        if vazias:
+            log.info(f"{len(vazias)} sala(s) ociosa(s) recolhida(s).")
+        return vazias
+
+    def listar_salas(self) -> list:
+        """Retorna (sala_id, jogadores, jogo_iniciado) de cada sala."""
+        with self.lock:
+            salas = list(self.salas.items())
+
+        return [
+            (sala_id, len(motor.instantaneo.jogadores), motor.instantaneo.jogo_iniciado)
+            for sala_id, motor in salas
+        ]
+
+    # --- diário ---
+    def usar_diario(self, diario) -> dict:
+        """Recupera as salas gravadas no diário e passa a registrar nele todas as mudanças.
+        Deve ser chamado antes de o servidor começar a atender conexões.
+        Retorna quanto a recuperação leu e quanto tempo levou.
+        """
+        inicio = time.perf_counter()
+        tamanho = diario.tamanho()
+        estado = diario.ler_estado()
+
+        with self.lock:
+            lsn_salas = self._carregar(estado["salas"]) if estado is not None else {}
+            for motor in self.salas.values():
+                motor.restaurando = True
+            registros = self._refazer_registros(diario.ler_registros(), lsn_salas)
+            self._concluir(diario)
+
+        diario.abrir()
+        self.gravar_instantaneo()  #a próxima recuperação começa daqui, sem refazer o diário antigo
+
+        recuperacao = {
+            "salas": len(self.salas),
+            "registros": registros,
+            "bytes": tamanho,
+            "segundos": time.perf_counter() - inicio,
+        }
+        if diario.diretorio is not None:
+            log.info(f"Diário recuperado: {recuperacao['salas']} sala(s), {registros} registro(s), "
+                     f"{tamanho / 1024:.0f} KB em {recuperacao['segundos'] * 1000:.0f} ms.")
+        return recuperacao
+
+    def _carregar(self, estados: dict) -> dict:
+        #cria as salas de um instantâneo (com self.lock); retorna sala_id -> lsn do instantâneo
+        #(os registros da sala até esse lsn já estão no estado)
+        lsn_salas = {}
+        for sala_id, dados in estados.items():
+            motor = self._novo_motor(dados["arquivo"], RegrasSala.de_pares(dados["regras"]), sala_id)
+            motor.restaurar_estado(dados)
+            motor.restaurando = True
+            self.salas[sala_id] = motor
+            lsn_salas[sala_id] = dados["lsn"]
+        return lsn_salas
+
+    def _refazer_registros(self, registros, lsn_salas: dict) -> int:
+        #aplica registros [lsn, sala_id, operacao, *args] em ordem (com self.lock), pulando os
+        #que o instantâneo já contém; retorna quantos foram lidos
+        lidos = 0
+        for lsn, sala_id, operacao, *args in registros:
+            lidos += 1
+            if lsn <= lsn_salas.get(sala_id, 0):
+                continue
+            self._refazer(sala_id, operacao, args)
+        return lidos
+
+    def _concluir(self, diario):
+        #fim da recuperação (com self.lock): as salas voltam a valer e registram no diário
+        for sala_id, motor in self.salas.items():
+            motor.diario = diario
+            motor.sala_id = sala_id
+            motor.concluir_restauracao()
+        self.diario = diario
+
+    def _refazer(self, sala_id: str, operacao: str, args):
+        #aplica um registro do diário na recuperação (com self.lock)
+        if operacao == "criar_sala":
+            arquivo, regras = args
+            motor = self._novo_motor(arquivo, RegrasSala.de_pares(regras), sala_id)
+            motor.restaurando = True
+            self.salas[sala_id] = motor
+        elif operacao == "remover_sala":
+            self.salas.pop(sala_id, None)
+        elif operacao in OPERACOES_DIARIO and sala_id in self.salas:
+            try:
+                getattr(self.salas[sala_id], operacao)(*args)
+            except Exception as e:
+                #a operação também falhou quando foi executada: o estado segue igual ao de antes
+                log.debug(f"Registro '{operacao}' da sala '{sala_id}' falhou na recuperação: {e}")
+
+    def exportar_salas(self, diario) -> dict:
+        """Estado de todas as salas, cada uma com o lsn de `diario` no momento em que foi
+        copiada (os registros dela até esse lsn estão no estado). O registro de salas fica
+        preso só para listar as salas, e cada sala só pelo tempo de copiar seu estado.
+
+        Uma sala criada depois da lista, ou removida antes de ser copiada, fica de fora: o
+        registro dela é posterior ao início da captura e a recuperação o refaz. Uma removida
+        depois da cópia tem o registro de remoção acima do lsn copiado, e também é refeita.
+        """
+        with self.lock:
+            salas = list(self.salas.items())
+        estados = {}
+        for sala_id, motor in salas:
+            with motor.lock, motor.lock_chat:
+                estado = motor.exportar_estado()
+                estado["lsn"] = diario.lsn  #registros da sala até aqui estão no estado
+            if self.salas.get(sala_id) is motor:
+                estados[sala_id] = estado
+        return estados
+
+    def gravar_instantaneo(self):
+        """Grava o estado de todas as salas no diário, que então descarta os segmentos antigos.
+        A cópia roda em quem chama; o arquivo é gravado depois, no thread do diário.
+        """
+        diario = self.diario
+        if diario is None or diario.diretorio is None:
+            return
+        lsn_inicio = diario.iniciar_instantaneo()
+        diario.concluir_instantaneo(lsn_inicio, self.exportar_salas(diario))
+
+    # --- replicação (servidor reserva) ---
+    def carregar_replica(self, estados: dict) -> dict:
+        """Troca todas as salas pelas de um instantâneo recebido do primário e retorna o lsn de
+        cada uma (ver aplicar_replica). As salas ficam em recuperação até assumir().
+        """
+        with self.lock:
+            self.salas = {}
+            return self._carregar(estados)
+
+    def aplicar_replica(self, registros, lsn_salas: dict) -> int:
+        """Aplica registros do diário do primário, em ordem, como na recuperação."""
+        with self.lock:
+            return self._refazer_registros(registros, lsn_salas)
+
+    def assumir(self, diario):
+        """O primário caiu e este servidor passa a atender no lugar dele: as salas replicadas
+        saem da recuperação (todos offline até retomarem a sessão) e as mudanças seguintes vão
+        para `diario`, que continua a numeração do primário.
+        Deve ser chamado antes de o servidor começar a atender conexões.
+        """
+        with self.lock:
+            self._concluir(diario)
+        diario.abrir()
+        self.gravar_instantaneo()
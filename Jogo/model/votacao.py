@@ -0,0 +1,74 @@
+class ApuracaoVotos:
+    """Votos de uma rodada com a apuração mantida a cada voto: contagem por opção e
+    opções agrupadas pela contagem, então total, vencedora e empate saem em O(1)
+    (O(opções empatadas) no pior caso), sem percorrer os votos de milhares de jogadores.
+    """
+
+    def __init__(self):
+        self.votos = {}  #jogador -> opção (1..N)
+        self.contagem = {}  #opção -> votos (só opções com pelo menos um voto)
+        self.por_contagem = {}  #votos -> conjunto de opções com exatamente essa contagem
+        self.maior = 0  #maior contagem atual
+
+    def __len__(self):
+        return len(self.votos)
+
+    def __contains__(self, jogador):
+        return jogador in self.votos
+
+    def get(self, jogador, padrao=None):
+        return self.votos.get(jogador, padrao)
+
+    def _mover(self, opcao: int, delta: int):
+        atual = self.contagem.get(opcao, 0)
+        novo = atual + delta
+
+        if atual:
+            grupo = self.por_contagem[atual]
+            grupo.discard(opcao)
+            if not grupo:
+                del self.por_contagem[atual]
+                if atual == self.maior and delta < 0:
+                    self.maior = novo  #a própria opção continua com a maior contagem
+
+        if novo:
+            self.contagem[opcao] = novo
+            self.por_contagem.setdefault(novo, set()).add(opcao)
+            if novo > self.maior:
+                self.maior = novo
+        else:
+            del self.contagem[opcao]
+
+    def registrar(self, jogador, opcao: int):
+        """Registra (ou troca) o voto do jogador. Retorna a opção anterior, ou None."""
+        anterior = self.votos.get(jogador)
+        if anterior == opcao:
+            return anterior
+        if anterior is not None:
+            self._mover(anterior, -1)
+        self.votos[jogador] = opcao
+        self._mover(opcao, +1)
+        return anterior
+
+    def remover(self, jogador):
+        """Retira o voto do jogador (ex.: ele saiu da sala). Retorna a opção, ou None."""
+        opcao = self.votos.pop(jogador, None)
+        if opcao is not None:
+            self._mover(opcao, -1)
+        return opcao
+
+    def limpar(self):
+        self.votos = {}
+        self.contagem = {}
+        self.por_contagem = {}
+        self.maior = 0
+
+    def vencedoras(self) -> tuple:
+        """Opções com a maior contagem, em ordem (mais de uma = empate)."""
+        if not self.maior:
+            return ()
+        return tuple(sorted(self.por_contagem[self.maior]))
+
+    def resumo(self) -> dict:
+        """Contagem por opção: tamanho limitado pelo número de opções, próprio para logs."""
+        return dict(sorted(self.contagem.items()))
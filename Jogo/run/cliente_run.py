@@ -2,6 +2,7 @@
 
 import sys
 import os
+import argparse
 import tkinter as tk
 
 # Adiciona o diretório raiz ao path para garantir que 'controller' seja encontrado
@@ -9,9 +10,21 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # from controller.controller_cliente import ClienteApp # Importa a classe do Controller
 from controller.controller_cliente import ClienteApp
+from controller.replicacao import ler_endereco
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cliente do jogo")
+    parser.add_argument("sala", nargs="?", default="principal", help="sala do servidor")
+    parser.add_argument("--modo", choices=("threaded", "async"), default="threaded",
+                        help="deve ser o mesmo modo usado pelo servidor")
+    parser.add_argument("--cache-trechos", metavar="DIR",
+                        help="guarda os trechos recebidos neste diretório, entre sessões (padrão: só em memória)")
+    parser.add_argument("--servidor", metavar="HOST:PORTA", type=ler_endereco, action="append",
+                        help="servidor do jogo (padrão: localhost:18812); repita para os reservas, "
+                             "tentados em ordem quando a conexão cai")
+    args = parser.parse_args()
+
     root = tk.Tk()
     # O Controller é instanciado, iniciando a conexão e o loop de atualização
-    app = ClienteApp()
+    app = ClienteApp(args.sala, args.modo, args.cache_trechos, args.servidor)
     root.mainloop()
\ No newline at end of file
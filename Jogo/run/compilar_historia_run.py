@@ -0,0 +1,43 @@
+# compilar_historia_run.py
+# Pré-compila as histórias (model/dao/*.yaml) no cache binário, para o deploy,
+# e mostra o tempo de carga pelo YAML e pelo cache.
+#
+# uso: python run/compilar_historia_run.py [historia.yaml ...]
+
+import sys
+import os
+import glob
+import time
+
+# Adiciona o diretório raiz ao path para garantir que 'model' seja encontrado
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.motor_jogo import BASE_DIR
+from model.dao import cache_historia
+
+
+def medir(funcao, caminho, repeticoes=5):
+    #menor tempo (ms) entre algumas repetições
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(caminho)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+
+if __name__ == "__main__":
+    pasta_dao = os.path.join(BASE_DIR, "dao")
+    arquivos = sys.argv[1:] or sorted(os.path.basename(c) for c in glob.glob(os.path.join(pasta_dao, "*.yaml")))
+
+    print(f"Loader YAML: {cache_historia.LoaderYaml.__name__}")
+    for arquivo in arquivos:
+        caminho = os.path.join(pasta_dao, arquivo)
+        dados = cache_historia.compilar(caminho)
+
+        tempo_yaml = medir(cache_historia.ler_yaml, caminho)
+        tempo_cache = medir(cache_historia.carregar, caminho)
+
+        print(f"{arquivo}: {len(dados)} trechos -> {cache_historia.caminho_cache(caminho)}")
+        print(f"  YAML:  {tempo_yaml:8.2f} ms")
+        print(f"  cache: {tempo_cache:8.2f} ms  ({tempo_yaml / tempo_cache:.0f}x mais rápido)")
@@ -3,22 +3,106 @@
 import sys
 import os
 import socket
+import argparse
 from rpyc.utils.server import ThreadedServer
-from controller.servidor_controller import JogoService # Importação corrigida
+from controller.servidor_controller import JogoService, salas, agendador, admin # Importação corrigida
+from controller import metricas
+from controller.replicacao import Primario, Replica, ler_endereco, ESPERA_ASSUMIR
+from model.regras import RegrasSala, MIN_JOGADORES_PADRAO
+from model.dao.diario import Diario, REGISTROS_POR_INSTANTANEO
 
 # Adiciona o diretório raiz ao path para garantir que 'service' seja encontrado
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-hostname = socket.gethostname()
-endereco_ip = socket.gethostbyname(hostname)
-porta = 18812
 
-print("Iniciando Servidor RPyC...")
-print(f"Endereço: {endereco_ip}")
-print(f"Porta {porta} ")
+def criar_parser() -> argparse.ArgumentParser:
+    """Opções de linha de comando do servidor (também usadas por servidor.py)."""
+    parser = argparse.ArgumentParser(description="Servidor do jogo")
+    parser.add_argument("--porta", type=int, default=18812, help="porta dos clientes")
+    parser.add_argument("--modo", choices=("threaded", "async"), default="threaded",
+                        help="threaded: RPyC com um thread por conexão; async: um único event loop")
+    parser.add_argument("--metricas-porta", type=int, help="serve as métricas (Prometheus) nesta porta HTTP")
+    parser.add_argument("--metricas-arquivo", help="regrava as métricas (Prometheus) neste arquivo a cada 15 s")
+    parser.add_argument("--min-jogadores", type=int, default=MIN_JOGADORES_PADRAO, help="mínimo de jogadores por sala")
+    parser.add_argument("--max-jogadores", type=int, help="máximo de jogadores por sala (padrão: sem limite)")
+    parser.add_argument("--quorum-inicio", type=int, help="jogadores para o jogo começar (padrão: o mínimo)")
+    parser.add_argument("--quorum-votacao", type=float, default=1.0, help="fração dos votos que encerra a votação")
+    parser.add_argument("--prazo-votacao", type=float, help="segundos até a votação fechar com os votos recebidos")
+    parser.add_argument("--prazo-continuar", type=float, help="segundos até avançar sem esperar todos clicarem em Continuar")
+    parser.add_argument("--diario", help="diretório do diário: as salas sobrevivem a um reinício do servidor")
+    parser.add_argument("--instantaneo-registros", type=int, default=REGISTROS_POR_INSTANTANEO,
+                        help="registros no diário entre dois instantâneos (recuperação mais curta)")
+    parser.add_argument("--replicacao-porta", type=int,
+                        help="aceita servidores reserva nesta porta e replica para eles cada mudança nas salas")
+    parser.add_argument("--reserva-de", metavar="HOST:PORTA", type=ler_endereco, action="append",
+                        help="sobe como reserva: segue a porta de replicação do primário e assume quando ele cai "
+                             "(repita para os reservas que assumem antes deste, em ordem)")
+    parser.add_argument("--espera-assumir", type=float, default=ESPERA_ASSUMIR,
+                        help="segundos sem primário, por --reserva-de, antes de assumir")
+    parser.add_argument("--token-admin", default=os.environ.get("JOGO_TOKEN_ADMIN"),
+                        help="senha de autenticar_admin, que libera criar/remover salas e ler as métricas por RPC "
+                             "(padrão: $JOGO_TOKEN_ADMIN; sem ela, essas chamadas ficam desligadas)")
+    return parser
 
-#instancia o servidor
-t = ThreadedServer(JogoService, port=porta)
 
-#inicia o servidor
-t.start()
\ No newline at end of file
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    porta = args.porta
+
+    try:
+        salas.usar_regras_padrao(RegrasSala(args.min_jogadores, args.max_jogadores, args.quorum_inicio,
+                                            args.quorum_votacao, args.prazo_votacao, args.prazo_continuar))
+    except ValueError as e:
+        parser.error(str(e))
+    admin["token"] = args.token_admin
+
+    diario = None
+    if args.reserva_de:
+        #não atende clientes até o primário cair: só então as salas replicadas passam a valer
+        print(f"Servidor reserva: replicando de {', '.join(f'{h}:{p}' for h, p in args.reserva_de)}...")
+        replica = Replica(salas, args.reserva_de, args.espera_assumir)
+        replica.seguir()
+        diario = Diario(args.diario, registros_por_instantaneo=args.instantaneo_registros) if args.diario else Diario()
+        assuncao = replica.assumir(diario)
+        print(f"Primário caiu: assumindo com {assuncao['salas']} sala(s) até o lsn {assuncao['lsn']}, "
+              f"{assuncao['segundos'] * 1000:.0f} ms depois da queda")
+    elif args.diario:
+        #antes de atender: as salas recuperadas já devem estar no lugar
+        diario = Diario(args.diario, registros_por_instantaneo=args.instantaneo_registros)
+        recuperacao = salas.usar_diario(diario)
+        print(f"Diário: {recuperacao['salas']} sala(s) recuperada(s), {recuperacao['registros']} registro(s) "
+              f"em {recuperacao['segundos'] * 1000:.0f} ms")
+
+    if args.replicacao_porta:
+        if diario is None:
+            diario = Diario()  #sem disco: só numera as mudanças para os reservas
+            salas.usar_diario(diario)
+        Primario(salas, diario, args.replicacao_porta, agendador=agendador).iniciar()
+
+    if args.metricas_porta:
+        metricas.iniciar_exportacao_http(args.metricas_porta)
+    if args.metricas_arquivo:
+        metricas.iniciar_exportacao_arquivo(args.metricas_arquivo)
+
+    print(f"Iniciando Servidor ({args.modo})...")
+    print(f"Endereço: {socket.gethostbyname(socket.gethostname())}")
+    print(f"Porta {porta} ")
+
+    try:
+        if args.modo == "async":
+            from controller import servidor_async
+            servidor_async.iniciar(porta)
+        else:
+            #instancia o servidor
+            t = ThreadedServer(JogoService, port=porta)
+
+            #inicia o servidor
+            t.start()
+    finally:
+        if diario is not None:
+            diario.parar()  #grava o que ainda estava no lote
+
+
+if __name__ == "__main__":
+    main()
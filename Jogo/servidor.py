@@ -1,8 +1,6 @@
 # servidor.py
-from rpyc.utils.server import ThreadedServer
-from controller.servidor_controller import JogoService
+# Atalho para subir o servidor a partir da raiz do projeto: mesmas opções de run/servidor_run.py.
+from run.servidor_run import main
 
 if __name__ == "__main__":
-    server = ThreadedServer(JogoService, port=18812)
-    print("Servidor RPyC rodando na porta 18812...")
-    server.start()
+    main()
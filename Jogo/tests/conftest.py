@@ -0,0 +1,75 @@
+# tests/conftest.py
+# Fixtures comuns: uma história sintética pequena (sem YAML) e salas que jogam algumas rodadas.
+
+import sys
+import os
+import logging
+
+# Adiciona o diretório raiz ao path para garantir que 'model' seja encontrado
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from model.salas import GerenciadorSalas
+from model.regras import RegrasSala
+from model.historia import HistoriaCompilada
+
+HISTORIA = "teste"  #nome da história sintética no cache de histórias do gerenciador
+JOGADORES = ("ana", "bia", "caio")
+
+
+def historia_ciclica(trechos=12):
+    """Cada trecho com duas opções que levam aos dois seguintes: a história nunca acaba."""
+    return {
+        f"t{i}": {
+            "texto": f"Trecho {i}.",
+            "opcoes": [
+                {"texto": f"Ir para {(i + n) % trechos}", "proximo": f"t{(i + n) % trechos}"}
+                for n in (1, 2)
+            ],
+        }
+        for i in range(trechos)
+    }
+
+
+@pytest.fixture(autouse=True)
+def sem_logs():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(scope="session")
+def historia():
+    return HistoriaCompilada(historia_ciclica())
+
+
+@pytest.fixture
+def gerenciador(historia):
+    """Fábrica de GerenciadorSalas com a história sintética já no cache."""
+    def criar():
+        salas = GerenciadorSalas(HISTORIA)
+        salas.historias[HISTORIA] = historia
+        return salas
+    return criar
+
+
+def criar_sala(salas, sala_id):
+    """Sala com os JOGADORES online e o jogo iniciado."""
+    salas.criar_sala(sala_id, regras=RegrasSala(min_jogadores=len(JOGADORES)))
+    motor = salas.obter_sala(sala_id)
+    for nome in JOGADORES:
+        motor.adicionar_jogador(nome)
+    return motor
+
+
+def jogar(motor, rodadas):
+    """Rodadas completas (votos, "Continuar" e chat), terminando no meio de uma votação."""
+    for rodada in range(rodadas):
+        for i, nome in enumerate(JOGADORES):
+            motor.enviar_mensagem_chat(nome, f"{nome} na rodada {rodada}")
+            motor.registrar_voto(nome, 1 + (i + rodada) % 2)
+        for nome in JOGADORES:
+            motor.registrar_pronto(nome)
+    motor.registrar_voto(JOGADORES[0], 1)
+    motor.enviar_mensagem_chat(JOGADORES[1], "a última")
@@ -0,0 +1,141 @@
+# tests/test_diario.py
+# Recuperação das salas pelo diário (model/dao/diario.py e GerenciadorSalas.usar_diario).
+
+import pytest
+
+from model.dao.diario import Diario
+from conftest import JOGADORES, criar_sala, jogar
+
+
+def estado_recuperavel(motor) -> dict:
+    #o que a recuperação preserva: a versão começa uma época nova e ninguém está conectado
+    #a um servidor que acabou de subir, então ficam de fora a versão e as conexões
+    estado = motor.exportar_estado()
+    estado.pop("versao")
+    estado["jogadores"] = [[nome, token, suspenso] for nome, token, _, suspenso, _ in estado["jogadores"]]
+    return estado
+
+
+def refazer(gerenciador, registros):
+    #salas só pelos registros, sem instantâneo e sem concluir a recuperação
+    salas = gerenciador()
+    salas.carregar_replica({})
+    salas.aplicar_replica(registros, {})
+    return salas
+
+
+def recuperar(gerenciador, diretorio):
+    salas = gerenciador()
+    diario = Diario(str(diretorio))
+    salas.usar_diario(diario)
+    return salas, diario
+
+
+@pytest.fixture
+def jogadas(gerenciador, tmp_path):
+    """Duas salas jogadas com o diário ligado em tmp_path (já parado)."""
+    salas = gerenciador()
+    diario = Diario(str(tmp_path), registros_por_instantaneo=10 ** 9)
+    salas.usar_diario(diario)
+    jogar(criar_sala(salas, "sala1"), 5)
+    jogar(criar_sala(salas, "sala2"), 3)
+    salas.obter_sala("sala2").desconectar_jogador("caio")
+    diario.parar()
+    return salas
+
+
+def test_refazer_o_diario_reproduz_exportar_estado(jogadas, gerenciador, tmp_path):
+    refeitas = refazer(gerenciador, Diario(str(tmp_path)).ler_registros())
+
+    assert refeitas.salas.keys() == jogadas.salas.keys()
+    for sala_id, motor in jogadas.salas.items():
+        assert refeitas.obter_sala(sala_id).exportar_estado() == motor.exportar_estado()
+
+
+def test_recuperacao_pelo_instantaneo_e_pelos_segmentos_seguintes(gerenciador, tmp_path):
+    salas = gerenciador()
+    diario = Diario(str(tmp_path))
+    salas.usar_diario(diario)
+    motor = criar_sala(salas, "sala1")
+    jogar(motor, 3)
+    salas.gravar_instantaneo()
+    jogar(motor, 2)
+    diario.parar()
+
+    recuperadas, novo = recuperar(gerenciador, tmp_path)
+    novo.parar()
+
+    assert estado_recuperavel(recuperadas.obter_sala("sala1")) == estado_recuperavel(motor)
+
+
+def test_registro_incompleto_no_fim_e_descartado(jogadas, gerenciador, tmp_path):
+    registros = list(Diario(str(tmp_path)).ler_registros())
+    _, segmento = Diario(str(tmp_path)).segmentos()[-1]
+    with open(segmento, "rb+") as arq:
+        arq.truncate(arq.seek(0, 2) - 5)  #queda no meio da gravação do último registro
+
+    recuperadas, diario = recuperar(gerenciador, tmp_path)
+    esperadas = refazer(gerenciador, registros[:-1])
+    for sala_id, motor in esperadas.salas.items():
+        assert estado_recuperavel(recuperadas.obter_sala(sala_id)) == estado_recuperavel(motor)
+
+    #o diário continua íntegro depois do corte: o que vem depois também é recuperado
+    recuperadas.obter_sala("sala1").enviar_mensagem_chat("ana", "depois da queda")
+    diario.parar()
+    de_novo, diario = recuperar(gerenciador, tmp_path)
+    diario.parar()
+    assert de_novo.obter_sala("sala1").obter_chat(False)[-1] == ("ana", "ana: depois da queda")
+
+
+def test_versao_recuperada_passa_das_que_os_clientes_viram(jogadas, gerenciador, tmp_path):
+    motor = jogadas.obter_sala("sala1")
+    vista = motor.instantaneo.versao
+    _, segmento = Diario(str(tmp_path)).segmentos()[-1]
+    with open(segmento, "rb") as arq:
+        linhas = arq.readlines()
+    with open(segmento, "wb") as arq:
+        arq.writelines(linhas[:-10])  #o fim do diário não chegou ao disco
+
+    recuperadas, diario = recuperar(gerenciador, tmp_path)
+    diario.parar()
+    recuperado = recuperadas.obter_sala("sala1")
+
+    assert recuperado.instantaneo.versao > vista
+    estado = recuperado.obter_estado_desde(vista)
+    assert {"trecho", "opcoes", "status_votacao", "chat"} <= estado.keys()
+    assert estado["chat_limpo"]
+
+
+def test_quem_retoma_primeiro_nao_decide_a_rodada(jogadas, gerenciador, tmp_path):
+    #a sala terminou com só o primeiro jogador tendo votado
+    recuperadas, diario = recuperar(gerenciador, tmp_path)
+    motor = recuperadas.obter_sala("sala1")
+    primeiro, *outros = JOGADORES
+
+    motor.adicionar_jogador(primeiro)
+    assert not motor.resultado_calculado
+    assert motor.votos.votos == {primeiro: 1}
+    assert motor.total_conectados == len(JOGADORES)
+
+    for nome in outros:
+        motor.adicionar_jogador(nome)
+        motor.registrar_voto(nome, 2)
+    assert motor.resultado_calculado
+    diario.parar()
+
+
+def test_quem_nao_retoma_a_tempo_sai_dos_quoruns(jogadas, gerenciador, tmp_path):
+    recuperadas, diario = recuperar(gerenciador, tmp_path)
+    motor = recuperadas.obter_sala("sala1")
+    motor.adicionar_jogador(JOGADORES[0])
+
+    motor.expirar_restaurados()  #o agendador chama depois de ESPERA_RETOMADA
+
+    assert motor.instantaneo.jogadores == (JOGADORES[0],)
+    assert motor.resultado_calculado  #o voto de quem voltou passa a bastar
+    diario.parar()
+
+    #a expiração também vai para o diário
+    de_novo, diario = recuperar(gerenciador, tmp_path)
+    diario.parar()
+    assert de_novo.obter_sala("sala1").resultado_calculado
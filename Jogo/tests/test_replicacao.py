@@ -0,0 +1,136 @@
+# tests/test_replicacao.py
+# Replicação primário/reserva (controller/replicacao.py): o reserva acompanha o primário e,
+# quando ele cai, assume com as salas no ponto em que estavam.
+
+import sys
+import os
+import socket
+import subprocess
+import threading
+import time
+
+import pytest
+import rpyc
+
+from controller.replicacao import Primario, Replica
+from controller.protocolo_json import ConexaoJson
+from model.dao.diario import Diario
+from conftest import JOGADORES, criar_sala, jogar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRAZO = 10.0  #segundos para um servidor subir ou o reserva alcançar o primário
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def esperar(condicao, prazo=PRAZO):
+    limite = time.monotonic() + prazo
+    while not condicao():
+        assert time.monotonic() < limite, "tempo esgotado"
+        time.sleep(0.01)
+
+
+def test_reserva_acompanha_o_primario_e_assume(gerenciador):
+    salas = gerenciador()
+    diario = Diario()
+    salas.usar_diario(diario)
+    primario = Primario(salas, diario, 0, host="localhost")
+    primario.iniciar()
+    motor = criar_sala(salas, "sala1")  #antes do reserva conectar: vem no estado inicial
+
+    replica = Replica(gerenciador(), [("localhost", primario.porta)], espera_assumir=0.1)
+    seguindo = threading.Thread(target=replica.seguir, daemon=True)
+    seguindo.start()
+    esperar(lambda: replica.sincronizada)
+    jogar(motor, 4)  #depois: vem pelos registros
+    esperar(lambda: replica.lsn == diario.lsn)
+
+    assert replica.salas.obter_sala("sala1").exportar_estado() == motor.exportar_estado()
+
+    primario.parar()
+    seguindo.join(PRAZO)
+    assert not seguindo.is_alive()
+    replica.assumir(Diario())
+
+    assumida = replica.salas.obter_sala("sala1")
+    nome = JOGADORES[0]
+    assert assumida.jogador_do_token(motor.token_do_jogador(nome)) == nome
+    retomada = assumida.obter_retomada(nome, motor.instantaneo.versao)
+    assert retomada["meu_voto"] == 1
+    assert retomada["chat_limpo"]
+    assert retomada["chat"] == tuple(mensagem for _, mensagem in motor.obter_chat(False))
+
+
+class Servidores:
+    """Primário e reserva, cada um em seu processo (como bench/bench_replicacao.py)."""
+
+    def __init__(self, modo):
+        self.modo = modo
+        self.portas = [porta_livre(), porta_livre()]
+        replicacao = porta_livre()
+        comum = ["--modo", modo, "--min-jogadores", "2"]
+        argumentos = [
+            ["--porta", str(self.portas[0]), "--replicacao-porta", str(replicacao)],
+            ["--porta", str(self.portas[1]), "--reserva-de", f"localhost:{replicacao}", "--espera-assumir", "0.2"],
+        ]
+        self.processos = [
+            subprocess.Popen(
+                [sys.executable, os.path.join("run", "servidor_run.py"), *args, *comum], cwd=RAIZ,
+                env=dict(os.environ, PYTHONPATH=RAIZ), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            for args in argumentos
+        ]
+
+    def conectar(self, indice):
+        limite = time.monotonic() + PRAZO
+        while True:
+            try:
+                if self.modo == "async":
+                    return ConexaoJson("localhost", self.portas[indice])
+                return rpyc.connect("localhost", self.portas[indice])
+            except OSError:
+                if time.monotonic() > limite:
+                    raise
+                time.sleep(0.02)
+
+    def parar(self):
+        for processo in self.processos:
+            processo.kill()
+            processo.wait()
+
+
+@pytest.fixture(params=["threaded", "async"])
+def servidores(request):
+    servidores = Servidores(request.param)
+    yield servidores
+    servidores.parar()
+
+
+def test_retomar_sessao_no_reserva_depois_da_queda_do_primario(servidores):
+    ana, bia = servidores.conectar(0), servidores.conectar(0)
+    token = dict(ana.root.entrar_no_jogo("ana"))["token"]
+    bia.root.entrar_no_jogo("bia")  #o jogo começa com os dois
+    while not ana.root.obter_opcoes():  #trechos sem opções só pedem "Continuar"
+        ana.root.confirmar_continuar("ana")
+        bia.root.confirmar_continuar("bia")
+    ana.root.registrar_voto("ana", 2)
+    ana.root.enviar_mensagem("ana", "oi")
+    bia.root.enviar_mensagem("bia", "tudo bem?")
+    versao = dict(ana.root.obter_estado_desde(0))["versao"]
+    chat = tuple(mensagem for _, mensagem in ana.root.obter_chat(False))
+    time.sleep(0.3)  #replicação assíncrona: dá tempo de os últimos registros saírem
+
+    servidores.processos[0].kill()
+    conexao = servidores.conectar(1)
+    estado = dict(conexao.root.retomar_sessao(token, "principal", versao, True))
+
+    assert estado["meu_voto"] == 2
+    assert tuple(estado["chat"]) == chat
+    assert estado["chat_limpo"]  #versão de outra época: o cliente troca o chat inteiro
+    assert estado["resultado"] is None  #bia ainda não voltou: a votação segue aberta
+    assert estado["trecho"]
+    assert estado["versao"] > versao